@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from core.schema import COLUMN_DEFAULTS
+from models.test_history import TestHistory
+
+def make_deck(size: int, history_depth: int = 3, tested_ratio: float = 0.6,
+              seed: int = 0, now: Optional[datetime] = None) -> Tuple[pd.DataFrame, TestHistory]:
+    """生成合成词库及测试历史
+
+    Args:
+        size: 单词数量
+        history_depth: 每个测试过的单词的平均历史记录条数
+        tested_ratio: 测试过的单词比例
+        seed: 随机种子，相同参数生成相同数据
+        now: 参照时间，默认为当前时间
+
+    Returns:
+        Tuple[pd.DataFrame, TestHistory]: 与 DataLoader.load_data 之后格式一致的数据
+    """
+    rng = np.random.default_rng(seed)
+    now = (now or datetime.now()).replace(microsecond=0)
+    base = pd.Timestamp(now)
+
+    tested = rng.random(size) < tested_ratio
+    times = np.where(tested, rng.poisson(history_depth, size) + 1, 0)
+    scores = np.where(tested, rng.integers(-6, 7, size), 0)
+    days_ago = rng.integers(0, 120, size)
+    last_tested = pd.Series(base - pd.to_timedelta(days_ago, unit='D')).where(tested)
+    interval = np.where(tested, rng.choice([0.0, 1.0, 6.0, 15.0, 37.5], size), 0.0)
+    due = (last_tested + pd.to_timedelta(interval, unit='D')).where(tested)
+
+    df = pd.DataFrame({
+        'Words': [f'word{i:07d}' for i in range(size)],
+        'Page': rng.integers(1, 500, size),
+        'Times': times,
+        'Score': scores,
+        'LastTested': last_tested,
+        'SkipCount': rng.poisson(0.2, size),
+        'Interval': interval,
+        'Ease': np.where(tested, rng.uniform(1.3, 2.8, size), COLUMN_DEFAULTS['Ease']),
+        'Due': due
+    })
+
+    # 历史记录按时间顺序写入，保持时间索引有序
+    history = TestHistory()
+    positions = np.flatnonzero(tested)
+    counts = np.minimum(times[positions], history_depth * 2)
+    word_pos = np.repeat(positions, counts)
+    ages = rng.uniform(0, 180, len(word_pos))
+    order = np.argsort(-ages)
+    codes = rng.integers(-2, 3, len(word_pos))
+    skips = rng.random(len(word_pos)) < 0.05
+    words = df['Words'].to_numpy()
+    for i in order:
+        pos = word_pos[i]
+        history.add_record(
+            words[pos],
+            'skip' if skips[i] else int(codes[i]),
+            float(scores[pos]),
+            now - timedelta(days=float(ages[i]))
+        )
+    return df, history
@@ -0,0 +1,245 @@
+"""性能基准测试
+
+在 word_test_system 目录下运行:
+
+    python -m benchmarks.run --sizes 1000,10000 --output results.json
+    python -m benchmarks.run --sizes 1000 --compare results.json
+
+结果写成JSON(含提交号和依赖版本)，可以与其他提交的结果直接比较。
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.analyzer import Analyzer
+from core.answer_sources import ScriptedAnswerSource, SimulatedLearner
+from core.data_loader import DataLoader
+from core.storage import ExcelStorage, SQLiteStorage
+from core.tester import Tester
+from core.word_selector import WordSelector
+from benchmarks.deck import make_deck
+
+MODES = ['random', 'focus', 'review', 'srs']
+# 批量测试时循环使用的输入
+SCRIPTED_ANSWERS = ['2', '1', '0', '-1', '-2', 's']
+
+class BenchmarkRunner:
+    """按参数依次运行各项基准，收集耗时统计"""
+    def __init__(self, repeat: int = 5, budget: float = 10.0,
+                 storage: str = 'excel', history_depth: int = 3):
+        self.repeat = repeat
+        self.budget = budget            # 每项基准的时间预算(秒)，至少运行一次
+        self.storage = storage
+        self.history_depth = history_depth
+        self.results: List[Dict] = []
+
+    def measure(self, name: str, size: int, func: Callable[[], object],
+                number: int = 1, setup: Optional[Callable[[], None]] = None) -> Dict:
+        """多次运行 func，记录单次调用的耗时(秒)
+
+        number 为每个样本内连续调用的次数，用于测量很快的操作；
+        setup 在每个样本前运行，不计入耗时。
+        """
+        samples = []
+        started = time.perf_counter()
+        while len(samples) < self.repeat:
+            if setup is not None:
+                setup()
+            begin = time.perf_counter()
+            for _ in range(number):
+                func()
+            samples.append((time.perf_counter() - begin) / number)
+            if time.perf_counter() - started > self.budget:
+                break
+
+        result = {
+            'name': name,
+            'size': size,
+            'history_depth': self.history_depth,
+            'samples': len(samples),
+            'number': number,
+            'min': min(samples),
+            'median': statistics.median(samples),
+            'mean': statistics.mean(samples),
+        }
+        self.results.append(result)
+        print(f"{name:<40} {size:>9} {result['median'] * 1000:>12.3f} ms "
+              f"(min {result['min'] * 1000:.3f}, n={len(samples)}x{number})")
+        return result
+
+    def _make_loader(self, workdir: str, df: pd.DataFrame, history) -> DataLoader:
+        """把合成数据写到临时目录并加载"""
+        if self.storage == 'sqlite':
+            path = os.path.join(workdir, 'words.db')
+            storage = SQLiteStorage(path)
+        else:
+            path = os.path.join(workdir, 'words.xlsx')
+            storage = ExcelStorage(
+                path,
+                history_file=os.path.join(workdir, 'test_history.json'),
+                backup_dir=os.path.join(workdir, 'backups')
+            )
+        storage.save(df, history)
+        loader = DataLoader(path, storage=storage)
+        if not loader.load_data():
+            raise RuntimeError(f"加载合成数据失败: {path}")
+        return loader
+
+    def run_size(self, size: int) -> None:
+        """对一个词库规模运行全部基准"""
+        df, history = make_deck(size, self.history_depth)
+        with tempfile.TemporaryDirectory() as workdir:
+            loader = self._make_loader(workdir, df, history)
+            # 共用一个选择器，避免多个选择器同时监听数据变化
+            selector = WordSelector()
+            selector.bind(loader)
+            try:
+                self._bench_persistence(size, loader)
+                self._bench_selection(size, loader, selector)
+                self._bench_batch_test(size, loader, selector)
+                self._bench_simulation(size, loader, selector)
+                self._bench_analyzer(size, loader)
+            finally:
+                loader.storage.close()
+
+    def _bench_persistence(self, size: int, loader: DataLoader) -> None:
+        self.measure('load_data', size, loader.load_data)
+        self.measure('save_data', size, loader.save_data)
+
+    def _bench_selection(self, size: int, loader: DataLoader, selector: WordSelector) -> None:
+        for mode in MODES:
+            # 首次调用包含索引构建，单独记录
+            self.measure(f'select_word[{mode}].cold', size,
+                         lambda: selector.select_word(loader.df, mode),
+                         setup=lambda: selector.bind(loader))
+            self.measure(f'select_word[{mode}]', size,
+                         lambda: selector.select_word(loader.df, mode), number=200)
+            self.measure(f'select_words[{mode}]', size,
+                         lambda: selector.select_words(loader.df, 20, mode), number=20)
+
+    def _bench_batch_test(self, size: int, loader: DataLoader, selector: WordSelector,
+                          num: int = 50) -> None:
+        tester = Tester(loader, selector, ScriptedAnswerSource(itertools.cycle(SCRIPTED_ANSWERS)))
+        for mode in MODES:
+            result = self.measure(f'batch_test[{mode}]', size,
+                                  lambda: tester.batch_test(num, mode, auto_save=True))
+            result['words_per_batch'] = num
+
+    def _bench_simulation(self, size: int, loader: DataLoader, selector: WordSelector,
+                          num: int = 1000) -> None:
+        """模拟学习者连续作答(事件日志不逐条fsync)，记录每秒作答数"""
+        tester = Tester(loader, selector, SimulatedLearner(seed=0))
+        journal = getattr(loader.storage, 'journal', None)
+        sync = journal.sync if journal is not None else None
+        if journal is not None:
+            journal.sync = False
+        try:
+            for mode in MODES:
+                result = self.measure(f'simulate[{mode}]', size,
+                                      lambda: tester.batch_test(num, mode, auto_save=True))
+                result['answers_per_second'] = num / result['median']
+        finally:
+            if journal is not None:
+                journal.sync = sync
+
+    def _bench_analyzer(self, size: int, loader: DataLoader) -> None:
+        analyzer = Analyzer()
+        analyzer.set_data(loader.df)
+        reports = {
+            'get_basic_stats': analyzer.get_basic_stats,
+            'get_score_distribution': analyzer.get_score_distribution,
+            'get_weak_words': analyzer.get_weak_words,
+            'get_review_suggestions': analyzer.get_review_suggestions,
+            'get_learning_progress': analyzer.get_learning_progress,
+            'get_report': analyzer.get_report,
+        }
+        for name, func in reports.items():
+            self.measure(f'analyzer.{name}', size, func, number=5)
+
+        # 绑定数据加载器后基本统计由增量统计量提供，学习进度由按天汇总提供
+        analyzer.bind(loader)
+        for name in ('get_basic_stats', 'get_score_distribution', 'get_learning_progress'):
+            self.measure(f'analyzer.{name}.bound', size, reports[name], number=100)
+        self.measure('history.get_statistics', size,
+                     loader.test_history.get_statistics, number=100)
+
+def environment() -> Dict:
+    """记录运行环境，便于比较不同提交的结果"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+def compare(results: List[Dict], baseline_path: str) -> None:
+    """与之前保存的结果比较中位数耗时"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    previous = {(r['name'], r['size']): r for r in baseline['results']}
+    print(f"\n与 {baseline_path} (提交 {baseline['environment'].get('commit')}) 比较:")
+    for result in results:
+        old = previous.get((result['name'], result['size']))
+        if old is None:
+            continue
+        ratio = result['median'] / old['median'] if old['median'] > 0 else float('inf')
+        print(f"{result['name']:<40} {result['size']:>9} {ratio:>8.2f}x")
+
+def main(argv: Optional[List[str]] = None) -> Dict:
+    parser = argparse.ArgumentParser(description='单词测试系统性能基准')
+    parser.add_argument('--sizes', default='1000,10000',
+                        help='逗号分隔的词库规模，如 1000,10000,100000,1000000')
+    parser.add_argument('--history-depth', type=int, default=3,
+                        help='每个测试过的单词的平均历史记录条数')
+    parser.add_argument('--repeat', type=int, default=5, help='每项基准的样本数')
+    parser.add_argument('--budget', type=float, default=10.0,
+                        help='每项基准的时间预算(秒)，超出后停止采样')
+    parser.add_argument('--storage', choices=['excel', 'sqlite'], default='excel')
+    parser.add_argument('--output', help='结果JSON文件路径')
+    parser.add_argument('--compare', help='与之前的结果JSON比较')
+    args = parser.parse_args(argv)
+
+    runner = BenchmarkRunner(args.repeat, args.budget, args.storage, args.history_depth)
+    for size in (int(s) for s in args.sizes.split(',')):
+        runner.run_size(size)
+
+    report = {
+        'environment': environment(),
+        'settings': {
+            'storage': args.storage,
+            'repeat': args.repeat,
+            'budget': args.budget,
+            'history_depth': args.history_depth,
+        },
+        'results': runner.results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+    if args.compare:
+        compare(runner.results, args.compare)
+    return report
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+from bisect import bisect_left
+from typing import Dict, Optional
+
+from .topk import TopK
+
+# 分数分布的区间边界(左开右闭)与标签
+SCORE_EDGES = [-2, -1, 0, 1, 2]
+SCORE_LABELS = ['<-2', '-2~-1', '-1~0', '0~1', '1~2', '>2']
+
+def score_bin(score: float) -> int:
+    """单个分数所在的区间下标(左开右闭，与 pd.cut 一致)"""
+    return bisect_left(SCORE_EDGES, score)
+
+class StatsAggregates:
+    """随作答增量维护的统计量
+
+    订阅 DataLoader 的数据变化回调，每次作答/跳过以 O(1) 更新
+    已测试单词数、分数总和、低分单词数、分数分布和跳过总数，并以
+    O(log N) 维护分数最低的 weak_size 个单词；
+    整体重载时全量重算一次，recompute 也用于校验一致性。
+    """
+    def __init__(self, weak_size: int = 20):
+        self.data_loader = None
+        self.df: Optional[pd.DataFrame] = None   # 统计量对应的数据
+        self.total_words = 0
+        self.scored_words = 0        # 分数非空的单词数
+        self.tested_words = 0
+        self.score_sum = 0.0
+        self.low_score_words = 0
+        self.skip_total = 0
+        self.histogram = [0] * len(SCORE_LABELS)
+        self.weak_size = weak_size
+        self.weak: Optional[TopK] = None    # 分数最低的单词
+
+    def bind(self, data_loader) -> None:
+        """订阅数据加载器的变化"""
+        if self.data_loader is not None:
+            self.data_loader.remove_listener(self._on_word_changed)
+        self.data_loader = data_loader
+        data_loader.add_listener(self._on_word_changed)
+        if data_loader.df is not None:
+            self.recompute(data_loader.df)
+
+    def is_current(self, df: Optional[pd.DataFrame]) -> bool:
+        """统计量是否对应给定的数据"""
+        return df is not None and df is self.df and len(df) == self.total_words
+
+    def recompute(self, df: pd.DataFrame) -> None:
+        """全量重算"""
+        scores = df['Score'].to_numpy(dtype=float, na_value=np.nan)
+        valid = scores[~np.isnan(scores)]
+        bins = np.searchsorted(SCORE_EDGES, valid, side='left')
+
+        self.df = df
+        self.total_words = len(df)
+        self.scored_words = len(valid)
+        self.tested_words = int(np.count_nonzero(df['Times'].to_numpy(dtype=float, na_value=0) > 0))
+        self.score_sum = float(valid.sum())
+        self.low_score_words = int(np.count_nonzero(valid < 0))
+        self.skip_total = int(df['SkipCount'].fillna(0).sum())
+        self.histogram = np.bincount(bins, minlength=len(SCORE_LABELS)).tolist()
+        self.weak = TopK(scores, self.weak_size)
+
+    def _on_word_changed(self, word_idx: Optional[int], kind: str, score=None) -> None:
+        """数据变化回调(在数据更新之后调用)"""
+        df = self.data_loader.df
+        if word_idx is None or kind == 'reload' or not self.is_current(df):
+            self.recompute(df)
+        elif kind == 'skip':
+            self.skip_total += 1
+        elif kind == 'answer':
+            self._apply_answer(df, word_idx, score)
+
+    def _apply_answer(self, df: pd.DataFrame, word_idx: int, score: float) -> None:
+        """由更新后的行推出更新前的值，调整各统计量"""
+        new_score = float(df.at[word_idx, 'Score'])
+        old_score = new_score - score
+        if np.isnan(new_score):
+            self.recompute(df)
+            return
+
+        if df.at[word_idx, 'Times'] == 1:
+            self.tested_words += 1
+        self.score_sum += score
+        self.low_score_words += (new_score < 0) - (old_score < 0)
+        self.histogram[score_bin(old_score)] -= 1
+        self.histogram[score_bin(new_score)] += 1
+        self.weak.update(df.index.get_loc(word_idx), new_score)
+
+    @property
+    def avg_score(self) -> float:
+        """平均分数"""
+        return self.score_sum / self.scored_words if self.scored_words else np.nan
+
+    def basic_stats(self) -> Dict:
+        """与 Analyzer.get_basic_stats 相同格式的统计信息"""
+        return {
+            'total_words': self.total_words,
+            'tested_words': self.tested_words,
+            'tested_percentage': self.tested_words/self.total_words if self.total_words > 0 else 0,
+            'avg_score': self.avg_score,
+            'low_score_words': self.low_score_words
+        }
+
+    def score_distribution(self) -> Dict[str, int]:
+        """分数分布"""
+        return dict(zip(SCORE_LABELS, self.histogram))
+
+    def _counters(self) -> tuple:
+        return (self.total_words, self.scored_words, self.tested_words,
+                self.low_score_words, self.skip_total, list(self.histogram))
+
+    def verify(self) -> bool:
+        """全量重算并与增量结果比较，返回是否一致"""
+        if self.df is None:
+            return True
+        counters, score_sum = self._counters(), self.score_sum
+        self.recompute(self.df)
+        return counters == self._counters() and bool(np.isclose(score_sum, self.score_sum))
@@ -2,25 +2,85 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
+from .schema import days_since_tested, parse_last_tested
+from .topk import smallest_k, largest_k
+from .aggregates import SCORE_EDGES, SCORE_LABELS, StatsAggregates
+from utils.logger import metrics
+
+class _StatsPass:
+    """一次统计所需的列数组，各报表共享"""
+    __slots__ = ('scores', 'times', 'days')
+
+    def __init__(self, df: pd.DataFrame, now: datetime):
+        self.scores = df['Score'].to_numpy(dtype=float, na_value=np.nan)
+        self.times = df['Times'].to_numpy(dtype=float, na_value=np.nan)
+        self.days = days_since_tested(df['LastTested'], now)
 
 class Analyzer:
-    def __init__(self, df: Optional[pd.DataFrame] = None):
+    def __init__(self, df: Optional[pd.DataFrame] = None, weak_size: int = 20):
         self.df = df
-    
+        self.weak_size = weak_size      # 绑定后持续维护的薄弱单词数量
+        self.aggregates: Optional[StatsAggregates] = None
+        self.data_loader = None
+
     def set_data(self, df: pd.DataFrame) -> None:
         """设置数据源"""
         self.df = df
-    
+
+    def bind(self, data_loader) -> None:
+        """绑定数据加载器，基本统计和分数分布改由增量统计量提供，
+        学习进度改由数据加载器维护的按天/小时汇总提供，
+        不超过 weak_size 个的薄弱单词直接读取维护好的最低分单词"""
+        self.data_loader = data_loader
+        if self.aggregates is None:
+            self.aggregates = StatsAggregates(self.weak_size)
+        self.aggregates.bind(data_loader)
+
+    def _current_aggregates(self) -> Optional[StatsAggregates]:
+        """增量统计量对应当前数据时返回它"""
+        if self.aggregates is not None and self.aggregates.is_current(self.df):
+            return self.aggregates
+        return None
+
+    def _stats_pass(self) -> _StatsPass:
+        """取出各报表共用的列数组(只遍历一次数据)"""
+        return _StatsPass(self.df, datetime.now())
+
+    @metrics.timed('analyzer.get_report')
+    def get_report(self, limit: int = 20) -> Dict:
+        """一次统计生成全部报表: 基本统计、分数分布、薄弱单词和复习建议"""
+        if self.df is None:
+            return {}
+
+        stats = self._stats_pass()
+        aggregates = self._current_aggregates()
+        if aggregates is not None:
+            report = aggregates.basic_stats()
+            report['score_distribution'] = aggregates.score_distribution()
+        else:
+            report = self._basic_stats(stats)
+            report['score_distribution'] = self._score_distribution(stats)
+        report['weak_words'] = self._weak_words(limit, stats)
+        report['review_suggestions'] = self._review_suggestions(stats, limit)
+        return report
+
+    @metrics.timed('analyzer.get_basic_stats')
     def get_basic_stats(self) -> Dict:
         """获取基本统计信息"""
         if self.df is None:
             return {}
-            
-        total_words = len(self.df)
-        tested_words = len(self.df[self.df['Times'] > 0])
-        avg_score = self.df['Score'].mean()
-        low_score_words = len(self.df[self.df['Score'] < 0])
-        
+        aggregates = self._current_aggregates()
+        if aggregates is not None:
+            return aggregates.basic_stats()
+        return self._basic_stats(self._stats_pass())
+
+    def _basic_stats(self, stats: _StatsPass) -> Dict:
+        total_words = len(stats.scores)
+        tested_words = int(np.count_nonzero(stats.times > 0))
+        valid_scores = stats.scores[~np.isnan(stats.scores)]
+        avg_score = valid_scores.mean() if len(valid_scores) else np.nan
+        low_score_words = int(np.count_nonzero(stats.scores < 0))
+
         return {
             'total_words': total_words,
             'tested_words': tested_words,
@@ -28,37 +88,54 @@ class Analyzer:
             'avg_score': avg_score,
             'low_score_words': low_score_words
         }
-    
+
+    @metrics.timed('analyzer.get_score_distribution')
     def get_score_distribution(self) -> Dict[str, int]:
         """获取分数分布"""
         if self.df is None:
             return {}
-            
-        bins = [-float('inf'), -2, -1, 0, 1, 2, float('inf')]
-        labels = ['<-2', '-2~-1', '-1~0', '0~1', '1~2', '>2']
-        score_dist = pd.cut(self.df['Score'], bins=bins, labels=labels).value_counts().sort_index()
-        
-        return score_dist.to_dict()
-    
-    def get_learning_progress(self, days: int = 30) -> Dict:
-        """获取学习进度统计"""
+        aggregates = self._current_aggregates()
+        if aggregates is not None:
+            return aggregates.score_distribution()
+        return self._score_distribution(self._stats_pass())
+
+    def _score_distribution(self, stats: _StatsPass) -> Dict[str, int]:
+        # side='left' 使区间为左开右闭，与 pd.cut 默认一致
+        scores = stats.scores[~np.isnan(stats.scores)]
+        bins = np.searchsorted(SCORE_EDGES, scores, side='left')
+        counts = np.bincount(bins, minlength=len(SCORE_LABELS))
+
+        return dict(zip(SCORE_LABELS, counts.tolist()))
+
+    @metrics.timed('analyzer.get_learning_progress')
+    def get_learning_progress(self, days: int = 30, resolution: str = 'day') -> Dict:
+        """获取学习进度统计
+
+        绑定数据加载器时由测试历史的预聚合结果给出(每次作答都计入，
+        另含跳过数和新/复习单词数，resolution 可为 'day' 或 'hour')；
+        否则只能按各单词最近一次测试时间(LastTested)按天统计。
+        """
         if self.df is None:
             return {}
-            
+        if self.data_loader is not None and self.data_loader.df is self.df:
+            with self.data_loader.lock:
+                return self.data_loader.progress.query(days, resolution)
+
         now = datetime.now()
         start_date = now - timedelta(days=days)
-        
-        # 转换LastTested为datetime类型
-        self.df['LastTested'] = pd.to_datetime(self.df['LastTested'], errors='coerce')
-        
+
+        # LastTested已是datetime类型(兼容外部传入的字符串列，不修改原数据)
+        last_tested = parse_last_tested(self.df['LastTested'])
+        recent = self.df[last_tested >= start_date].assign(LastTested=last_tested)
+
         # 按日期统计
-        daily_stats = self.df[self.df['LastTested'] >= start_date].groupby(
-            self.df['LastTested'].dt.date
+        daily_stats = recent.groupby(
+            recent['LastTested'].dt.normalize()
         ).agg({
             'Times': 'count',
             'Score': ['mean', 'min', 'max']
         }).reset_index()
-        
+
         # 转换为字典格式
         progress_data = {
             'dates': daily_stats['LastTested'].dt.strftime('%Y-%m-%d').tolist(),
@@ -67,41 +144,52 @@ class Analyzer:
             'min_scores': daily_stats['Score']['min'].tolist(),
             'max_scores': daily_stats['Score']['max'].tolist()
         }
-        
+
         return progress_data
-    
+
+    @metrics.timed('analyzer.get_weak_words')
     def get_weak_words(self, limit: int = 20) -> List[Dict]:
         """获取需要加强的单词列表"""
         if self.df is None:
             return []
-            
-        weak_words = self.df.nsmallest(limit, 'Score')
-        
-        return [{
-            'word': row['Words'],
-            'page': row['Page'],
-            'score': row['Score'],
-            'times': row['Times'],
-            'last_tested': row['LastTested']
-        } for _, row in weak_words.iterrows()]
-    
+        return self._weak_words(limit)
+
+    def _weak_words(self, limit: int, stats: Optional[_StatsPass] = None) -> List[Dict]:
+        aggregates = self._current_aggregates()
+        if aggregates is not None and limit <= aggregates.weak_size:
+            positions = aggregates.weak.smallest(limit)
+        else:
+            scores = stats.scores if stats is not None else \
+                self.df['Score'].to_numpy(dtype=float, na_value=np.nan)
+            positions = smallest_k(scores, limit)
+        weak_words = self.df.iloc[positions][['Words', 'Page', 'Score', 'Times', 'LastTested']]
+
+        return weak_words.rename(columns={
+            'Words': 'word',
+            'Page': 'page',
+            'Score': 'score',
+            'Times': 'times',
+            'LastTested': 'last_tested'
+        }).to_dict('records')
+
+    @metrics.timed('analyzer.get_review_suggestions')
     def get_review_suggestions(self, limit: int = 20) -> List[Dict]:
         """获取建议复习的单词列表"""
         if self.df is None:
             return []
-            
-        # 计算复习优先级
-        df_copy = self.df.copy()
-        df_copy['LastTested'] = pd.to_datetime(df_copy['LastTested'], errors='coerce')
-        df_copy['DaysSinceTested'] = (datetime.now() - df_copy['LastTested']).dt.days.fillna(100)
-        df_copy['ReviewPriority'] = df_copy['Score'] * df_copy['DaysSinceTested']
-        
-        review_words = df_copy.nlargest(limit, 'ReviewPriority')
-        
-        return [{
-            'word': row['Words'],
-            'page': row['Page'],
-            'score': row['Score'],
-            'days_since_tested': row['DaysSinceTested'],
-            'priority': row['ReviewPriority']
-        } for _, row in review_words.iterrows()]
\ No newline at end of file
+        return self._review_suggestions(self._stats_pass(), limit)
+
+    def _review_suggestions(self, stats: _StatsPass, limit: int) -> List[Dict]:
+        # 计算复习优先级(只对选出的 limit 行生成结果)
+        priority = stats.scores * stats.days
+        positions = largest_k(priority, limit)
+        review_words = self.df.iloc[positions][['Words', 'Page', 'Score']]
+
+        return review_words.rename(columns={
+            'Words': 'word',
+            'Page': 'page',
+            'Score': 'score'
+        }).assign(
+            days_since_tested=stats.days[positions],
+            priority=priority[positions]
+        ).to_dict('records')
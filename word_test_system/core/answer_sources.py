@@ -0,0 +1,99 @@
+import math
+import random
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+# 作答选项: 分数 -> 描述
+FEEDBACK_LEVELS = {
+    '2': '非常熟悉',
+    '1': '熟悉',
+    '0': '模糊',
+    '-1': '不熟悉',
+    '-2': '完全不知道'
+}
+SKIP = 's'
+QUIT = 'q'
+
+class AnswerSource:
+    """答案来源接口
+
+    Tester 对每个单词调用 ask，传入单词信息字典
+    (index, word, page, score, times)，返回作答选项:
+    FEEDBACK_LEVELS 中的分数字符串、's'(跳过) 或 'q'(退出)。
+    """
+    def ask(self, word: Dict) -> str:
+        raise NotImplementedError
+
+class ConsoleAnswerSource(AnswerSource):
+    """控制台交互: 打印单词和选项，读取用户输入直到得到有效选项"""
+    def __init__(self, feedback_levels: Optional[Dict[str, str]] = None):
+        self.feedback_levels = feedback_levels or FEEDBACK_LEVELS
+
+    def ask(self, word: Dict) -> str:
+        print(f"\n单词: {word['word']} (页码: {word['page']})")
+        print("请选择熟悉程度:")
+        for score, desc in self.feedback_levels.items():
+            print(f"{score}. {desc}")
+        print("s. 跳过")
+        print("q. 退出")
+        print("e. 查看例句(如果存在)")
+
+        while True:
+            choice = input("你的选择: ").strip().lower()
+
+            if choice in self.feedback_levels or choice in (SKIP, QUIT):
+                return choice
+            elif choice == 'e':
+                # 查看例句功能待实现
+                print("例句功能待实现")
+            else:
+                print("无效输入，请重新选择")
+
+class ScriptedAnswerSource(AnswerSource):
+    """按脚本依次作答，脚本用完后退出"""
+    def __init__(self, answers: Iterable[str]):
+        self._answers: Iterator[str] = iter(answers)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'ScriptedAnswerSource':
+        """从文件读取脚本: 每行一个选项，忽略空行和 # 开头的注释"""
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = [line.strip() for line in f]
+        return cls(line for line in lines if line and not line.startswith('#'))
+
+    def ask(self, word: Dict) -> str:
+        return str(next(self._answers, QUIT)).strip().lower()
+
+class CallbackAnswerSource(AnswerSource):
+    """由回调函数作答: callback(word) -> 选项"""
+    def __init__(self, callback: Callable[[Dict], str]):
+        self.callback = callback
+
+    def ask(self, word: Dict) -> str:
+        return self.callback(word)
+
+class SimulatedLearner(AnswerSource):
+    """模拟学习者: 当前分数越高、测试次数越多，越可能答出高分
+
+    记住的概率为 sigmoid(skill + 0.5*分数 + 0.2*log(1+次数))，
+    记住时答 2 或 1，否则答 0、-1 或 -2；按 skip_rate 随机跳过。
+    max_answers 用完后退出。
+    """
+    def __init__(self, skill: float = 0.0, skip_rate: float = 0.02,
+                 max_answers: Optional[int] = None, seed: Optional[int] = None):
+        self.skill = skill
+        self.skip_rate = skip_rate
+        self.max_answers = max_answers
+        self.answers = 0
+        self.rng = random.Random(seed)
+
+    def ask(self, word: Dict) -> str:
+        if self.max_answers is not None and self.answers >= self.max_answers:
+            return QUIT
+        self.answers += 1
+        if self.rng.random() < self.skip_rate:
+            return SKIP
+
+        x = self.skill + 0.5 * float(word['score']) + 0.2 * math.log1p(float(word['times']))
+        if self.rng.random() < 1 / (1 + math.exp(-x)):
+            return self.rng.choice(('2', '1'))
+        return self.rng.choice(('0', '-1', '-2'))
@@ -0,0 +1,177 @@
+"""批量计算多个词库的复习建议
+
+把词库文件分块分发到进程池，每个词库计算基本统计、分数分布、薄弱单词、
+复习建议以及重点突破/复习模式的单词列表，结果逐行写入一个JSON Lines
+文件(每个词库一行)。同时在途的任务数有上限，结果到达后立即写出，
+内存占用与词库总数无关。词库只读打开，不会改动词库目录中的文件；
+Excel 词库的测试历史与命令行程序相同，为同名的 .history.json(见
+storage.history_path)。
+
+在 word_test_system 目录下运行:
+
+    python -m core.batch decks/ --output review.jsonl
+    python -m core.batch a.xlsx b.db --workers 8 --chunk-size 4 --limit 50
+"""
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .analyzer import Analyzer
+from .data_loader import DataLoader
+from .storage import SQLITE_EXTENSIONS, create_storage
+from .word_selector import WordSelector
+
+DECK_EXTENSIONS = ('.xlsx',) + SQLITE_EXTENSIONS
+
+def find_decks(paths: Iterable[str]) -> Iterator[str]:
+    """展开参数中的目录(递归查找词库文件)，按名称排序逐个产出"""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                # 跳过保存过程中的临时文件
+                if name.lower().endswith(DECK_EXTENSIONS) and '.tmp.' not in name:
+                    yield os.path.join(root, name)
+
+def analyze_deck(path: str, limit: int = 20) -> Dict:
+    """计算单个词库的报表(只读，不写回词库)"""
+    started = time.perf_counter()
+    loader = DataLoader(path, storage=create_storage(path, read_only=True))
+    try:
+        if not loader.load_data():
+            return {'deck': path, 'ok': False, 'error': '加载失败'}
+        df = loader.df
+        report = Analyzer(df).get_report(limit)
+        selector = WordSelector()
+        words = df['Words']
+        report['focus_words'] = words.loc[selector.get_focus_words(df, limit)].tolist()
+        report['review_words'] = words.loc[selector.get_review_words(df, limit)].tolist()
+        return {
+            'deck': path,
+            'ok': True,
+            'seconds': time.perf_counter() - started,
+            **report
+        }
+    except Exception as e:
+        return {'deck': path, 'ok': False, 'error': str(e)}
+    finally:
+        loader.storage.close()
+
+def analyze_chunk(paths: List[str], limit: int = 20) -> List[Dict]:
+    """在工作进程中依次处理一块词库，减少进程间调度开销"""
+    return [analyze_deck(path, limit) for path in paths]
+
+def _chunks(paths: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk = []
+    for path in paths:
+        chunk.append(path)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _to_json(value):
+    """json.dump 的 default: 转换numpy标量、时间和缺失值"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return None if pd.isna(value) else value.isoformat()
+    if value is pd.NaT:
+        return None
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+def _clean_floats(value):
+    """NaN/inf 不是合法JSON，转换为None"""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, np.floating) and not np.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {k: _clean_floats(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_clean_floats(v) for v in value]
+    return value
+
+def write_result(f, result: Dict) -> None:
+    f.write(json.dumps(_clean_floats(result), ensure_ascii=False, default=_to_json) + '\n')
+
+def run_batch(paths: Iterable[str], output: str, workers: Optional[int] = None,
+              chunk_size: int = 1, limit: int = 20,
+              max_pending: Optional[int] = None) -> Dict:
+    """批量处理词库并写出结果文件
+
+    Args:
+        paths: 词库文件或目录
+        output: 结果JSON Lines文件路径
+        workers: 工作进程数，默认为CPU核数；0 表示在当前进程中串行处理
+        chunk_size: 每个任务处理的词库数
+        limit: 各单词列表的长度
+        max_pending: 同时在途的任务数上限，默认为工作进程数的2倍
+
+    Returns:
+        Dict: 处理的词库数、失败数和耗时
+    """
+    started = time.perf_counter()
+    chunks = _chunks(find_decks(paths), max(chunk_size, 1))
+    summary = {'decks': 0, 'failed': 0}
+
+    def collect(results: List[Dict]) -> None:
+        for result in results:
+            summary['decks'] += 1
+            summary['failed'] += not result['ok']
+            write_result(f, result)
+
+    tmp_output = output + '.tmp'
+    with open(tmp_output, 'w', encoding='utf-8') as f:
+        if workers == 0:
+            for chunk in chunks:
+                collect(analyze_chunk(chunk, limit))
+        else:
+            workers = workers or os.cpu_count() or 1
+            max_pending = max_pending or workers * 2
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = set()
+                for chunk in chunks:
+                    pending.add(executor.submit(analyze_chunk, chunk, limit))
+                    if len(pending) >= max_pending:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            collect(future.result())
+                for future in wait(pending).done:
+                    collect(future.result())
+    os.replace(tmp_output, output)
+
+    summary['workers'] = workers
+    summary['seconds'] = time.perf_counter() - started
+    return summary
+
+def main(argv: Optional[List[str]] = None) -> Dict:
+    parser = argparse.ArgumentParser(description='批量计算词库的复习建议')
+    parser.add_argument('paths', nargs='+', help='词库文件或包含词库文件的目录')
+    parser.add_argument('--output', default='review_suggestions.jsonl',
+                        help='结果文件(JSON Lines，每个词库一行)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='工作进程数，默认为CPU核数，0为串行')
+    parser.add_argument('--chunk-size', type=int, default=1, help='每个任务处理的词库数')
+    parser.add_argument('--limit', type=int, default=20, help='各单词列表的长度')
+    args = parser.parse_args(argv)
+
+    summary = run_batch(args.paths, args.output, args.workers, args.chunk_size, args.limit)
+    print(f"处理 {summary['decks']} 个词库(失败 {summary['failed']} 个)，"
+          f"用时 {summary['seconds']:.2f} 秒，结果已写入 {args.output}")
+    return summary
+
+if __name__ == '__main__':
+    main()
@@ -1,82 +1,220 @@
 import pandas as pd
+import threading
 from datetime import datetime
-import os
-import json
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
+from .schema import TIME_FORMAT, COLUMN_DEFAULTS, parse_datetime_columns, to_export_frame
+from .rollups import ProgressRollup
+from .srs import review
+from .storage import StorageBackend, create_storage, rollup_path
+from .word_index import WordIndex
+from models.test_history import TestHistory
+from utils.logger import metrics
 
 class DataLoader:
-    def __init__(self, file_path: str = 'words.xlsx'):
+    def __init__(self, file_path: str = 'words.xlsx',
+                 storage: Optional[StorageBackend] = None):
         self.file_path = file_path
-        self.backup_dir = 'backups'
-        self.history_file = 'test_history.json'
+        # 默认按扩展名选择存储后端(.db/.sqlite 使用SQLite，否则为Excel)
+        self.storage = storage or create_storage(file_path)
         self.df = None
-        self.test_history = {}
+        self.test_history = TestHistory()
+        # 后台保存线程与交互线程共享数据时使用
+        self.lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._listeners: List[Callable] = []
+        # 数据版本，每次变化通知时加一，供缓存判断数据是否变化
+        self.version = 0
+        self._word_index: Optional[WordIndex] = None
+        # 按天/小时预聚合的学习进度，随历史记录增量更新，保存在词库旁
+        self.progress = ProgressRollup()
+        self.rollup_path = rollup_path(file_path)
+        self._saved_rollup = None          # 上次写出时已累加的记录数
         
+    def add_listener(self, callback: Callable) -> None:
+        """注册数据变化回调: callback(word_idx, kind, score)
+
+        kind 为 'answer'、'skip' 或 'reload'(整体重载时 word_idx 为None)
+        """
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable) -> None:
+        """移除数据变化回调"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, word_idx: Optional[int], kind: str, score=None) -> None:
+        """通知所有监听者"""
+        self.version += 1
+        for callback in list(self._listeners):
+            callback(word_idx, kind, score)
+
+    @metrics.timed('load_data')
     def load_data(self) -> bool:
         """加载单词数据"""
         try:
-            self.df = pd.read_excel(self.file_path)
+            self.df, self.test_history = self.storage.load()
+            self._word_index = None
+            self.progress = ProgressRollup.load(
+                self.rollup_path, self.test_history, self.storage.history_seq
+            )
+            self._saved_rollup = None
             # 初始化必要列
-            for col in ['Times', 'Score', 'LastTested', 'SkipCount']:
+            for col, default in COLUMN_DEFAULTS.items():
                 if col not in self.df.columns:
-                    self.df[col] = 0 if col != 'LastTested' else ''
+                    self.df[col] = default
+                elif isinstance(default, float):
+                    # Excel中的整数间隔会被读成整数列，之后写入小数会出错
+                    self.df[col] = self.df[col].astype(float)
+            # 时间列在内存中统一为datetime64，只在导出时转换为字符串
+            parse_datetime_columns(self.df)
             
-            # 加载测试历史
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    self.test_history = json.load(f)
+            # 把上次快照之后的作答重放到数据上
+            for event, update_deck, update_history in self.storage.pending_events():
+                self._apply_event(event, update_deck, update_history)
+            self._notify(None, 'reload')
             return True
         except Exception as e:
             print(f"加载文件时出错: {e}")
             return False
 
+    def _apply_event(self, event: Dict, update_deck: bool = True,
+                     update_history: bool = True) -> None:
+        """重放一条作答事件(不再写回存储)，词库或历史已包含该事件时跳过对应部分"""
+        word_idx = event['i']
+        if word_idx not in self.df.index or self.df.at[word_idx, 'Words'] != event['w']:
+            matches = self.df.index[self.df['Words'] == event['w']]
+            if len(matches) == 0:
+                return
+            word_idx = matches[0]
+        
+        if update_deck and event['s'] == 'skip':
+            self.df.at[word_idx, 'SkipCount'] += 1
+        elif update_deck:
+            self.df.at[word_idx, 'Times'] += 1
+            self.df.at[word_idx, 'Score'] += event['s']
+            self.df.at[word_idx, 'LastTested'] = pd.Timestamp(event['t'])
+            self._schedule(word_idx, event['s'], pd.Timestamp(event['t']))
+        if update_history:
+            # 词库已包含之后的作答时，历史中的新分数取事件记录的值
+            self._append_history(word_idx, event['s'], event['t'], event.get('v'))
+
+    @metrics.timed('flush')
+    def flush(self) -> None:
+        """确保已记录的作答落盘(只涉及单条事件，与词库大小无关)
+
+        持有数据锁，避免与后台保存切出日志(关闭文件)同时进行。
+        """
+        with self.lock:
+            self.storage.flush()
+
+    @metrics.timed('save_data')
     def save_data(self) -> bool:
-        """保存数据到文件"""
+        """保存完整快照(Excel后端同时清空事件日志)
+
+        只在持锁期间复制数据，耗时的写文件在锁外进行，
+        可以在后台线程中调用而不阻塞作答。
+        """
         try:
-            # 创建备份目录
-            if not os.path.exists(self.backup_dir):
-                os.makedirs(self.backup_dir)
-            
-            # 保存主文件
-            self.df.to_excel(self.file_path, index=False)
-            
-            # 创建带时间戳的备份
-            backup_file = os.path.join(
-                self.backup_dir,
-                f"words_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            )
-            self.df.to_excel(backup_file, index=False)
-            
-            # 保存测试历史
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.test_history, f, ensure_ascii=False, indent=4)
-            
+            with self._save_lock:
+                with self.lock:
+                    df = self.df.copy()
+                    history = self.test_history.copy()
+                    rollup = None
+                    if self.progress.count != self._saved_rollup:
+                        rollup = self.progress.to_dict()
+                    seq = self.storage.checkpoint()
+                if rollup is not None:
+                    # 汇总记录对应的历史范围，加载时与历史的写入标记不一致则重建
+                    rollup['journal_seq'] = seq
+                self.storage.save(df, history)
+                if rollup is not None:
+                    ProgressRollup.save(self.rollup_path, rollup)
+                    self._saved_rollup = rollup['count']
             return True
         except Exception as e:
             print(f"保存文件时出错: {e}")
             return False
 
+    def export_excel(self, file_path: str) -> None:
+        """把当前数据导出为Excel"""
+        to_export_frame(self.df).to_excel(file_path, index=False)
+
     def update_word_data(self, word_idx: int, score: int) -> None:
         """更新单词数据"""
         if self.df is not None:
-            self.df.at[word_idx, 'Times'] += 1
-            self.df.at[word_idx, 'Score'] += score
-            self.df.at[word_idx, 'LastTested'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            with self.lock:
+                now = pd.Timestamp(datetime.now().replace(microsecond=0))
+                self.df.at[word_idx, 'Times'] += 1
+                self.df.at[word_idx, 'Score'] += score
+                self.df.at[word_idx, 'LastTested'] = now
+                self._schedule(word_idx, score, now)
+                self._notify(word_idx, 'answer', score)
+
+    def _schedule(self, word_idx: int, score: int, now: pd.Timestamp) -> None:
+        """按本次得分更新间隔重复状态(间隔、难度系数、到期时间)"""
+        if 'Due' not in self.df.columns:
+            return  # 外部直接设置的数据可能没有调度列
+        interval, ease, delay = review(
+            float(self.df.at[word_idx, 'Interval']),
+            float(self.df.at[word_idx, 'Ease']),
+            score
+        )
+        self.df.at[word_idx, 'Interval'] = interval
+        self.df.at[word_idx, 'Ease'] = ease
+        self.df.at[word_idx, 'Due'] = now + delay
+
+    def skip_word(self, word_idx: int) -> None:
+        """记录跳过单词"""
+        if self.df is not None:
+            with self.lock:
+                self.df.at[word_idx, 'SkipCount'] += 1
+                self._notify(word_idx, 'skip')
 
     def record_test_history(self, word_idx: int, score: int) -> None:
-        """记录测试历史"""
+        """记录测试历史，并通过存储后端持久化这次作答"""
         if self.df is not None:
-            word = self.df.loc[word_idx, 'Words']
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            if word not in self.test_history:
-                self.test_history[word] = []
-                
-            self.test_history[word].append({
-                'timestamp': timestamp,
-                'score': score,
-                'new_score': self.df.loc[word_idx, 'Score']
-            })
+            with self.lock:
+                timestamp = datetime.now().strftime(TIME_FORMAT)
+                word = self._append_history(word_idx, score, timestamp)
+                self.storage.record_event(self.df, word_idx, {
+                    't': timestamp,
+                    'i': int(word_idx),
+                    'w': word,
+                    's': score,
+                    'v': float(self.df.at[word_idx, 'Score'])
+                })
+
+    def _append_history(self, word_idx: int, score, timestamp: str,
+                        new_score: Optional[float] = None) -> str:
+        """在内存中追加一条历史记录，返回单词(new_score 默认为当前分数)"""
+        word = self.df.at[word_idx, 'Words']
+        timestamp = datetime.strptime(timestamp, TIME_FORMAT)
+        self.test_history.add_record(
+            word,
+            score,
+            self.df.at[word_idx, 'Score'] if new_score is None else new_score,
+            timestamp
+        )
+        self.progress.add(word, score, timestamp)
+        return word
+
+    @property
+    def word_index(self) -> WordIndex:
+        """单词查找索引，加载数据后首次查询时建立"""
+        if self._word_index is None or len(self._word_index) != len(self.df):
+            self._word_index = WordIndex(self.df['Words'])
+        return self._word_index
+
+    def search_words(self, query: str, mode: str = 'contains') -> List[int]:
+        """查找单词，返回匹配行的索引(不区分大小写，按普通文本匹配)
+
+        mode 为 'exact'、'prefix'、'contains' 或 'fuzzy'
+        """
+        if self.df is None:
+            return []
+        positions = getattr(self.word_index, mode)(query)
+        return self.df.index[positions].tolist()
 
     def get_word_info(self, word_idx: int) -> Optional[Dict]:
         """获取单词详细信息"""
@@ -84,7 +222,8 @@ class DataLoader:
             return None
             
         word_row = self.df.loc[word_idx]
-        history = self.test_history.get(word_row['Words'], [])
+        # 只读取该单词最近5次记录
+        history = self.test_history.get_word_history(word_row['Words'], 5)
         
         return {
             'word': word_row['Words'],
@@ -92,5 +231,5 @@ class DataLoader:
             'times': word_row['Times'],
             'score': word_row['Score'],
             'skip_count': word_row['SkipCount'],
-            'history': history[-5:] # 最近5次记录
+            'history': [record.to_dict() for record in history]
         }
\ No newline at end of file
@@ -0,0 +1,174 @@
+import json
+import os
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, Iterator, Optional
+
+# 每次写入的记录数(分块写出，内存占用与历史总量无关)
+CHUNK_SIZE = 1000
+
+def _dumps(record: Dict) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+def read_ndjson(path: str) -> Iterator[Dict]:
+    """逐行读取NDJSON历史文件，忽略空行和崩溃时写了一半的行"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+def write_ndjson(path: str, records: Iterable[Dict], chunk_size: int = CHUNK_SIZE) -> int:
+    """把记录流整体写成NDJSON文件(先写临时文件，落盘后原子替换)
+
+    Returns:
+        int: 写出的记录数
+    """
+    tmp_path = f"{path}.tmp"
+    count = 0
+    records = iter(records)
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        while True:
+            chunk = [_dumps(record) for record in islice(records, chunk_size)]
+            if not chunk:
+                break
+            f.writelines(chunk)
+            count += len(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return count
+
+def append_ndjson(path: str, records: Iterable[Dict], chunk_size: int = CHUNK_SIZE) -> int:
+    """在NDJSON文件末尾追加记录并落盘
+
+    上次追加中途崩溃留下的不完整末行先被截掉，避免与新记录粘在同一行。
+
+    Returns:
+        int: 追加的记录数
+    """
+    _truncate_partial_line(path)
+    count = 0
+    records = iter(records)
+    with open(path, 'a', encoding='utf-8') as f:
+        while True:
+            chunk = [_dumps(record) for record in islice(records, chunk_size)]
+            if not chunk:
+                break
+            f.writelines(chunk)
+            count += len(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    return count
+
+def _truncate_partial_line(path: str) -> None:
+    """截掉文件末尾没有换行符的不完整行"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b'\n':
+            return
+        # 从末尾向前按块查找最后一个换行符
+        pos = size
+        while pos > 0:
+            start = max(0, pos - 4096)
+            f.seek(start)
+            block = f.read(pos - start)
+            newline = block.rfind(b'\n')
+            if newline >= 0:
+                f.truncate(start + newline + 1)
+                return
+            pos = start
+        f.truncate(0)
+
+def mark_path(path: str) -> str:
+    """历史文件的写入标记: 与历史同名的 .mark.json"""
+    return os.path.splitext(path)[0] + '.mark.json'
+
+def read_mark(path: str) -> Optional[Dict]:
+    """读取历史文件的写入标记 {'journal_seq': 已包含到的日志序号, 'records': 有效记录数}，
+    没有或损坏时返回 None"""
+    try:
+        with open(mark_path(path), 'r', encoding='utf-8') as f:
+            mark = json.load(f)
+        return {'journal_seq': int(mark['journal_seq']), 'records': int(mark['records'])}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def write_mark(path: str, journal_seq: int, records: int) -> None:
+    """在历史写出并落盘之后更新写入标记(原子替换)
+
+    标记之外多出的记录(追加后、更新标记前中断)在加载时被忽略。
+    """
+    target = mark_path(path)
+    tmp_path = f"{target}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'journal_seq': journal_seq, 'records': records}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, target)
+
+def count_records(path: str) -> int:
+    """统计文件中的有效记录数"""
+    return sum(1 for _ in read_ndjson(path))
+
+def query_history(path: str, word: Optional[str] = None,
+                  since: Optional[datetime] = None) -> Iterator[Dict]:
+    """不载入全部历史，流式筛选某个单词和/或某个时间之后的记录"""
+    cutoff = since.strftime('%Y-%m-%d %H:%M:%S') if since is not None else None
+    for record in read_ndjson(path):
+        if word is not None and record['word'] != word:
+            continue
+        # 时间字符串为定长格式，可以直接按字符串比较
+        if cutoff is not None and record['timestamp'] < cutoff:
+            continue
+        yield record
+
+def is_legacy_json(path: str) -> bool:
+    """判断是否为旧的嵌套JSON格式({单词: [记录, ...]}，带缩进)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        first = f.readline()
+    if not first.strip():
+        return False
+    try:
+        record = json.loads(first)
+    except ValueError:
+        return True     # 带缩进的旧格式第一行只有 "{"
+    return not (isinstance(record, dict) and 'timestamp' in record)
+
+def iter_legacy_json(path: str) -> Iterator[Dict]:
+    """读取旧的嵌套JSON历史，按时间顺序产出扁平记录
+
+    旧格式无法逐行解析，这里整体读入一次，只用于一次性转换。
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    records = [
+        {'timestamp': record['timestamp'], 'score': record['score'],
+         'new_score': record['new_score'], 'word': word}
+        for word, word_records in data.items()
+        for record in word_records
+    ]
+    del data
+    records.sort(key=lambda record: record['timestamp'])
+    return iter(records)
+
+def convert_legacy(src: str, dst: str) -> int:
+    """把旧的嵌套JSON历史转换为NDJSON，返回记录数"""
+    return write_ndjson(dst, iter_legacy_json(src))
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) != 3:
+        print("用法: python -m core.history_file test_history.json test_history.ndjson")
+        sys.exit(1)
+    print(f"已转换 {convert_legacy(sys.argv[1], sys.argv[2])} 条记录")
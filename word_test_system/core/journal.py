@@ -0,0 +1,90 @@
+import json
+import os
+from typing import Dict, Iterator
+
+class Journal:
+    """追加写的测试事件日志
+
+    每次作答/跳过追加一行紧凑的JSON并立即落盘(fsync)，主数据文件只在
+    压缩(compaction)时整体写出，启动时把日志重放到上一次的快照之上。
+    每条事件带有递增的序号 'n'，快照记录它包含到的序号，重放时跳过
+    不大于该序号的事件(快照写出后、删除旧日志前中断也不会重复计入)。
+    """
+    def __init__(self, path: str, sync: bool = True):
+        self.path = path
+        self.rotated_path = path + '.1'   # 正在写快照时被切出的旧日志
+        self.sync = sync
+        self.seq = 0                      # 最后一条事件的序号
+        self._file = None
+
+    def append(self, event: Dict) -> None:
+        """追加一条事件(分配序号)"""
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self.seq += 1
+        event = dict(event, n=self.seq)
+        self._file.write(json.dumps(event, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+
+    def flush(self) -> None:
+        """确保已写入的事件落盘"""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def replay(self, after: int = 0) -> Iterator[Dict]:
+        """按顺序读取日志中序号大于 after 的事件(先旧日志后当前日志)，
+        忽略崩溃时写了一半的行；没有序号的旧事件总是重放"""
+        for event in self._read():
+            if event.get('n', after + 1) > after:
+                yield event
+
+    def _read(self) -> Iterator[Dict]:
+        for path in (self.rotated_path, self.path):
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+    def resume(self, base_seq: int) -> None:
+        """加载后接着日志和快照中最大的序号继续编号"""
+        self.seq = max([base_seq] + [event.get('n', 0) for event in self._read()])
+
+    def rotate(self) -> None:
+        """开始写快照前切出当前日志，之后的事件写入新日志"""
+        self.close()
+        if not os.path.exists(self.path):
+            return
+        if os.path.exists(self.rotated_path):
+            # 上一次快照未完成，把当前日志接在旧日志之后
+            with open(self.path, 'r', encoding='utf-8') as src, \
+                    open(self.rotated_path, 'a', encoding='utf-8') as dst:
+                dst.write(src.read())
+            os.remove(self.path)
+        else:
+            os.replace(self.path, self.rotated_path)
+
+    def discard_rotated(self) -> None:
+        """快照写出后删除已包含在快照中的旧日志"""
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+
+    def truncate(self) -> None:
+        """清空全部日志"""
+        self.close()
+        for path in (self.rotated_path, self.path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def close(self) -> None:
+        """关闭日志文件"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
@@ -0,0 +1,111 @@
+import queue
+import threading
+import time
+from typing import Optional, Set
+from .data_loader import DataLoader
+
+class PersistenceWorker:
+    """后台写回线程
+
+    交互线程只把变化的单词放进队列，由后台线程合并后按固定间隔
+    (settings.json 中的 auto_save_interval，单位秒)调用 save_data，
+    退出时保证最后写出一次。
+    """
+    _STOP = object()
+
+    def __init__(self, data_loader: DataLoader, interval: float = 5.0):
+        self.data_loader = data_loader
+        self.interval = interval
+        self.queue: queue.Queue = queue.Queue()
+        self.thread: Optional[threading.Thread] = None
+        self.saves = 0                 # 已完成的保存次数
+        self._dirty: Set[int] = set()
+
+    def start(self) -> None:
+        """启动后台线程"""
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(
+                target=self._run, name='PersistenceWorker', daemon=True
+            )
+            self.thread.start()
+
+    def notify(self, word_idx: int) -> None:
+        """标记某个单词的数据已变化"""
+        self.queue.put(word_idx)
+
+    def flush(self, wait: bool = True, timeout: Optional[float] = None) -> bool:
+        """立即保存积累的变化，wait 为 True 时等待保存完成"""
+        done = threading.Event()
+        self.queue.put(done)
+        if self.thread is None or not self.thread.is_alive():
+            self._drain()
+            self._save()
+            return True
+        return done.wait(timeout) if wait else True
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """停止后台线程，停止前写出全部变化
+
+        timeout 秒内后台保存没有完成(如在等待数据锁)时不再等待，只把事件
+        日志落盘(作答不会丢失，下次启动时重放)，返回 False。
+        """
+        if self.thread is None or not self.thread.is_alive():
+            self._drain()
+            self._save()
+            return True
+        self.queue.put(self._STOP)
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            self.data_loader.flush()
+            return False
+        return True
+
+    def _drain(self) -> None:
+        """在没有后台线程时把队列中的标记合并进脏集合"""
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is not self._STOP:
+                self._dirty.add(item)
+
+    def _save(self) -> None:
+        """执行一次保存"""
+        if not self._dirty:
+            return
+        self._dirty.clear()
+        self.data_loader.save_data()
+        self.saves += 1
+
+    def _run(self) -> None:
+        """后台循环: 合并变化，到期或收到请求时保存"""
+        deadline = None
+        try:
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is self._STOP:
+                    break
+                if isinstance(item, threading.Event):
+                    self._save()
+                    deadline = None
+                    item.set()
+                    continue
+                if item is not None:
+                    self._dirty.add(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.interval
+
+                if deadline is not None and time.monotonic() >= deadline:
+                    self._save()
+                    deadline = None
+        finally:
+            self._drain()
+            self._save()
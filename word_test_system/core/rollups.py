@@ -0,0 +1,144 @@
+import json
+import math
+import os
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Union
+
+from models.test_history import SKIP_CODE, TestHistory
+
+# 桶内各字段的下标
+ANSWERS, SKIPS, SCORE_SUM, MIN_SCORE, MAX_SCORE, NEW_WORDS, REVIEW_WORDS = range(7)
+RESOLUTIONS = ('day', 'hour')
+
+def bucket_key(timestamp: datetime, resolution: str) -> str:
+    """时间所在桶的键，按字符串排序即按时间排序"""
+    if resolution == 'day':
+        return timestamp.strftime('%Y-%m-%d')
+    return timestamp.strftime('%Y-%m-%d %H')
+
+class ProgressRollup:
+    """按天/小时预聚合的学习进度
+
+    由测试历史逐条累加: 每个桶记录作答数、跳过数、本次得分的和/最小/
+    最大值，以及首次作答的新单词数和复习(之前答过)的单词数。作答时
+    增量更新，查询最近N天只读取N个(或24N个)桶。
+    """
+    def __init__(self):
+        self.buckets: Dict[str, Dict[str, List]] = {res: {} for res in RESOLUTIONS}
+        self._keys: Dict[str, List[str]] = {res: [] for res in RESOLUTIONS}
+        self._seen = set()      # 已作答过的单词
+        self.count = 0          # 已累加的历史记录数
+        self.journal_seq = 0    # 写出时对应的历史包含到的日志序号
+
+    def add(self, word: str, score: Union[int, str], timestamp: datetime) -> None:
+        """累加一条历史记录"""
+        self.count += 1
+        skipped = score == 'skip'
+        if not skipped:
+            is_new = word not in self._seen
+            self._seen.add(word)
+
+        for resolution in RESOLUTIONS:
+            key = bucket_key(timestamp, resolution)
+            bucket = self.buckets[resolution].get(key)
+            if bucket is None:
+                bucket = [0, 0, 0, None, None, 0, 0]
+                self.buckets[resolution][key] = bucket
+                insort(self._keys[resolution], key)
+            if skipped:
+                bucket[SKIPS] += 1
+                continue
+            bucket[ANSWERS] += 1
+            bucket[SCORE_SUM] += score
+            bucket[MIN_SCORE] = score if bucket[MIN_SCORE] is None else min(bucket[MIN_SCORE], score)
+            bucket[MAX_SCORE] = score if bucket[MAX_SCORE] is None else max(bucket[MAX_SCORE], score)
+            bucket[NEW_WORDS if is_new else REVIEW_WORDS] += 1
+
+    def fold(self, history: TestHistory, start: int = 0) -> None:
+        """累加历史中从第 start 条开始的记录"""
+        for pos in range(start, len(history)):
+            code = history.scores[pos]
+            self.add(
+                history.words[history.word_ids[pos]],
+                'skip' if code == SKIP_CODE else code,
+                datetime.fromtimestamp(history.timestamps[pos])
+            )
+
+    @classmethod
+    def from_history(cls, history: TestHistory) -> 'ProgressRollup':
+        rollup = cls()
+        rollup.fold(history)
+        return rollup
+
+    def query(self, days: int = 30, resolution: str = 'day',
+              now: Optional[datetime] = None) -> Dict:
+        """最近 days 天的进度(格式同 Analyzer.get_learning_progress)"""
+        now = now or datetime.now()
+        start = bucket_key(now - timedelta(days=days), resolution)
+        keys = self._keys[resolution]
+        buckets = self.buckets[resolution]
+        progress = {
+            'dates': [], 'counts': [], 'avg_scores': [], 'min_scores': [],
+            'max_scores': [], 'skips': [], 'new_words': [], 'review_words': []
+        }
+        for key in keys[bisect_left(keys, start):]:
+            bucket = buckets[key]
+            answers = bucket[ANSWERS]
+            progress['dates'].append(key)
+            progress['counts'].append(answers)
+            progress['avg_scores'].append(bucket[SCORE_SUM] / answers if answers else math.nan)
+            progress['min_scores'].append(bucket[MIN_SCORE] if answers else math.nan)
+            progress['max_scores'].append(bucket[MAX_SCORE] if answers else math.nan)
+            progress['skips'].append(bucket[SKIPS])
+            progress['new_words'].append(bucket[NEW_WORDS])
+            progress['review_words'].append(bucket[REVIEW_WORDS])
+        return progress
+
+    def to_dict(self) -> Dict:
+        """可序列化的副本(不引用内部的桶，复制后可以在锁外写出)"""
+        return {
+            'count': self.count,
+            'buckets': {
+                resolution: {key: list(bucket) for key, bucket in buckets.items()}
+                for resolution, buckets in self.buckets.items()
+            },
+            'seen': sorted(self._seen)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ProgressRollup':
+        rollup = cls()
+        rollup.count = data['count']
+        rollup.journal_seq = data.get('journal_seq', 0)
+        for resolution in RESOLUTIONS:
+            rollup.buckets[resolution] = data['buckets'][resolution]
+            rollup._keys[resolution] = sorted(rollup.buckets[resolution])
+        rollup._seen = set(data['seen'])
+        return rollup
+
+    @staticmethod
+    def save(path: str, data: Dict) -> None:
+        """写出 to_dict 的结果(先写临时文件再替换)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, history: TestHistory, journal_seq: int = 0) -> 'ProgressRollup':
+        """读取保存的汇总并补上之后的历史
+
+        journal_seq 为历史已包含到的日志序号；文件不存在、损坏、比历史新
+        或与历史的序号不一致(历史和汇总有一个没有写出)时从历史重建。
+        """
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    rollup = cls.from_dict(json.load(f))
+                if rollup.journal_seq == journal_seq and rollup.count <= len(history):
+                    rollup.fold(history, rollup.count)
+                    return rollup
+            except (ValueError, KeyError, TypeError):
+                pass
+        return cls.from_history(history)
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+# 导出到Excel/历史记录时使用的时间格式
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+# 从未测试过的单词按该天数计算间隔
+UNTESTED_DAYS = 100
+# 以整数保存测试时间的数组中未测试单词的取值(与 NaT 的整数表示相同)
+NOT_TESTED = np.iinfo(np.int64).min
+# 内存中为datetime64、导出时转换为字符串的列
+DATETIME_COLUMNS = ('LastTested', 'Due')
+# 词库必须具备的列及其缺省值(Interval/Ease/Due 为间隔重复调度的状态)
+COLUMN_DEFAULTS = {
+    'Times': 0,
+    'Score': 0,
+    'LastTested': pd.NaT,
+    'SkipCount': 0,
+    'Interval': 0.0,
+    'Ease': 2.5,
+    'Due': pd.NaT
+}
+
+def parse_last_tested(series: pd.Series) -> pd.Series:
+    """把LastTested列转换为datetime64类型，已是该类型时原样返回"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    return pd.to_datetime(series, errors='coerce')
+
+def days_since_tested(series: pd.Series, now: datetime,
+                      fill: float = UNTESTED_DAYS) -> np.ndarray:
+    """距上次测试的整天数，未测试的单词取 fill，不会为负"""
+    last_tested = parse_last_tested(series)
+    days = (pd.Timestamp(now) - last_tested).dt.days.to_numpy(dtype=float, na_value=np.nan)
+    days = np.where(np.isnan(days), fill, days)
+    return np.maximum(days, 0)
+
+def format_last_tested(series: pd.Series) -> pd.Series:
+    """把LastTested列格式化为字符串，未测试的为空字符串"""
+    last_tested = parse_last_tested(series)
+    return last_tested.dt.strftime(TIME_FORMAT).astype(object).where(last_tested.notna(), '')
+
+def parse_datetime_columns(df: pd.DataFrame) -> None:
+    """把已有的时间列原地转换为datetime64"""
+    for col in DATETIME_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_last_tested(df[col])
+
+def to_export_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """生成用于导出Excel的副本，时间列转换回字符串"""
+    export = df.copy()
+    for col in DATETIME_COLUMNS:
+        if col in export.columns:
+            export[col] = format_last_tested(export[col])
+    return export
@@ -0,0 +1,527 @@
+"""多用户测试服务
+
+单词目录(Words/Page)在进程内只加载一次，所有会话共享且只读；每个用户
+只持有自己的紧凑进度数组(Times/Score/SkipCount/LastTested)。协议为
+TCP 上逐行的 JSON，请求与响应一一对应:
+
+    {"op": "login", "user": "alice"}
+    {"op": "next", "mode": "random"}        -> 单词信息(同 Tester.word_prompt)
+    {"op": "answer", "index": 12, "choice": "1"}
+    {"op": "stats"}
+    {"op": "logout"}
+
+在 word_test_system 目录下运行:
+
+    python -m core.server --data words.xlsx --port 8765 --save-interval 30
+    python -m core.server --data words.xlsx --simulate 1000 --answers 20
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .answer_sources import FEEDBACK_LEVELS, SKIP, QUIT, SimulatedLearner
+from .schema import NOT_TESTED, UNTESTED_DAYS
+from .topk import TopK
+from .weight_index import AliasSampler, FenwickTree
+from .word_selector import WordSelector
+from utils.logger import metrics
+
+DAY_NS = 86400 * 10**9
+# 用户名同时用作进度文件名
+USER_PATTERN = re.compile(r'^[\w\-]{1,64}$')
+MODES = ('random', 'focus', 'review')
+
+class WordCatalog:
+    """只读单词目录，所有用户共享"""
+    def __init__(self, words, pages):
+        self.words = np.asarray(words, dtype=object)
+        self.pages = np.asarray(pages, dtype=np.int32)
+        self.words.flags.writeable = False
+        self.pages.flags.writeable = False
+        self.positions = {word: pos for pos, word in enumerate(self.words)}
+        self.fingerprint = hashlib.sha1(
+            '\n'.join(self.words.tolist()).encode('utf-8')
+        ).hexdigest()[:16]
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'WordCatalog':
+        return cls(df['Words'].astype(str).tolist(), df['Page'].to_numpy())
+
+    @classmethod
+    def from_file(cls, file_path: str) -> 'WordCatalog':
+        """从单词文件加载目录(只取 Words/Page 两列)
+
+        以只读方式打开，不转换旧格式历史、不写事件日志，可以与正在使用
+        同一词库的命令行程序同时运行。
+        """
+        from .data_loader import DataLoader
+        from .storage import create_storage
+        loader = DataLoader(file_path, storage=create_storage(file_path, read_only=True))
+        try:
+            if not loader.load_data():
+                raise ValueError(f"加载单词文件失败: {file_path}")
+            return cls.from_frame(loader.df)
+        finally:
+            loader.storage.close()
+
+    def words_path(self, directory: str) -> str:
+        return os.path.join(directory, f'catalog-{self.fingerprint}.json')
+
+    def save_words(self, directory: str) -> None:
+        """在进度目录中保存一次单词列表，目录变化后用于对齐旧的进度文件"""
+        path = self.words_path(directory)
+        if not os.path.exists(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.words.tolist(), f, ensure_ascii=False)
+
+class UserProgress:
+    """单个用户的学习进度，按目录位置对齐的定长数组"""
+    def __init__(self, user: str, size: int):
+        self.user = user
+        self.times = np.zeros(size, dtype=np.int32)
+        self.score = np.zeros(size, dtype=np.int32)
+        self.skip_count = np.zeros(size, dtype=np.int32)
+        self.last_tested = np.full(size, NOT_TESTED, dtype=np.int64)
+        self.dirty = False
+        self.indexes: Dict[str, '_UserIndex'] = {}   # 各模式的抽样索引(不保存)
+
+    @property
+    def nbytes(self) -> int:
+        return self.times.nbytes + self.score.nbytes + self.skip_count.nbytes + self.last_tested.nbytes
+
+    def days_since_tested(self, now_ns: int) -> np.ndarray:
+        """距上次测试的整天数，未测试的单词按 UNTESTED_DAYS 计"""
+        days = np.maximum((now_ns - self.last_tested) // DAY_NS, 0).astype(float)
+        days[self.last_tested == NOT_TESTED] = UNTESTED_DAYS
+        return days
+
+    def answer(self, pos: int, score: int, now_ns: int) -> None:
+        self.times[pos] += 1
+        self.score[pos] += score
+        self.last_tested[pos] = now_ns
+        self.dirty = True
+
+    def skip(self, pos: int) -> None:
+        self.skip_count[pos] += 1
+        self.dirty = True
+
+    def word_info(self, catalog: WordCatalog, pos: int) -> Dict:
+        """单词信息，字段与 Tester.word_prompt 相同"""
+        return {
+            'index': int(pos),
+            'word': catalog.words[pos],
+            'page': int(catalog.pages[pos]),
+            'score': int(self.score[pos]),
+            'times': int(self.times[pos])
+        }
+
+    def stats(self) -> Dict:
+        tested = self.times > 0
+        return {
+            'user': self.user,
+            'total_words': len(self.times),
+            'tested_words': int(tested.sum()),
+            'answers': int(self.times.sum()),
+            'skips': int(self.skip_count.sum()),
+            'avg_score': float(self.score[tested].mean()) if tested.any() else 0.0
+        }
+
+    def save(self, path: str, catalog: WordCatalog) -> None:
+        """保存到npz文件(先写临时文件再替换)
+
+        单词列表不随每个用户保存，只记录目录指纹(见 WordCatalog.save_words)。
+        """
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                catalog=np.array(catalog.fingerprint),
+                times=self.times,
+                score=self.score,
+                skip_count=self.skip_count,
+                last_tested=self.last_tested
+            )
+        os.replace(tmp_path, path)
+        self.dirty = False
+
+    @classmethod
+    def load(cls, user: str, path: str, catalog: WordCatalog) -> 'UserProgress':
+        """读取进度文件
+
+        保存时的目录与当前不同时，用同目录下该指纹的单词列表按单词对齐，
+        当前目录中已不存在的单词被丢弃。
+        """
+        progress = cls(user, len(catalog))
+        with np.load(path) as data:
+            fingerprint = str(data['catalog'])
+            if fingerprint == catalog.fingerprint:
+                target = source = slice(None)
+            else:
+                words_path = os.path.join(os.path.dirname(path), f'catalog-{fingerprint}.json')
+                with open(words_path, 'r', encoding='utf-8') as f:
+                    words = json.load(f)
+                pairs = [(catalog.positions[w], i) for i, w in enumerate(words) if w in catalog.positions]
+                target = np.array([p[0] for p in pairs], dtype=np.int64)
+                source = np.array([p[1] for p in pairs], dtype=np.int64)
+            for name in ('times', 'score', 'skip_count', 'last_tested'):
+                getattr(progress, name)[target] = data[name][source]
+        return progress
+
+class _UserIndex:
+    """单个用户在一种模式下的抽样索引(与 WordSelector 的 _ModeIndex 相同)
+
+    登录后第一次抽词时构建，之后每次作答只更新该单词的权重；
+    时间权重按构建时刻计算，超过 selector.INDEX_MAX_AGE 后重建。
+    """
+    def __init__(self, selector: WordSelector, progress: UserProgress, mode: str):
+        self.selector = selector
+        self.mode = mode
+        self.built_ns = time.time_ns()
+        scores = progress.score.astype(float)
+        days = progress.days_since_tested(self.built_ns)
+        weights = selector.weights_from_arrays(scores, progress.times, days, mode)
+        self.topk: Optional[TopK] = None
+        if mode == 'focus':
+            self.topk = TopK(scores, selector.top_k['focus'])
+        if mode == 'random':
+            self.tree = AliasSampler(weights, selector.ALIAS_MAX_UPDATES, selector.ALIAS_MAX_DRIFT)
+        else:
+            self.tree = FenwickTree(weights)
+
+    def is_stale(self) -> bool:
+        return time.time_ns() - self.built_ns > self.selector.INDEX_MAX_AGE.total_seconds() * 1e9
+
+    def update(self, progress: UserProgress, pos: int) -> None:
+        """某个单词作答后更新其权重"""
+        if self.topk is not None:
+            topk = self.topk
+            changed = topk.update(pos, float(progress.score[pos]))
+            for row in set(changed) | {pos}:
+                in_focus = row in topk and topk.keys[row] <= 0
+                self.tree.update(row, 1.0 if in_focus else 0.0)
+            return
+        weight = self.selector.weights_from_arrays(
+            progress.score[pos:pos + 1], progress.times[pos:pos + 1],
+            self._days(progress, pos), self.mode
+        )
+        self.tree.update(pos, float(weight[0]))
+
+    def _days(self, progress: UserProgress, pos: int) -> np.ndarray:
+        last_tested = int(progress.last_tested[pos])
+        if last_tested == NOT_TESTED:
+            return np.array([float(UNTESTED_DAYS)])
+        return np.array([float(max((self.built_ns - last_tested) // DAY_NS, 0))])
+
+    def sample(self, rng: np.random.RandomState) -> int:
+        return self.tree.sample(rng)
+
+class _Session:
+    """一个连接的会话状态"""
+    def __init__(self):
+        self.progress: Optional[UserProgress] = None
+        self.rng = np.random.RandomState()
+
+class SessionServer:
+    """基于 asyncio 的多用户测试服务
+
+    所有请求都在事件循环线程中同步处理，同一用户的多个连接共享一份
+    进度且不需要加锁；每个用户按模式持有抽样索引，作答只更新一个单词。
+    有变化的进度每隔 save_interval 秒写回 data_dir，用户最后一个连接
+    断开时也写回并从内存中移除。
+    """
+    def __init__(self, catalog: WordCatalog, data_dir: Optional[str] = None,
+                 selector: Optional[WordSelector] = None, save_interval: float = 30):
+        self.catalog = catalog
+        self.data_dir = data_dir
+        self.selector = selector or WordSelector()
+        self.save_interval = save_interval
+        self.users: Dict[str, UserProgress] = {}
+        self._connections: Dict[str, int] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._autosave: Optional[asyncio.Task] = None
+        if data_dir:
+            os.makedirs(data_dir, exist_ok=True)
+            catalog.save_words(data_dir)
+
+    # ---- 用户进度 ----
+
+    def _user_path(self, user: str) -> Optional[str]:
+        return os.path.join(self.data_dir, f'{user}.npz') if self.data_dir else None
+
+    def _acquire(self, user: str) -> UserProgress:
+        progress = self.users.get(user)
+        if progress is None:
+            path = self._user_path(user)
+            if path and os.path.exists(path):
+                progress = UserProgress.load(user, path, self.catalog)
+            else:
+                progress = UserProgress(user, len(self.catalog))
+            self.users[user] = progress
+        self._connections[user] = self._connections.get(user, 0) + 1
+        return progress
+
+    def _release(self, progress: UserProgress) -> None:
+        user = progress.user
+        self._connections[user] -= 1
+        if self._connections[user] > 0:
+            return
+        del self._connections[user]
+        self.save_user(progress)
+        del self.users[user]
+
+    def save_user(self, progress: UserProgress) -> None:
+        path = self._user_path(progress.user)
+        if path and progress.dirty:
+            progress.save(path, self.catalog)
+
+    def save_all(self) -> None:
+        for progress in list(self.users.values()):
+            self.save_user(progress)
+
+    async def _autosave_loop(self) -> None:
+        """定期写回有变化的用户进度"""
+        while True:
+            await asyncio.sleep(self.save_interval)
+            try:
+                self.save_all()
+            except OSError as e:
+                print(f"保存用户进度时出错: {e}")
+
+    # ---- 请求处理 ----
+
+    def _index(self, progress: UserProgress, mode: str) -> _UserIndex:
+        """获取(必要时构建)用户在该模式下的抽样索引"""
+        index = progress.indexes.get(mode)
+        if index is None or index.is_stale():
+            index = _UserIndex(self.selector, progress, mode)
+            progress.indexes[mode] = index
+        return index
+
+    def select_position(self, session: _Session, mode: str) -> int:
+        """按模式为会话用户抽取一个单词位置"""
+        return self._index(session.progress, mode).sample(session.rng)
+
+    def handle(self, session: _Session, request: Dict) -> Dict:
+        """处理一个请求，返回响应字典"""
+        op = request.get('op')
+        metrics.count('server.requests', op=str(op))
+
+        if op == 'login':
+            user = str(request.get('user', ''))
+            if not USER_PATTERN.match(user):
+                return {'ok': False, 'error': f"无效的用户名: {user!r}"}
+            if session.progress is not None:
+                self._release(session.progress)
+            session.progress = self._acquire(user)
+            return {'ok': True, 'user': user, 'total_words': len(self.catalog)}
+
+        if op == 'logout':
+            if session.progress is not None:
+                self._release(session.progress)
+                session.progress = None
+            return {'ok': True}
+
+        if session.progress is None:
+            return {'ok': False, 'error': '请先登录'}
+        progress = session.progress
+
+        if op == 'next':
+            mode = request.get('mode', 'random')
+            if mode not in MODES:
+                return {'ok': False, 'error': f"无效的测试模式: {mode!r}"}
+            pos = self.select_position(session, mode)
+            return {'ok': True, **progress.word_info(self.catalog, pos)}
+
+        if op == 'answer':
+            pos = request.get('index')
+            # bool 是 int 的子类，JSON 的 true/false 不能作为索引
+            if type(pos) is not int or not 0 <= pos < len(self.catalog):
+                return {'ok': False, 'error': f"无效的单词索引: {pos!r}"}
+            choice = str(request.get('choice', '')).strip().lower()
+            if choice in FEEDBACK_LEVELS:
+                score = int(choice)
+                progress.answer(pos, score, time.time_ns())
+                for index in progress.indexes.values():
+                    index.update(progress, pos)
+                return {'ok': True, 'result': 'continue', 'score': score}
+            if choice == SKIP:
+                progress.skip(pos)
+                return {'ok': True, 'result': 'skip', 'score': None}
+            return {'ok': False, 'error': f"无效的作答选项: {choice!r}"}
+
+        if op == 'stats':
+            return {'ok': True, **progress.stats()}
+
+        return {'ok': False, 'error': f"未知的操作: {op!r}"}
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter) -> None:
+        session = _Session()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    # 超长的行已被丢弃，回复错误后继续读取
+                    line = None
+                    response = {'ok': False, 'error': '请求过长'}
+                if line == b'':
+                    break
+                if line is not None:
+                    response = self._respond(session, line)
+                writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if session.progress is not None:
+                self._release(session.progress)
+            writer.close()
+
+    def _respond(self, session: _Session, line: bytes) -> Dict:
+        """解析并处理一行请求；出错时返回错误响应而不是断开连接"""
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('请求必须是JSON对象')
+        except ValueError as e:
+            return {'ok': False, 'error': f"无效的请求: {e}"}
+        try:
+            return self.handle(session, request)
+        except Exception as e:
+            metrics.count('server.errors', op=str(request.get('op')))
+            return {'ok': False, 'error': f"处理请求时出错: {e}"}
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0, backlog: int = 4096):
+        """开始监听，返回实际的 (host, port)"""
+        self._server = await asyncio.start_server(
+            self._handle_connection, host, port, backlog=backlog
+        )
+        if self.data_dir and self.save_interval and self.save_interval > 0:
+            self._autosave = asyncio.get_running_loop().create_task(self._autosave_loop())
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def close(self) -> None:
+        """停止监听并保存仍在内存中的用户进度"""
+        if self._autosave is not None:
+            self._autosave.cancel()
+            self._autosave = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self.save_all()
+
+class SessionClient:
+    """逐行JSON协议的客户端"""
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host: str, port: int) -> 'SessionClient':
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, op: str, **fields) -> Dict:
+        self.writer.write(json.dumps({'op': op, **fields}).encode('utf-8') + b'\n')
+        await self.writer.drain()
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError('服务端关闭了连接')
+        return json.loads(line)
+
+    async def close(self) -> None:
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+async def simulate_user(host: str, port: int, user: str, answers: int = 20,
+                        mode: str = 'random', seed: Optional[int] = None) -> int:
+    """一个模拟学习者登录并连续作答，返回实际作答(含跳过)次数"""
+    client = await SessionClient.connect(host, port)
+    learner = SimulatedLearner(max_answers=answers, seed=seed)
+    done = 0
+    try:
+        await client.request('login', user=user)
+        while True:
+            word = await client.request('next', mode=mode)
+            choice = learner.ask(word)
+            if choice == QUIT:
+                break
+            await client.request('answer', index=word['index'], choice=choice)
+            done += 1
+        await client.request('logout')
+    finally:
+        await client.close()
+    return done
+
+async def simulate(host: str, port: int, users: int, answers: int = 20,
+                   mode: str = 'random', concurrency: int = 1000) -> Dict:
+    """并发运行多个模拟用户，返回总作答数和吞吐量"""
+    limit = asyncio.Semaphore(concurrency)
+
+    async def run(i: int) -> int:
+        async with limit:
+            return await simulate_user(host, port, f'user{i:05d}', answers, mode, seed=i)
+
+    started = time.perf_counter()
+    done: List[int] = await asyncio.gather(*(run(i) for i in range(users)))
+    elapsed = time.perf_counter() - started
+    total = sum(done)
+    return {
+        'users': users,
+        'answers': total,
+        'seconds': elapsed,
+        'answers_per_second': total / elapsed if elapsed > 0 else 0.0
+    }
+
+async def _serve(args) -> None:
+    catalog = WordCatalog.from_file(args.data)
+    server = SessionServer(catalog, args.data_dir, save_interval=args.save_interval)
+    host, port = await server.start(args.host, args.port)
+    print(f"[{datetime.now():%H:%M:%S}] 已加载 {len(catalog)} 个单词，监听 {host}:{port}")
+    try:
+        if args.simulate:
+            result = await simulate(host, port, args.simulate, args.answers, args.mode)
+            print(f"{result['users']} 个用户共作答 {result['answers']} 次，"
+                  f"用时 {result['seconds']:.2f} 秒 ({result['answers_per_second']:.0f} 次/秒)")
+        else:
+            await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='单词测试多用户服务')
+    parser.add_argument('--data', required=True, help='单词文件(只读取 Words/Page)')
+    parser.add_argument('--data-dir', default='users', help='用户进度保存目录')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--simulate', type=int, default=0,
+                        help='启动后用指定数量的模拟用户压测，结束后退出')
+    parser.add_argument('--answers', type=int, default=20, help='每个模拟用户的作答次数')
+    parser.add_argument('--mode', choices=MODES, default='random')
+    parser.add_argument('--save-interval', type=float, default=30,
+                        help='定期写回有变化的用户进度的间隔(秒)，0为只在断开时写回')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+
+class DeckSnapshot:
+    """词库的列式二进制快照
+
+    每列保存为一个 .npy 文件(字符串列保存为定长字符串表)；Excel 仅作为
+    导入/导出格式。加载时数值列和时间列以写时复制(copy-on-write)方式内存
+    映射，直接作为DataFrame的列，不解析也不复制，只有被修改的页才会复制
+    到内存(修改不会写回快照文件)；字符串列需要还原为Python字符串。
+    Windows 不能替换仍被映射的文件，在那里加载时复制全部列。
+    """
+    VERSION = 1
+    META_FILE = 'meta.json'
+    # 是否在加载时复制列数据而不保留内存映射
+    COPY_ON_LOAD = os.name == 'nt'
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def exists(self) -> bool:
+        """快照是否存在"""
+        return os.path.exists(os.path.join(self.path, self.META_FILE))
+
+    def is_newer_than(self, file_path: str) -> bool:
+        """快照是否比指定文件新(文件不存在时视为更新)"""
+        if not self.exists():
+            return False
+        if not os.path.exists(file_path):
+            return True
+        meta_mtime = os.path.getmtime(os.path.join(self.path, self.META_FILE))
+        return meta_mtime >= os.path.getmtime(file_path)
+
+    def save(self, df: pd.DataFrame, journal_seq: int = 0) -> None:
+        """写出快照(先写临时目录再整体替换)
+
+        journal_seq 为快照已包含的最后一条日志事件的序号。
+        """
+        tmp_path = f"{self.path}.tmp"
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+
+        columns: List[Dict] = []
+        for i, name in enumerate(df.columns):
+            kind, values = self._encode(df[name])
+            file_name = f"col{i}.npy"
+            np.save(os.path.join(tmp_path, file_name), values, allow_pickle=False)
+            columns.append({'name': str(name), 'kind': kind, 'file': file_name})
+
+        with open(os.path.join(tmp_path, self.META_FILE), 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': self.VERSION,
+                'rows': len(df),
+                'journal_seq': journal_seq,
+                'columns': columns
+            }, f, ensure_ascii=False)
+
+        # 替换旧快照
+        old_path = f"{self.path}.old"
+        if os.path.exists(self.path):
+            if os.path.exists(old_path):
+                shutil.rmtree(old_path)
+            os.rename(self.path, old_path)
+        os.rename(tmp_path, self.path)
+        if os.path.exists(old_path):
+            shutil.rmtree(old_path)
+
+    def read_meta(self) -> Dict:
+        with open(os.path.join(self.path, self.META_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def journal_seq(self) -> int:
+        """快照已包含的最后一条日志事件的序号(没有快照时为0)"""
+        if not self.exists():
+            return 0
+        return self.read_meta().get('journal_seq', 0)
+
+    def load(self) -> pd.DataFrame:
+        """以写时复制的内存映射方式加载快照"""
+        meta = self.read_meta()
+        if meta.get('version') != self.VERSION:
+            raise ValueError(f"不支持的快照版本: {meta.get('version')}")
+
+        data = {}
+        for column in meta['columns']:
+            values = np.load(
+                os.path.join(self.path, column['file']),
+                mmap_mode=None if self.COPY_ON_LOAD else 'c',
+                allow_pickle=False
+            )
+            data[column['name']] = self._decode(column['kind'], values)
+        # copy=False: 各列直接引用映射的数组
+        return pd.DataFrame(data, copy=False)
+
+    def _encode(self, series: pd.Series):
+        """把一列编码为 (类型, numpy数组)"""
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            return 'numeric', series.to_numpy()
+        if pd.api.types.is_datetime64_any_dtype(series):
+            values = series.to_numpy(dtype='datetime64[ns]').view(np.int64)
+            return 'datetime', values
+        values = series.astype(object).where(series.notna(), '').astype(str)
+        return 'string', values.to_numpy(dtype=str)
+
+    def _decode(self, kind: str, values: np.ndarray):
+        """把 numpy 数组还原为列数据"""
+        if kind == 'numeric':
+            # 写时复制的映射是可写的，作答时原地修改只复制被改到的页
+            return values
+        if kind == 'string':
+            return values.astype(object)
+        if kind == 'datetime':
+            return values.view('datetime64[ns]')
+        raise ValueError(f"快照中的列类型未知: {kind}")
@@ -0,0 +1,113 @@
+import heapq
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+# 间隔重复(SM-2)参数
+MIN_EASE = 1.3
+# 回答失败后重新学习的等待时间
+RELEARN_DELAY = timedelta(minutes=10)
+# 未学习过的单词在到期数组中的标记
+NEW = np.iinfo(np.int64).max
+
+def review(interval: float, ease: float, score: int) -> Tuple[float, float, timedelta]:
+    """SM-2 调度: 根据本次得分计算新的间隔(天)、难度系数和距下次到期的时长
+
+    得分 -2~2 对应 SM-2 的回答质量 1~5，质量低于3视为遗忘。
+    """
+    quality = min(max(score + 3, 0), 5)
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+
+    if quality < 3:
+        return 0.0, ease, RELEARN_DELAY
+    if interval < 1:
+        interval = 1.0
+    elif interval < 6:
+        interval = 6.0
+    else:
+        interval = round(interval * ease, 1)
+    return interval, ease, timedelta(days=interval)
+
+class DueQueue:
+    """到期队列
+
+    已学习的单词按到期时间放在最小堆中，未学习的单词按词库顺序放在
+    另一个堆中；单词变化时只压入新条目，旧条目在弹出时按到期数组
+    判断是否过期(惰性删除)，取下一个到期单词为 O(log N)。
+    选择顺序: 已到期的复习 -> 新单词 -> 最早将要到期的复习。
+    """
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.due = self._due_array(df['Due'])
+        positions = np.arange(len(df))
+        reviewed = self.due != NEW
+        self._reviews = list(zip(self.due[reviewed].tolist(), positions[reviewed].tolist()))
+        heapq.heapify(self._reviews)
+        self._new = positions[~reviewed].tolist()   # 升序列表本身即为合法的堆
+
+    def __len__(self) -> int:
+        return len(self.due)
+
+    @staticmethod
+    def _due_array(series: pd.Series) -> np.ndarray:
+        """到期时间(纳秒)，未学习的为 NEW"""
+        due = pd.to_datetime(series).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        due[pd.isna(series).to_numpy()] = NEW
+        return due
+
+    def update_row(self, pos: int) -> None:
+        """某一行的到期时间变化后重新入堆"""
+        value = self.df['Due'].iat[pos]
+        due = NEW if pd.isna(value) else pd.Timestamp(value).value
+        self.due[pos] = due
+        if due == NEW:
+            heapq.heappush(self._new, pos)
+        else:
+            heapq.heappush(self._reviews, (int(due), pos))
+
+    def _clean(self) -> None:
+        """丢弃两个堆顶的过期条目"""
+        while self._reviews and self.due[self._reviews[0][1]] != self._reviews[0][0]:
+            heapq.heappop(self._reviews)
+        while self._new and self.due[self._new[0]] != NEW:
+            heapq.heappop(self._new)
+
+    def _pop(self, now_ns: int) -> Optional[tuple]:
+        """按选择顺序弹出一个条目"""
+        self._clean()
+        if self._reviews and self._reviews[0][0] <= now_ns:
+            return heapq.heappop(self._reviews)
+        if self._new:
+            return (NEW, heapq.heappop(self._new))
+        if self._reviews:
+            return heapq.heappop(self._reviews)
+        return None
+
+    def _push(self, entry: tuple) -> None:
+        if entry[0] == NEW:
+            heapq.heappush(self._new, entry[1])
+        else:
+            heapq.heappush(self._reviews, entry)
+
+    def take(self, k: int, now: Optional[datetime] = None) -> List[int]:
+        """按到期顺序取出k个不同单词的位置(不改变队列)"""
+        now_ns = pd.Timestamp(now or datetime.now()).value
+        popped = []
+        positions = []
+        while len(positions) < k:
+            entry = self._pop(now_ns)
+            if entry is None:
+                break
+            popped.append(entry)
+            # 同一单词可能留有多个到期时间相同的条目
+            if entry[1] not in positions:
+                positions.append(entry[1])
+        for entry in popped:
+            self._push(entry)
+        return positions
+
+    def next_due(self, now: Optional[datetime] = None) -> Optional[int]:
+        """下一个应测试单词的位置"""
+        positions = self.take(1, now)
+        return positions[0] if positions else None
@@ -0,0 +1,433 @@
+import os
+import pathlib
+import re
+import sqlite3
+import threading
+import zipfile
+import pandas as pd
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+from .history_file import (
+    append_ndjson, convert_legacy, is_legacy_json, iter_legacy_json, mark_path, read_mark,
+    read_ndjson, write_mark, write_ndjson
+)
+from .journal import Journal
+from .snapshot import DeckSnapshot
+from .schema import TIME_FORMAT, parse_datetime_columns, to_export_frame
+from models.test_history import TestHistory, SKIP_CODE
+from utils.backup import Backup
+
+# 旧版本所有词库共用的测试历史文件(位于词库所在目录)
+LEGACY_HISTORY_FILE = 'test_history.json'
+
+def history_path(file_path: str) -> str:
+    """词库对应的测试历史文件: 与词库同名的 .history.json"""
+    return os.path.splitext(file_path)[0] + '.history.json'
+
+def rollup_path(file_path: str) -> str:
+    """词库对应的学习进度汇总文件: 与词库同名的 .rollup.json"""
+    return os.path.splitext(file_path)[0] + '.rollup.json'
+
+class StorageBackend:
+    """存储后端接口
+
+    DataLoader 通过它加载/保存词库与测试历史；每次作答通过
+    record_event 持久化，save 则写出完整快照。
+    """
+    # 加载的测试历史已包含到的日志序号(没有事件日志的后端为0)
+    history_seq = 0
+
+    def load(self) -> Tuple[pd.DataFrame, TestHistory]:
+        """加载词库和测试历史"""
+        raise NotImplementedError
+
+    def pending_events(self) -> Iterable[Tuple[Dict, bool, bool]]:
+        """上次快照之后尚未合并的作答事件，由 DataLoader 重放
+
+        产出 (事件, 是否更新词库, 是否追加历史): 词库和历史分开保存，
+        中途失败时两者包含到的事件可能不同。
+        """
+        return []
+
+    def record_event(self, df: pd.DataFrame, word_idx: int, event: Dict) -> None:
+        """持久化一次作答/跳过(df 中该行已是更新后的数据)"""
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """确保已记录的事件落盘"""
+
+    def checkpoint(self) -> int:
+        """在复制待保存数据的同时调用(持有数据锁)，标记快照包含的事件范围
+
+        Returns:
+            int: 快照包含到的日志序号
+        """
+        return 0
+
+    def save(self, df: pd.DataFrame, history: TestHistory) -> None:
+        """写出完整快照"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """释放资源"""
+
+# 写入Excel文档属性(identifier)中的日志序号，标记文件已包含的作答
+EXCEL_SEQ_PREFIX = 'journal-seq:'
+
+def read_excel_journal_seq(file_path: str) -> int:
+    """读取Excel文件已包含的日志序号(只解析文档属性，不读表格)，没有时为0"""
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            core = archive.read('docProps/core.xml').decode('utf-8')
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return 0
+    match = re.search(r'<dc:identifier>' + re.escape(EXCEL_SEQ_PREFIX) + r'(\d+)</dc:identifier>', core)
+    return int(match.group(1)) if match else 0
+
+class ExcelStorage(StorageBackend):
+    """Excel + JSON 存储: 作答写事件日志，保存时写出Excel、二进制快照和历史
+
+    测试历史为NDJSON(每行一条记录)，默认为与词库同名的 .history.json
+    (见 history_path)，加载时逐行解析，保存时只追加上次保存之后的新记录；
+    旧的嵌套JSON格式在第一次加载时原地转换。旧版本词库目录下共用的
+    test_history.json 在第一次加载时移为该词库的历史。
+    sync 为 False 时事件日志不逐条 fsync(只在 flush 时落盘)，用于模拟和压测。
+    Excel、二进制快照和测试历史(写入标记)各自记录已包含到的日志序号，
+    加载时词库和历史分别只重放之后的事件。保存时最先写出历史，之后的
+    步骤失败也不会丢失历史。
+    read_only 为 True 时加载不写任何文件(旧格式历史只读取不转换)。
+    """
+    def __init__(self, file_path: str, history_file: Optional[str] = None,
+                 backup_dir: str = 'backups', sync: bool = True, read_only: bool = False):
+        self.file_path = file_path
+        self.history_file = history_file or history_path(file_path)
+        self.read_only = read_only
+        self.backup_dir = backup_dir
+        self.backup = None
+        self._saved_history: Optional[int] = None    # 历史文件中的记录数(加载前未知)
+        self.journal = Journal(os.path.splitext(file_path)[0] + '.journal', sync=sync)
+        self.snapshot = DeckSnapshot(os.path.splitext(file_path)[0] + '.deck')
+        self._base_seq = 0          # 加载的词库已包含到的日志序号
+        self.history_seq = 0        # 加载的测试历史已包含到的日志序号
+        self._checkpoint_seq = 0    # 正在保存的数据包含到的日志序号
+
+    def load(self) -> Tuple[pd.DataFrame, TestHistory]:
+        # 二进制快照比Excel新时优先使用快照，否则从Excel导入
+        if self.snapshot.is_newer_than(self.file_path):
+            df = self.snapshot.load()
+            self._base_seq = self.snapshot.journal_seq()
+        else:
+            df = pd.read_excel(self.file_path)
+            self._base_seq = read_excel_journal_seq(self.file_path)
+
+        self._adopt_shared_history()
+        records = read_ndjson(self.history_file)
+        if os.path.exists(self.history_file) and is_legacy_json(self.history_file):
+            if self.read_only:
+                records = iter_legacy_json(self.history_file)
+            else:
+                convert_legacy(self.history_file, self.history_file)
+        # 没有写入标记的历史(旧版本保存)视为与词库同步
+        mark = read_mark(self.history_file)
+        records = iter(records)
+        if mark is None:
+            history = TestHistory.from_records(records)
+            self.history_seq = self._base_seq
+        else:
+            history = TestHistory.from_records(islice(records, mark['records']))
+            self.history_seq = mark['journal_seq']
+        self._saved_history = len(history)
+        if next(records, None) is not None:
+            # 追加历史后、更新标记前中断: 多出的记录由日志重放补上，下次保存时整体重写
+            self._saved_history = None
+        self.journal.resume(max(self._base_seq, self.history_seq))
+        return df, history
+
+    def _adopt_shared_history(self) -> None:
+        """词库还没有自己的历史时，接管旧版本共用的 test_history.json
+
+        只读打开时直接读取共用文件，不移动。
+        """
+        if os.path.exists(self.history_file):
+            return
+        shared = os.path.join(os.path.dirname(self.file_path), LEGACY_HISTORY_FILE)
+        if not os.path.exists(shared) or os.path.abspath(shared) == os.path.abspath(self.history_file):
+            return
+        if self.read_only:
+            self.history_file = shared
+            return
+        os.replace(shared, self.history_file)
+        if os.path.exists(mark_path(shared)):
+            os.replace(mark_path(shared), mark_path(self.history_file))
+
+    def pending_events(self) -> Iterable[Tuple[Dict, bool, bool]]:
+        for event in self.journal.replay(min(self._base_seq, self.history_seq)):
+            seq = event.get('n')
+            yield (event,
+                   seq is None or seq > self._base_seq,
+                   seq is None or seq > self.history_seq)
+
+    def record_event(self, df: pd.DataFrame, word_idx: int, event: Dict) -> None:
+        self.journal.append(event)
+
+    def flush(self) -> None:
+        self.journal.flush()
+
+    def checkpoint(self) -> int:
+        # 之后的作答写入新日志，快照写完只删除被切出的部分
+        self.journal.rotate()
+        self._checkpoint_seq = self.journal.seq
+        return self._checkpoint_seq
+
+    def save(self, df: pd.DataFrame, history: TestHistory) -> None:
+        if self.read_only:
+            raise PermissionError(f"只读打开的词库不能保存: {self.file_path}")
+        seq = self._checkpoint_seq
+
+        # 测试历史最先写出，落盘后再更新标记: 之后的步骤失败时词库由日志重放补齐，
+        # 历史不会因为词库的日志序号已前移而丢失
+        # 只追加新记录；文件内容未知或记录比文件中少(如换了一份历史)时整体重写
+        if (self._saved_history is None or len(history) < self._saved_history
+                or not os.path.exists(self.history_file)):
+            write_ndjson(self.history_file, history.iter_records())
+        else:
+            append_ndjson(self.history_file, history.iter_records(self._saved_history))
+        self._saved_history = len(history)
+        write_mark(self.history_file, seq, len(history))
+
+        # 保存主文件(先写临时文件再替换，避免写到一半损坏快照)
+        export = to_export_frame(df)
+        tmp_file = f"{self.file_path}.tmp.xlsx"
+        with pd.ExcelWriter(tmp_file, engine='openpyxl') as writer:
+            export.to_excel(writer, index=False)
+            writer.book.properties.identifier = f"{EXCEL_SEQ_PREFIX}{seq}"
+        os.replace(tmp_file, self.file_path)
+
+        # 二进制快照写在Excel之后，保证下次启动优先加载快照
+        self.snapshot.save(df, seq)
+
+        # 增量备份快照: 按列存储，未变化的列与上次备份共享数据块
+        if self.backup is None:
+            self.backup = Backup(self.backup_dir)
+        self.backup.create_backup(self.snapshot.path, 'auto')
+
+        # 快照和历史已包含切出日志中的全部作答
+        self.journal.discard_rotated()
+
+    def close(self) -> None:
+        self.journal.close()
+
+class SQLiteStorage(StorageBackend):
+    """SQLite 存储
+
+    使用 WAL 模式，words 表按行号索引、history 表按单词和时间索引；
+    每次作答只执行一条单行 UPDATE 和一条 INSERT，按批提交事务。
+    read_only 为 True 时以只读模式打开，不修改数据库(也不建表)。
+    """
+    # 每累计这么多条事件提交一次事务
+    BATCH_SIZE = 20
+
+    def __init__(self, db_path: str, batch_size: Optional[int] = None, read_only: bool = False):
+        self.db_path = db_path
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.read_only = read_only
+        self.lock = threading.RLock()
+        if read_only:
+            uri = pathlib.Path(os.path.abspath(db_path)).as_uri() + '?mode=ro'
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self._create_tables()
+        self._columns: List[str] = []        # words 表中除 Words 外的列
+        self._datetime_columns: List[str] = []
+        self._update_sql = ''
+        self._pending = 0                    # 未提交的事件数
+        self._saved_history = 0              # 已写入数据库的历史记录数
+        self._word_ids: Dict[str, int] = {}
+
+    def _create_tables(self) -> None:
+        """创建表和索引"""
+        with self.conn:
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS words ('
+                'id INTEGER PRIMARY KEY, "Words" TEXT NOT NULL)'
+            )
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_words_word ON words ("Words")')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS columns ('
+                'name TEXT PRIMARY KEY, kind TEXT NOT NULL, position INTEGER NOT NULL)'
+            )
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS history ('
+                'id INTEGER PRIMARY KEY, word_id INTEGER NOT NULL, '
+                'score INTEGER NOT NULL, new_score REAL NOT NULL, ts INTEGER NOT NULL)'
+            )
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_history_word ON history (word_id, ts)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_history_ts ON history (ts)')
+
+    @staticmethod
+    def _quote(name: str) -> str:
+        return '"' + name.replace('"', '""') + '"'
+
+    def _load_columns(self) -> None:
+        """读取列定义"""
+        rows = self.conn.execute('SELECT name, kind FROM columns ORDER BY position').fetchall()
+        self._columns = [name for name, _ in rows]
+        self._datetime_columns = [name for name, kind in rows if kind == 'datetime']
+        # 语句文本固定，sqlite3 会复用已编译的语句
+        assignments = ', '.join(f'{self._quote(name)} = ?' for name in self._columns)
+        self._update_sql = f'UPDATE words SET {assignments} WHERE id = ?'
+
+    def _ensure_columns(self, df: pd.DataFrame) -> None:
+        """按 DataFrame 的列补齐 words 表结构"""
+        self._load_columns()
+        for name in df.columns:
+            if name == 'Words' or name in self._columns:
+                continue
+            series = df[name]
+            if pd.api.types.is_datetime64_any_dtype(series):
+                kind, sql_type = 'datetime', 'INTEGER'
+            elif pd.api.types.is_integer_dtype(series) or pd.api.types.is_bool_dtype(series):
+                kind, sql_type = 'integer', 'INTEGER'
+            elif pd.api.types.is_numeric_dtype(series):
+                kind, sql_type = 'real', 'REAL'
+            else:
+                kind, sql_type = 'text', 'TEXT'
+            self.conn.execute(f'ALTER TABLE words ADD COLUMN {self._quote(name)} {sql_type}')
+            self.conn.execute(
+                'INSERT INTO columns (name, kind, position) VALUES (?, ?, ?)',
+                (name, kind, len(self._columns))
+            )
+            self._columns.append(name)
+        self._load_columns()
+
+    def _row_values(self, df: pd.DataFrame, word_idx: int) -> List:
+        """取出某行需要写入的列值"""
+        values = []
+        for name in self._columns:
+            value = df.at[word_idx, name] if name in df.columns else None
+            if value is None or (not isinstance(value, str) and pd.isna(value)):
+                values.append(None)
+            elif name in self._datetime_columns:
+                values.append(int(pd.Timestamp(value).timestamp()))
+            elif hasattr(value, 'item'):
+                values.append(value.item())
+            else:
+                values.append(value)
+        return values
+
+    def load(self) -> Tuple[pd.DataFrame, TestHistory]:
+        with self.lock:
+            self._load_columns()
+            df = pd.read_sql_query('SELECT * FROM words ORDER BY id', self.conn, index_col='id')
+            df.index.name = None
+            for name in self._datetime_columns:
+                df[name] = pd.to_datetime(df[name], unit='s')
+            self._word_ids = {word: int(i) for i, word in zip(df.index, df['Words'])}
+
+            history = TestHistory()
+            rows = self.conn.execute(
+                'SELECT w."Words", h.score, h.new_score, h.ts FROM history h '
+                'JOIN words w ON w.id = h.word_id ORDER BY h.ts, h.id'
+            )
+            for word, code, new_score, ts in rows:
+                history.add_record(
+                    word,
+                    'skip' if code == SKIP_CODE else code,
+                    new_score,
+                    datetime.fromtimestamp(ts)
+                )
+            self._saved_history = len(history)
+            return df, history
+
+    def record_event(self, df: pd.DataFrame, word_idx: int, event: Dict) -> None:
+        with self.lock:
+            if len(self._columns) + 1 < len(df.columns):
+                self._ensure_columns(df)
+            self.conn.execute(self._update_sql, self._row_values(df, word_idx) + [int(word_idx)])
+            self.conn.execute(
+                'INSERT INTO history (word_id, score, new_score, ts) VALUES (?, ?, ?, ?)',
+                (
+                    int(word_idx),
+                    SKIP_CODE if event['s'] == 'skip' else int(event['s']),
+                    float(df.at[word_idx, 'Score']),
+                    int(datetime.strptime(event['t'], TIME_FORMAT).timestamp())
+                )
+            )
+            self._saved_history += 1
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                self.flush()
+
+    def flush(self) -> None:
+        with self.lock:
+            self.conn.commit()
+            self._pending = 0
+
+    def save(self, df: pd.DataFrame, history: TestHistory) -> None:
+        with self.lock:
+            self._ensure_columns(df)
+            columns = ['Words'] + self._columns
+            placeholders = ', '.join('?' for _ in range(len(columns) + 1))
+            names = ', '.join(self._quote(name) for name in ['id'] + columns)
+            self.conn.executemany(
+                f'INSERT OR REPLACE INTO words ({names}) VALUES ({placeholders})',
+                (
+                    [int(word_idx), df.at[word_idx, 'Words']] + self._row_values(df, word_idx)
+                    for word_idx in df.index
+                )
+            )
+            self._word_ids = {word: int(i) for i, word in zip(df.index, df['Words'])}
+
+            # 只追加尚未写入的历史记录
+            new_rows = []
+            for pos in range(self._saved_history, len(history)):
+                word_id = self._word_ids.get(history.words[history.word_ids[pos]])
+                if word_id is None:
+                    continue
+                new_rows.append((
+                    word_id,
+                    history.scores[pos],
+                    history.new_scores[pos],
+                    history.timestamps[pos]
+                ))
+            self.conn.executemany(
+                'INSERT INTO history (word_id, score, new_score, ts) VALUES (?, ?, ?, ?)',
+                new_rows
+            )
+            self._saved_history = len(history)
+            self.conn.commit()
+            self._pending = 0
+
+    def import_excel(self, file_path: str, history_file: Optional[str] = None) -> None:
+        """从Excel(及历史JSON)导入，覆盖数据库中的现有数据"""
+        df, history = ExcelStorage(file_path, history_file, read_only=True).load()
+        with self.lock:
+            with self.conn:
+                self.conn.execute('DELETE FROM history')
+                self.conn.execute('DELETE FROM words')
+            self._saved_history = 0
+        parse_datetime_columns(df)
+        self.save(df, history)
+
+    def export_excel(self, file_path: str) -> None:
+        """导出为Excel"""
+        df, _ = self.load()
+        to_export_frame(df).to_excel(file_path, index=False)
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+# 使用 SQLite 存储的文件扩展名
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+def create_storage(file_path: str, read_only: bool = False) -> StorageBackend:
+    """按文件扩展名选择存储后端"""
+    if os.path.splitext(file_path)[1].lower() in SQLITE_EXTENSIONS:
+        return SQLiteStorage(file_path, read_only=read_only)
+    return ExcelStorage(file_path, read_only=read_only)
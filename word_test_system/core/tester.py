@@ -1,116 +1,130 @@
 from typing import Dict, Optional, Tuple
 from .data_loader import DataLoader
 from .word_selector import WordSelector
+from .answer_sources import AnswerSource, ConsoleAnswerSource, FEEDBACK_LEVELS, SKIP, QUIT
+from utils.logger import metrics
 
 class Tester:
-    def __init__(self, data_loader: DataLoader, word_selector: WordSelector):
+    """测试引擎
+
+    本身不做任何输入输出: 答案来自 answer_source(默认为控制台交互，
+    也可以是脚本、回调或模拟学习者)，结果以结构化数据返回。
+    """
+    def __init__(self, data_loader: DataLoader, word_selector: WordSelector,
+                 answer_source: Optional[AnswerSource] = None):
         self.data_loader = data_loader
         self.word_selector = word_selector
-        self.feedback_levels = {
-            '2': '非常熟悉',
-            '1': '熟悉',
-            '0': '模糊',
-            '-1': '不熟悉',
-            '-2': '完全不知道'
+        self.feedback_levels = dict(FEEDBACK_LEVELS)
+        self.answer_source = answer_source or ConsoleAnswerSource(self.feedback_levels)
+        # 可选的后台写回线程(PersistenceWorker)，设置后作答不再等待保存
+        self.persistence = None
+
+    def word_prompt(self, word_idx: int) -> Dict:
+        """交给答案来源的单词信息"""
+        df = self.data_loader.df
+        return {
+            'index': word_idx,
+            'word': df.at[word_idx, 'Words'],
+            'page': df.at[word_idx, 'Page'],
+            'score': df.at[word_idx, 'Score'],
+            'times': df.at[word_idx, 'Times']
         }
-    
-    def test_word(self, word_idx: int) -> Tuple[str, Optional[int]]:
-        """测试单个单词
-        
+
+    def submit(self, word_idx: int, choice: str) -> Tuple[str, Optional[int]]:
+        """提交一个作答选项
+
         Returns:
             Tuple[str, Optional[int]]: (操作结果, 分数)
             操作结果可能是: 'continue', 'skip', 'quit'
             分数在操作结果为'continue'时有效
         """
+        if choice in self.feedback_levels:
+            score = int(choice)
+            # 更新单词数据
+            self.data_loader.update_word_data(word_idx, score)
+            # 记录历史
+            self.data_loader.record_test_history(word_idx, score)
+            if self.persistence is not None:
+                self.persistence.notify(word_idx)
+            metrics.count('answers', result='continue')
+            return 'continue', score
+
+        elif choice == SKIP:
+            # 跳过
+            self.data_loader.skip_word(word_idx)
+            self.data_loader.record_test_history(word_idx, 'skip')
+            if self.persistence is not None:
+                self.persistence.notify(word_idx)
+            metrics.count('answers', result='skip')
+            return 'skip', None
+
+        elif choice == QUIT:
+            # 退出测试时立即在后台保存
+            if self.persistence is not None:
+                self.persistence.flush(wait=False)
+            return 'quit', None
+
+        raise ValueError(f"无效的作答选项: {choice!r}")
+
+    @metrics.timed('test_word')
+    def test_word(self, word_idx: int) -> Tuple[str, Optional[int]]:
+        """测试单个单词: 向答案来源提问并提交答案
+
+        Returns:
+            Tuple[str, Optional[int]]: 同 submit
+        """
         if self.data_loader.df is None or word_idx >= len(self.data_loader.df):
             return 'quit', None
-            
-        word_row = self.data_loader.df.loc[word_idx]
-        word = word_row['Words']
-        page = word_row['Page']
-        
-        print(f"\n单词: {word} (页码: {page})")
-        print("请选择熟悉程度:")
-        for score, desc in self.feedback_levels.items():
-            print(f"{score}. {desc}")
-        print("s. 跳过")
-        print("q. 退出")
-        print("e. 查看例句(如果存在)")
-        
-        while True:
-            choice = input("你的选择: ").strip().lower()
-            
-            if choice in self.feedback_levels:
-                score = int(choice)
-                # 更新单词数据
-                self.data_loader.update_word_data(word_idx, score)
-                # 记录历史
-                self.data_loader.record_test_history(word_idx, score)
-                return 'continue', score
-                
-            elif choice == 's':
-                # 跳过
-                self.data_loader.df.at[word_idx, 'SkipCount'] += 1
-                self.data_loader.record_test_history(word_idx, 'skip')
-                return 'skip', None
-                
-            elif choice == 'q':
-                return 'quit', None
-                
-            elif choice == 'e':
-                # 查看例句功能待实现
-                print("例句功能待实现")
-                
-            else:
-                print("无效输入，请重新选择")
-    
+
+        # 单独记录等待答案的时间
+        with metrics.span('input_wait'):
+            choice = self.answer_source.ask(self.word_prompt(word_idx))
+        return self.submit(word_idx, choice)
+
     def batch_test(self, num: int = 10, mode: str = 'random', auto_save: bool = True) -> Dict:
         """批量测试
-        
+
         Args:
             num: 测试单词数量
-            mode: 测试模式 ('random', 'focus', 'review')
+            mode: 测试模式 ('random', 'focus', 'review', 'srs')
             auto_save: 是否自动保存
-            
+
         Returns:
-            Dict: 测试统计信息
+            Dict: 测试统计信息，results 中为每个单词的 (索引, 操作结果, 分数)
         """
         stats = {
             'total': 0,
             'completed': 0,
             'skipped': 0,
             'avg_score': 0.0,
-            'scores': []
+            'scores': [],
+            'results': []
         }
-        
-        for i in range(num):
-            word_idx = self.word_selector.select_word(self.data_loader.df, mode)
-            if word_idx is None:
-                break
-                
+
+        # 一次性预取整轮不重复的单词队列
+        queue = self.word_selector.select_words(self.data_loader.df, num, mode)
+
+        for word_idx in queue:
             result, score = self.test_word(word_idx)
-            
+
             if result == 'quit':
                 break
-                
+
             stats['total'] += 1
-            
+            stats['results'].append((word_idx, result, score))
+
             if result == 'continue':
                 stats['completed'] += 1
                 stats['scores'].append(score)
             elif result == 'skip':
                 stats['skipped'] += 1
-            
-            # 每5次测试自动保存
-            if auto_save and i > 0 and i % 5 == 0:
-                self.data_loader.save_data()
-        
+
         # 计算平均分
         if stats['scores']:
             stats['avg_score'] = sum(stats['scores']) / len(stats['scores'])
-        
-        # 最后保存一次
+
+        # 每次作答已追加到事件日志，这里只需确保落盘；完整快照在退出时写出
         if auto_save:
-            self.data_loader.save_data()
-        
-        return stats
\ No newline at end of file
+            self.data_loader.flush()
+
+        return stats
@@ -0,0 +1,141 @@
+import math
+from typing import List, Optional
+
+import numpy as np
+
+def smallest_k(values: np.ndarray, k: int) -> np.ndarray:
+    """返回最小的 k 个值的位置，按值升序排列
+
+    与 DataFrame.nsmallest(keep='first') 一致: 忽略NaN，值相同时位置
+    靠前者优先。先用 partition 求出第 k 小的阈值，只对入选的 k 个排序，O(n + k log k)。
+    """
+    values = np.asarray(values, dtype=float)
+    positions = np.flatnonzero(~np.isnan(values))
+    if k <= 0 or len(positions) == 0:
+        return np.empty(0, dtype=np.intp)
+
+    candidates = values[positions]
+    if k < len(positions):
+        # 第 k 小的值为阈值；等于阈值的只取位置靠前的部分
+        threshold = np.partition(candidates, k - 1)[k - 1]
+        below = positions[candidates < threshold]
+        ties = positions[candidates == threshold][:k - len(below)]
+        positions = np.concatenate([below, ties])
+
+    order = np.lexsort((positions, values[positions]))
+    return positions[order]
+
+def largest_k(values: np.ndarray, k: int) -> np.ndarray:
+    """返回最大的 k 个值的位置，按值降序排列(与 nlargest 一致)"""
+    return smallest_k(-np.asarray(values, dtype=float), k)
+
+class TopK:
+    """增量维护 N 个元素中键最小的 k 个
+
+    前 k 个元素放在一个最大堆(堆顶是其中最差的)，其余元素放在一个最小堆
+    (堆顶是其中最好的)，两个堆都记录元素所在的下标，可以直接修改任意元素的键。
+    修改后先在所在的堆内上浮/下沉，两个堆顶逆序时再交换，每次 O(log N)；
+    读取前 k 个只需对这 k 个排序。
+    与 smallest_k 一致: 键相同时位置靠前者优先，键为NaN的元素不会被读出。
+    """
+    def __init__(self, keys: np.ndarray, k: int):
+        keys = np.asarray(keys, dtype=float)
+        keys = np.where(np.isnan(keys), np.inf, keys)
+        n = len(keys)
+        self.k = max(min(k, n), 0)
+        self.keys = keys.tolist()
+        # 升序排列本身就是合法的最小堆，其逆序是合法的最大堆
+        order = np.lexsort((np.arange(n), keys)).tolist()
+        self._inside = order[:self.k][::-1]
+        self._outside = order[self.k:]
+        self._in_top = bytearray(n)     # 是否在前k个中
+        self._slot = [0] * n            # 在所在堆中的下标
+        for heap, flag in ((self._inside, 1), (self._outside, 0)):
+            for slot, pos in enumerate(heap):
+                self._in_top[pos] = flag
+                self._slot[pos] = slot
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, pos: int) -> bool:
+        return bool(self._in_top[pos])
+
+    def _before(self, a: int, b: int) -> bool:
+        """a 是否排在 b 前面(键更小，或键相同而位置靠前)"""
+        key_a, key_b = self.keys[a], self.keys[b]
+        return key_a < key_b or (key_a == key_b and a < b)
+
+    def _above(self, heap: List[int], a: int, b: int) -> bool:
+        """在该堆中 a 是否应位于 b 的上方"""
+        if heap is self._inside:
+            return self._before(b, a)
+        return self._before(a, b)
+
+    def _place(self, heap: List[int], slot: int, pos: int) -> None:
+        heap[slot] = pos
+        self._slot[pos] = slot
+
+    def _sift_up(self, heap: List[int], slot: int) -> int:
+        pos = heap[slot]
+        while slot > 0:
+            parent = (slot - 1) >> 1
+            if not self._above(heap, pos, heap[parent]):
+                break
+            self._place(heap, slot, heap[parent])
+            slot = parent
+        self._place(heap, slot, pos)
+        return slot
+
+    def _sift_down(self, heap: List[int], slot: int) -> None:
+        pos = heap[slot]
+        size = len(heap)
+        while True:
+            child = 2 * slot + 1
+            if child >= size:
+                break
+            if child + 1 < size and self._above(heap, heap[child + 1], heap[child]):
+                child += 1
+            if not self._above(heap, heap[child], pos):
+                break
+            self._place(heap, slot, heap[child])
+            slot = child
+        self._place(heap, slot, pos)
+
+    def _fix(self, heap: List[int], slot: int) -> None:
+        if self._sift_up(heap, slot) == slot:
+            self._sift_down(heap, slot)
+
+    def update(self, pos: int, key: float) -> List[int]:
+        """修改位置 pos 的键
+
+        Returns:
+            List[int]: 进出前k个的位置(包括 pos 本身的进出)
+        """
+        key = math.inf if math.isnan(key) else float(key)
+        if key == self.keys[pos]:
+            return []
+        self.keys[pos] = key
+        heap = self._inside if self._in_top[pos] else self._outside
+        self._fix(heap, self._slot[pos])
+
+        # 只有一个键变化，最多交换一次堆顶
+        inside, outside = self._inside, self._outside
+        if inside and outside and self._before(outside[0], inside[0]):
+            entered, left = outside[0], inside[0]
+            self._place(inside, 0, entered)
+            self._place(outside, 0, left)
+            self._in_top[entered], self._in_top[left] = 1, 0
+            self._sift_down(inside, 0)
+            self._sift_down(outside, 0)
+            return [entered, left]
+        return []
+
+    def smallest(self, num: Optional[int] = None) -> List[int]:
+        """键最小的 num 个位置(按键升序，不超过k个，不含NaN)"""
+        num = self.k if num is None else min(num, self.k)
+        if num <= 0:
+            return []
+        keys = self.keys
+        top = sorted(self._inside, key=lambda pos: (keys[pos], pos))[:num]
+        return [pos for pos in top if keys[pos] != math.inf]
@@ -0,0 +1,204 @@
+import numpy as np
+from typing import Optional, Sequence, Tuple
+
+
+class FenwickTree:
+    """树状数组(Fenwick树)
+
+    维护一组非负权重，支持 O(log N) 的单点更新、前缀和查询以及
+    按累计权重定位下标，用于加权随机抽样。
+    """
+
+    def __init__(self, values: Sequence[float]):
+        self.size = len(values)
+        self.values = np.zeros(self.size, dtype=float)
+        self.tree = np.zeros(self.size + 1, dtype=float)
+        self.total = 0.0
+        self.build(values)
+
+    def build(self, values: Sequence[float]) -> None:
+        """以 O(N) 的向量化方式整体重建"""
+        values = np.asarray(values, dtype=float)
+        if len(values) != self.size:
+            self.size = len(values)
+            self.tree = np.zeros(self.size + 1, dtype=float)
+        self.values = values.copy()
+
+        # tree[i] = sum(values[i - lowbit(i) + 1 .. i])  (1-based)
+        cumsum = np.concatenate(([0.0], np.cumsum(self.values)))
+        positions = np.arange(1, self.size + 1)
+        lowbit = positions & -positions
+        self.tree[1:] = cumsum[positions] - cumsum[positions - lowbit]
+        self.total = float(cumsum[-1])
+
+    def update(self, pos: int, value: float) -> None:
+        """将下标 pos(从0开始) 的权重设为 value"""
+        delta = float(value) - self.values[pos]
+        if delta == 0:
+            return
+        self.values[pos] = value
+        self.total += delta
+        i = pos + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix_sum(self, pos: int) -> float:
+        """返回 values[0..pos] 之和"""
+        result = 0.0
+        i = pos + 1
+        while i > 0:
+            result += self.tree[i]
+            i -= i & -i
+        return result
+
+    def find(self, target: float) -> int:
+        """返回累计权重首次超过 target 的下标(从0开始)"""
+        pos = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            nxt = pos + step
+            if nxt <= self.size and self.tree[nxt] <= target:
+                pos = nxt
+                target -= self.tree[nxt]
+            step >>= 1
+        return min(pos, self.size - 1)
+
+    def sample(self, rng: Optional[np.random.RandomState] = None) -> int:
+        """按权重随机抽取一个下标，总权重为0时均匀抽取"""
+        random = rng.random_sample if rng is not None else np.random.random
+        if self.size == 0:
+            raise ValueError("空的权重树无法抽样")
+        if self.total <= 0:
+            return int(random() * self.size) % self.size
+
+        # 浮点误差可能落在权重为0的位置，重试几次后退回全量抽样
+        for _ in range(3):
+            pos = self.find(random() * self.total)
+            if self.values[pos] > 0:
+                return pos
+        weights = np.clip(self.values, 0, None)
+        return int(np.random.choice(self.size, p=weights / weights.sum()))
+
+
+def build_alias(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Vose 别名法建表，返回 (prob, alias)
+
+    抽样时均匀取下标 i，以概率 prob[i] 取 i，否则取 alias[i]。
+    按批配对"不足"与"富余"的下标(向量化)，批次过小时退回逐个配对。
+    """
+    n = len(values)
+    prob = np.ones(n, dtype=float)
+    alias = np.arange(n, dtype=np.int64)
+    total = float(values.sum()) if n else 0.0
+    if total <= 0:
+        return prob, alias
+
+    scaled = values * (n / total)
+    small = np.flatnonzero(scaled < 1.0)
+    large = np.flatnonzero(scaled >= 1.0)
+    while len(small) and len(large):
+        k = min(len(small), len(large))
+        if k < 64:
+            break
+        s, l = small[:k], large[:k]
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] -= 1.0 - scaled[s]
+        still_large = scaled[l] >= 1.0
+        small = np.concatenate((small[k:], l[~still_large]))
+        large = np.concatenate((large[k:], l[still_large]))
+
+    small, large = small.tolist(), large.tolist()
+    while small and large:
+        s = small.pop()
+        l = large[-1]
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] -= 1.0 - scaled[s]
+        if scaled[l] < 1.0:
+            small.append(large.pop())
+    # 剩下的(浮点误差导致)概率按1处理
+    return prob, alias
+
+
+class AliasSampler:
+    """别名表加权抽样，O(1) 取样
+
+    别名表按建表时的权重(基准)构建；之后变化的下标记在一个小字典中，
+    抽样时以其余下标的基准权重之和为概率从别名表抽样(抽到变化过的
+    下标则重抽)，否则在变化过的下标中按当前权重抽样，分布与当前权重
+    完全一致。变化次数超过 max_updates，或变化下标的基准权重占比超过
+    max_drift 时整体重建。接口与 FenwickTree 相同(values/total/update/sample)。
+    """
+
+    def __init__(self, values: Sequence[float], max_updates: int = 1024,
+                 max_drift: float = 0.05):
+        self.max_updates = max_updates
+        self.max_drift = max_drift
+        self.rebuilds = 0
+        self.build(values)
+
+    def build(self, values: Sequence[float]) -> None:
+        """以当前权重重建别名表"""
+        self.values = np.array(values, dtype=float)
+        self.size = len(self.values)
+        self._base = self.values.copy()
+        self._base_total = float(self._base.sum())
+        self.prob, self.alias = build_alias(self._base)
+        self._changed = {}           # 下标 -> 当前权重
+        self._changed_base = 0.0     # 变化下标的基准权重之和
+        self._changed_total = 0.0    # 变化下标的当前权重之和
+        self.total = self._base_total
+        self.rebuilds += 1
+
+    def update(self, pos: int, value: float) -> None:
+        """将下标 pos 的权重设为 value，必要时重建"""
+        value = float(value)
+        old = self.values[pos]
+        if value == old:
+            return
+        self.values[pos] = value
+        self.total += value - old
+        if pos in self._changed:
+            self._changed_total += value - old
+        else:
+            self._changed_base += self._base[pos]
+            self._changed_total += value
+        self._changed[pos] = value
+
+        if (len(self._changed) > self.max_updates
+                or self._changed_base > self.max_drift * self._base_total):
+            self.build(self.values)
+
+    def _sample_table(self, random) -> int:
+        """从别名表按基准权重抽取一个下标"""
+        u = random() * self.size
+        i = min(int(u), self.size - 1)
+        return i if u - i < self.prob[i] else int(self.alias[i])
+
+    def sample(self, rng: Optional[np.random.RandomState] = None) -> int:
+        """按当前权重随机抽取一个下标，总权重为0时均匀抽取"""
+        random = rng.random_sample if rng is not None else np.random.random
+        if self.size == 0:
+            raise ValueError("空的权重表无法抽样")
+        if self.total <= 0:
+            return int(random() * self.size) % self.size
+
+        unchanged = self._base_total - self._changed_base
+        if self._changed and random() * self.total >= unchanged:
+            # 在变化过的下标中按当前权重抽样(最多 max_updates 个)
+            target = random() * self._changed_total
+            for pos, value in self._changed.items():
+                target -= value
+                if target < 0 and value > 0:
+                    return pos
+            return max(self._changed, key=self._changed.get)
+
+        for _ in range(64):
+            pos = self._sample_table(random)
+            if pos not in self._changed:
+                return pos
+        # 浮点误差下反复抽到变化过的下标，重建后再抽
+        self.build(self.values)
+        return self._sample_table(random)
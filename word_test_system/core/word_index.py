@@ -0,0 +1,106 @@
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+class WordIndex:
+    """单词查找索引(不区分大小写，输入按普通文本处理而非正则)
+
+    - 精确匹配: 小写单词 -> 位置列表的哈希表
+    - 前缀匹配: 排序后的小写单词数组，bisect 定位区间
+    - 子串/模糊匹配: 长度1~3的n-gram倒排索引；短查询直接取倒排表，
+      长查询对各三元组(trigram)的倒排表求交后再逐个校验
+    返回的都是单词在数据中的位置(从0开始)，按位置升序。
+    """
+    N = 3
+
+    def __init__(self, words: Iterable[str]):
+        self.words: List[str] = [str(word).lower() for word in words]
+        self._exact: Dict[str, List[int]] = {}
+        for pos, word in enumerate(self.words):
+            self._exact.setdefault(word, []).append(pos)
+
+        order = sorted(range(len(self.words)), key=self.words.__getitem__)
+        self._sorted = [self.words[pos] for pos in order]
+        self._sorted_pos = array('I', order)
+
+        self._grams: Dict[str, array] = {}
+        for pos, word in enumerate(self.words):
+            grams = set()
+            for n in range(1, self.N + 1):
+                grams |= self._word_grams(word, n)
+            for gram in grams:
+                postings = self._grams.get(gram)
+                if postings is None:
+                    postings = self._grams[gram] = array('I')
+                postings.append(pos)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    @classmethod
+    def _word_grams(cls, word: str, n: int = N) -> set:
+        """单词包含的全部 n-gram"""
+        return {word[i:i + n] for i in range(len(word) - n + 1)}
+
+    def exact(self, query: str) -> List[int]:
+        """精确匹配"""
+        return list(self._exact.get(query.lower(), []))
+
+    def _prefix_range(self, prefix: str) -> Tuple[int, int]:
+        lo = bisect_left(self._sorted, prefix)
+        # 所有以 prefix 开头的字符串都小于 prefix + 最大字符
+        hi = bisect_left(self._sorted, prefix + '\U0010ffff', lo)
+        return lo, hi
+
+    def prefix(self, query: str) -> List[int]:
+        """前缀匹配"""
+        lo, hi = self._prefix_range(query.lower())
+        return sorted(self._sorted_pos[lo:hi])
+
+    def contains(self, query: str) -> List[int]:
+        """子串匹配(与 str.contains(regex=False, case=False) 结果相同)"""
+        query = query.lower()
+        if not query:
+            return list(range(len(self.words)))
+        if len(query) <= self.N:
+            # 短查询本身就是一个 n-gram，倒排表即为结果(位置已升序)
+            return list(self._grams.get(query, ()))
+
+        postings = []
+        for gram in self._word_grams(query):
+            if gram not in self._grams:
+                return []
+            postings.append(self._grams[gram])
+        postings.sort(key=len)
+
+        candidates = set(postings[0])
+        for other in postings[1:]:
+            candidates.intersection_update(other)
+            if not candidates:
+                return []
+        return sorted(pos for pos in candidates if query in self.words[pos])
+
+    def fuzzy(self, query: str, limit: int = 10,
+              min_similarity: float = 0.3) -> List[int]:
+        """模糊匹配: 按三元组集合的 Jaccard 相似度从高到低返回"""
+        grams = self._word_grams(query.lower())
+        if not grams:
+            return self.prefix(query)[:limit]
+
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for pos in self._grams.get(gram, ()):
+                shared[pos] = shared.get(pos, 0) + 1
+
+        scored = []
+        for pos, count in shared.items():
+            word_grams = max(len(self.words[pos]) - self.N + 1, 1)
+            similarity = count / (len(grams) + word_grams - count)
+            if similarity >= min_similarity:
+                scored.append((-similarity, pos))
+        scored.sort()
+        return [pos for _, pos in scored[:limit]]
+
+    def search(self, query: str) -> List[int]:
+        """查询单词: 子串匹配，没有结果时退回模糊匹配"""
+        return self.contains(query) or self.fuzzy(query)
@@ -1,83 +1,389 @@
+import math
+from collections import OrderedDict
 import numpy as np
-from datetime import datetime
-from typing import List, Dict, Optional
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Tuple
 import pandas as pd
+from .weight_index import AliasSampler, FenwickTree
+from .topk import TopK
+from .schema import UNTESTED_DAYS, days_since_tested
+from .srs import DueQueue
+from utils.logger import metrics
+
+class _ModeIndex:
+    """单一模式下的持久化权重索引
+
+    从 DataLoader.df 构建一次，之后单词数据变化时只记下变化的行(dirty)，
+    下次使用前只更新这些行。
+    随机模式用别名表(AliasSampler)，抽样 O(1)、更新均摊 O(1)；
+    其余模式用树状数组，抽样与更新均为 O(log N)。
+    重点突破/复习模式同时维护最低分/复习优先级最高的前k个单词(TopK)，
+    get_focus_words/get_review_words 直接读取。
+    """
+    def __init__(self, selector: 'WordSelector', df: pd.DataFrame, mode: str):
+        self.selector = selector
+        self.df = df
+        self.mode = mode
+        self.built_at = datetime.now()
+        self.dirty = set()         # 尚未更新到索引中的行位置
+        self.version = selector._data_version()   # 已同步到的数据版本
+        self.topk: Optional[TopK] = None
+
+        if mode == 'focus':
+            # 键为分数: 前k个即最低分的单词
+            self.topk = TopK(df['Score'].to_numpy(dtype=float), selector.top_k['focus'])
+            weights = selector._focus_weights(df)
+        else:
+            weights = selector._raw_weights(df, mode, self.built_at)
+        if mode == 'review':
+            # 键为负的复习优先级，未测试过的单词为NaN(不会被读出)
+            if 'LastTested' in df.columns:
+                days = days_since_tested(df['LastTested'], self.built_at, fill=np.nan)
+            else:
+                days = np.full(len(df), np.nan)
+            priority = df['Score'].to_numpy(dtype=float) * days
+            self.topk = TopK(-priority, selector.top_k['review'])
+        if mode == 'random':
+            self.tree = AliasSampler(
+                weights, selector.ALIAS_MAX_UPDATES, selector.ALIAS_MAX_DRIFT
+            )
+        else:
+            self.tree = FenwickTree(weights)
+
+    def is_stale(self, df: pd.DataFrame) -> bool:
+        """数据源被替换、时间权重已过期或待更新的行太多时需要重建"""
+        return (
+            df is not self.df
+            or len(df) != self.tree.size
+            or datetime.now() - self.built_at > self.selector.INDEX_MAX_AGE
+            or len(self.dirty) > self.selector.DIRTY_REBUILD_RATIO * len(df)
+        )
+
+    def sync(self, version: int) -> None:
+        """把变化的行更新到索引中，记录同步到的数据版本"""
+        for pos in sorted(self.dirty):
+            self.update_row(pos)
+        self.dirty.clear()
+        self.version = version
+
+    def update_row(self, pos: int) -> None:
+        """某一行数据变化后更新其权重"""
+        if self.mode == 'focus':
+            self._update_focus(pos)
+        else:
+            weight = self.selector._row_weight(self.df, pos, self.mode, self.built_at)
+            self.tree.update(pos, weight)
+            if self.topk is not None:
+                priority = self.selector._review_priority(self.df, pos, self.built_at)
+                self.topk.update(pos, -priority)
+
+    def _update_focus(self, pos: int) -> None:
+        """维护最低分集合，只改动进出集合的行"""
+        topk = self.topk
+        changed = topk.update(pos, float(self.df['Score'].iat[pos]))
+        for row in set(changed) | {pos}:
+            in_focus = row in topk and topk.keys[row] <= 0
+            self.tree.update(row, 1.0 if in_focus else 0.0)
+
+    def sample(self) -> int:
+        """按权重抽取一个位置"""
+        return self.tree.sample()
 
 class WordSelector:
-    def __init__(self, weights: Dict[str, float] = None):
+    # 重点突破模式关注的最低分单词数量
+    FOCUS_SIZE = 20
+    # 复习模式持续维护的高优先级单词数量
+    REVIEW_SIZE = 20
+    # 索引中的时间权重超过该时长后整体重建
+    INDEX_MAX_AGE = timedelta(hours=1)
+    # 按 (模式, 权重配置) 缓存的索引个数上限(LRU)
+    INDEX_CACHE_SIZE = 8
+    # 待更新的行超过总行数的该比例时不再逐行更新，直接重建
+    DIRTY_REBUILD_RATIO = 0.25
+    # 随机模式别名表: 变化的单词数超过该值、或其原权重占比超过该比例时重建
+    ALIAS_MAX_UPDATES = 1024
+    ALIAS_MAX_DRIFT = 0.05
+
+    def __init__(self, weights: Dict[str, float] = None, top_k: Dict[str, int] = None):
         self.weights = weights or {
             'score_weight': 0.7,
             'time_weight': 0.2,
             'count_weight': 0.1
         }
-    
-    def calculate_weights(self, df: pd.DataFrame, mode: str = 'random') -> np.ndarray:
-        """计算单词权重"""
-        now = datetime.now()
-        
-        # 基础权重基于分数
-        df_copy = df.copy()
-        df_copy['ScoreWeight'] = 1 / (df_copy['Score'] + 5)  # 加5避免极端值
-        
-        # 时间权重 - 最近测试过的权重降低
-        if 'LastTested' in df.columns and pd.api.types.is_string_dtype(df['LastTested']):
-            df_copy['LastTested'] = pd.to_datetime(df_copy['LastTested'], errors='coerce')
-            df_copy['DaysSinceTested'] = (now - df_copy['LastTested']).dt.days.fillna(100)
-            df_copy['TimeWeight'] = np.log(df_copy['DaysSinceTested'] + 1)
+        # 各模式持续维护的前k个单词数量(settings.json 中的 top_k)
+        self.top_k = {'focus': self.FOCUS_SIZE, 'review': self.REVIEW_SIZE}
+        self.top_k.update(top_k or {})
+        self.data_loader = None
+        self._indexes: 'OrderedDict[Tuple, _ModeIndex]' = OrderedDict()
+        # 索引缓存命中情况: 未变化直接使用/只更新变化的行/重新构建/被淘汰
+        self.cache_stats = {'hits': 0, 'patched': 0, 'misses': 0, 'evictions': 0}
+        self._due_queue: Optional[DueQueue] = None
+
+    def bind(self, data_loader) -> None:
+        """绑定数据加载器，之后对其 df 的抽样走增量索引"""
+        if self.data_loader is not None:
+            self.data_loader.remove_listener(self._on_word_changed)
+        self.data_loader = data_loader
+        self._indexes.clear()
+        self._due_queue = None
+        data_loader.add_listener(self._on_word_changed)
+
+    def _data_version(self) -> int:
+        return getattr(self.data_loader, 'version', 0)
+
+    def _on_word_changed(self, word_idx: Optional[int], kind: str, score=None) -> None:
+        """数据变化回调: 单行变化只记入各索引的待更新行，整体重载则丢弃索引"""
+        if word_idx is None or kind == 'reload':
+            self._indexes.clear()
+            self._due_queue = None
+            return
+        pos = None
+        for key, index in list(self._indexes.items()):
+            if index.df is not self.data_loader.df:
+                del self._indexes[key]
+                continue
+            if pos is None:
+                pos = index.df.index.get_loc(word_idx)
+            index.dirty.add(pos)
+        if self._due_queue is not None:
+            if self._due_queue.df is not self.data_loader.df:
+                self._due_queue = None
+            elif kind == 'answer':
+                self._due_queue.update_row(self._due_queue.df.index.get_loc(word_idx))
+
+    def _get_index(self, df: pd.DataFrame, mode: str) -> Optional[_ModeIndex]:
+        """获取(必要时构建)指定模式的索引，未绑定的数据源返回None
+
+        索引按 (模式, 权重配置) 缓存，最近最少使用的先淘汰；
+        数据变化后只更新记下的行。
+        """
+        if self.data_loader is None or df is not self.data_loader.df:
+            return None
+        if mode not in ('focus', 'review'):
+            mode = 'random'
+        # 重点突破模式的权重与权重配置无关
+        key = (mode, None if mode == 'focus' else tuple(sorted(self.weights.items())))
+        version = self._data_version()
+        index = self._indexes.get(key)
+        if index is None or index.is_stale(df):
+            self._count_cache('misses')
+            index = _ModeIndex(self, df, mode)
+            self._indexes[key] = index
+            while len(self._indexes) > self.INDEX_CACHE_SIZE:
+                self._indexes.popitem(last=False)
+                self._count_cache('evictions')
+        elif index.dirty or index.version != version:
+            self._count_cache('patched')
+            index.sync(version)
+        else:
+            self._count_cache('hits')
+        self._indexes.move_to_end(key)
+        return index
+
+    def _count_cache(self, result: str) -> None:
+        self.cache_stats[result] += 1
+        metrics.count('selector.index_cache', result=result)
+
+    def cache_info(self) -> Dict:
+        """索引缓存的命中统计及当前大小"""
+        return {
+            **self.cache_stats,
+            'size': len(self._indexes),
+            'max_size': self.INDEX_CACHE_SIZE
+        }
+
+    def _get_due_queue(self, df: pd.DataFrame) -> Optional[DueQueue]:
+        """获取间隔重复模式的到期队列，数据没有调度列时返回None
+
+        绑定的数据源复用持久的队列，其他数据源临时构建。
+        """
+        if 'Due' not in df.columns:
+            return None
+        if self.data_loader is None or df is not self.data_loader.df:
+            return DueQueue(df)
+        if self._due_queue is None or self._due_queue.df is not df \
+                or len(self._due_queue) != len(df):
+            self._due_queue = DueQueue(df)
+        return self._due_queue
+
+    def _raw_weights(self, df: pd.DataFrame, mode: str, now: datetime) -> np.ndarray:
+        """计算未归一化的权重(随机/复习模式)，可用于整表或单行"""
+        # 时间权重 - 最近测试过的权重降低(索引构建之后才测试的单词间隔按0天计)
+        if 'LastTested' in df.columns:
+            days = days_since_tested(df['LastTested'], now)
         else:
-            df_copy['TimeWeight'] = 1
-            
+            days = np.full(len(df), 100.0)
+        return self.weights_from_arrays(
+            df['Score'].to_numpy(dtype=float), df['Times'].to_numpy(dtype=float), days, mode
+        )
+
+    def weights_from_arrays(self, scores: np.ndarray, times: np.ndarray,
+                            days: np.ndarray, mode: str = 'random') -> np.ndarray:
+        """由分数、测试次数和距上次测试天数数组计算未归一化的权重
+
+        不依赖DataFrame，多用户服务直接用每个用户的进度数组调用。
+        """
+        scores = np.asarray(scores, dtype=float)
+        if mode == 'focus':
+            return self._focus_from_scores(scores)
+
+        if mode == 'review':
+            # 复习模式: 高分但久未复习的单词，负分单词不参与
+            return np.clip(scores * days, 0, None)
+
+        # 随机模式: 综合权重
+        time_weight = np.log(np.asarray(days, dtype=float) + 1)
+        # 基础权重基于分数，加5避免极端值，分数低于-4后权重不再增加
+        score_weight = 1 / (np.maximum(scores, -4) + 5)
         # 测试次数权重 - 测试次数少的权重高
-        df_copy['CountWeight'] = 1 / (df_copy['Times'] + 1)
-        
-        # 根据不同模式调整权重
+        count_weight = 1 / (np.asarray(times, dtype=float) + 1)
+        return (
+            self.weights['score_weight'] * score_weight +
+            self.weights['time_weight'] * time_weight +
+            self.weights['count_weight'] * count_weight
+        )
+
+    def _row_weight(self, df: pd.DataFrame, pos: int, mode: str, now: datetime) -> float:
+        """单行权重的标量版本(与 _raw_weights 结果相同，避免逐行切片)"""
+        score = float(df['Score'].iat[pos])
+        last_tested = df['LastTested'].iat[pos] if 'LastTested' in df.columns else pd.NaT
+        if pd.isna(last_tested):
+            days = float(UNTESTED_DAYS)
+        else:
+            days = float(max((pd.Timestamp(now) - pd.Timestamp(last_tested)).days, 0))
+
+        if mode == 'review':
+            return max(score * days, 0.0)
+        return (
+            self.weights['score_weight'] / (max(score, -4) + 5) +
+            self.weights['time_weight'] * math.log(days + 1) +
+            self.weights['count_weight'] / (float(df['Times'].iat[pos]) + 1)
+        )
+
+    def _review_priority(self, df: pd.DataFrame, pos: int, now: datetime) -> float:
+        """单行的复习优先级(分数×距上次测试天数)，未测试过为NaN"""
+        last_tested = df['LastTested'].iat[pos] if 'LastTested' in df.columns else pd.NaT
+        if pd.isna(last_tested):
+            return math.nan
+        days = max((pd.Timestamp(now) - pd.Timestamp(last_tested)).days, 0)
+        return float(df['Score'].iat[pos]) * days
+
+    def _focus_weights(self, df: pd.DataFrame) -> np.ndarray:
+        """重点突破模式: 只关注最低分的若干个(非正分)单词"""
+        return self._focus_from_scores(df['Score'].to_numpy(dtype=float))
+
+    def _focus_from_scores(self, scores: np.ndarray) -> np.ndarray:
+        focus_words = np.argsort(scores, kind='stable')[:self.top_k['focus']]
+        weights = np.zeros(len(scores))
+        weights[focus_words] = 1
+        weights[scores > 0] = 0
+        return weights
+
+    def calculate_weights(self, df: pd.DataFrame, mode: str = 'random') -> np.ndarray:
+        """计算单词权重"""
         if mode == 'focus':
-            # 重点突破模式: 只关注最低分的20个单词
-            focus_words = df_copy.nsmallest(20, 'Score').index
-            weights = np.zeros(len(df_copy))
-            weights[focus_words] = 1
-            return weights / weights.sum() if weights.sum() > 0 else np.ones(len(df_copy)) / len(df_copy)
-            
-        elif mode == 'review':
-            # 复习模式: 高分但久未复习的单词
-            df_copy['ReviewWeight'] = df_copy['Score'] * df_copy['DaysSinceTested']
-            weights = df_copy['ReviewWeight'].values
-            
-        else:  # random mode
-            # 随机模式: 综合权重
-            weights = (
-                self.weights['score_weight'] * df_copy['ScoreWeight'] +
-                self.weights['time_weight'] * df_copy['TimeWeight'] +
-                self.weights['count_weight'] * df_copy['CountWeight']
-            )
-        
+            weights = self._focus_weights(df)
+        else:
+            weights = self._raw_weights(df, mode, datetime.now())
+
         # 归一化
-        weights = weights / weights.sum() if weights.sum() > 0 else np.ones(len(df_copy)) / len(df_copy)
-        return weights
-    
+        total = weights.sum()
+        return weights / total if total > 0 else np.ones(len(df)) / len(df)
+
     def select_word(self, df: pd.DataFrame, mode: str = 'random') -> int:
         """根据模式选择单词"""
+        with metrics.span('select_word', mode=mode):
+            return self._select_word(df, mode)
+
+    def _select_word(self, df: pd.DataFrame, mode: str) -> int:
         if df is None or len(df) == 0:
             return None
-            
+
+        if mode == 'srs':
+            queue = self._get_due_queue(df)
+            if queue is not None:
+                return df.index[queue.next_due()]
+            mode = 'random'
+
+        index = self._get_index(df, mode)
+        if index is not None:
+            return df.index[index.sample()]
+
         weights = self.calculate_weights(df, mode)
         return np.random.choice(df.index, p=weights)
-    
+
+    def select_words(self, df: pd.DataFrame, k: int, mode: str = 'random',
+                     replace: bool = False) -> List[int]:
+        """一次性按模式抽取k个单词
+
+        权重只计算一次；不放回时使用 Gumbel-top-k 一次向量化抽取k个互不
+        相同的单词(等价于依次不放回加权抽样)，可抽的单词不足k个时全部返回。
+        """
+        with metrics.span('select_words', mode=mode):
+            return self._select_words(df, k, mode, replace)
+
+    def _select_words(self, df: pd.DataFrame, k: int, mode: str,
+                      replace: bool) -> List[int]:
+        if df is None or len(df) == 0 or k <= 0:
+            return []
+
+        if mode == 'srs':
+            # 间隔重复模式按到期顺序取单词，不做随机抽样
+            queue = self._get_due_queue(df)
+            if queue is not None:
+                return df.index[queue.take(k)].tolist()
+            mode = 'random'
+
+        index = self._get_index(df, mode)
+        if index is not None:
+            weights = index.tree.values
+            total = index.tree.total
+            weights = weights / total if total > 0 else np.ones(len(df)) / len(df)
+        else:
+            weights = self.calculate_weights(df, mode)
+
+        if replace:
+            return np.random.choice(df.index, size=k, p=weights).tolist()
+
+        # 权重为0的单词不会被抽到
+        candidates = np.flatnonzero(weights > 0)
+        k = min(k, len(candidates))
+        keys = np.log(weights[candidates]) + np.random.gumbel(size=len(candidates))
+        top = np.argpartition(-keys, k - 1)[:k] if k < len(candidates) else np.arange(k)
+        top = top[np.argsort(-keys[top])]
+        return df.index[candidates[top]].tolist()
+
+    def _top_words(self, df: pd.DataFrame, mode: str, num: int) -> Optional[List[int]]:
+        """从绑定数据源的索引中读取前num个单词，不在维护范围内时返回None"""
+        if num > self.top_k[mode]:
+            return None
+        index = self._get_index(df, mode)
+        if index is None:
+            return None
+        return df.index[index.topk.smallest(num)].tolist()
+
     def get_focus_words(self, df: pd.DataFrame, num: int = 20) -> List[int]:
         """获取需要重点关注的单词"""
         if df is None or len(df) == 0:
             return []
-            
+
+        words = self._top_words(df, 'focus', num)
+        if words is not None:
+            return words
         return df.nsmallest(num, 'Score').index.tolist()
-    
+
     def get_review_words(self, df: pd.DataFrame, num: int = 20) -> List[int]:
-        """获取需要复习的单词"""
+        """获取需要复习的单词(只考虑测试过的单词)
+
+        绑定的数据源从复习模式索引中读取，天数按索引构建时刻计算。
+        """
         if df is None or len(df) == 0:
             return []
-            
-        df_copy = df.copy()
-        df_copy['LastTested'] = pd.to_datetime(df_copy['LastTested'], errors='coerce')
-        df_copy['DaysSinceTested'] = (datetime.now() - df_copy['LastTested']).dt.days.fillna(100)
-        df_copy['ReviewPriority'] = df_copy['Score'] * df_copy['DaysSinceTested']
-        
-        return df_copy.nlargest(num, 'ReviewPriority').index.tolist()
\ No newline at end of file
+
+        words = self._top_words(df, 'review', num)
+        if words is not None:
+            return words
+        days = days_since_tested(df['LastTested'], datetime.now(), fill=np.nan)
+        priority = pd.Series(df['Score'].to_numpy(dtype=float) * days, index=df.index)
+
+        return priority.dropna().nlargest(num).index.tolist()
@@ -1,31 +1,132 @@
+import time
+# 启动计时的起点(--startup-time)，在其他导入之前记录
+STARTED = time.perf_counter()
+
 import json
 import os
-from core.data_loader import DataLoader
-from core.word_selector import WordSelector
-from core.tester import Tester
-from core.analyzer import Analyzer
+import signal
+import sys
+import threading
 from utils.display import Display
 from utils.logger import Logger
 from utils.backup import Backup
 
 class WordTestSystem:
-    def __init__(self):
+    # 退出时等待后台保存的最长时间(秒)，超时后只把事件日志落盘
+    SHUTDOWN_TIMEOUT = 10.0
+
+    def __init__(self, data_file=None):
         # 加载配置
         self.load_config()
+        if data_file:
+            self.settings['data_file'] = data_file
         
-        # 初始化组件
+        # 初始化轻量组件，菜单可以立即显示
         self.logger = Logger(self.settings['log_dir'], self.settings['log_level'])
+        metrics_settings = self.settings.get('metrics', {})
+        if metrics_settings.get('enabled'):
+            self.logger.enable_metrics(
+                metrics_settings.get('interval', 60),
+                metrics_settings.get('prometheus_file')
+            )
         self.display = Display(self.settings['color_mode'])
         self.backup = Backup(self.settings['backup_dir'])
         
-        # 初始化核心组件
-        self.data_loader = DataLoader(self.settings['data_file'])
-        self.word_selector = WordSelector(self.settings['weights'])
-        self.tester = Tester(self.data_loader, self.word_selector)
-        self.analyzer = Analyzer()
-        
-        # 加载数据
-        self.load_data()
+        # 核心组件依赖pandas/numpy，连同词库一起在后台线程中加载，
+        # 第一次用到时才等待(见 wait_ready)
+        self._ready = threading.Event()
+        self._load_error = None
+        self._load_ok = False
+        self.ready_at = None
+        self._loader_thread = threading.Thread(
+            target=self._load_core, name='DeckLoader', daemon=True
+        )
+        self._loader_thread.start()
+        self._terminated = False
+        signal.signal(signal.SIGTERM, self.handle_sigterm)
+    
+    def _load_core(self):
+        """后台线程: 导入核心模块、创建组件并加载词库"""
+        try:
+            from core.data_loader import DataLoader
+            from core.persistence import PersistenceWorker
+            from core.word_selector import WordSelector
+            from core.tester import Tester
+            from core.answer_sources import ConsoleAnswerSource
+            from core.analyzer import Analyzer
+            
+            self._data_loader = DataLoader(self.settings['data_file'])
+            top_k = self.settings.get('top_k', {})
+            self._word_selector = WordSelector(self.settings['weights'], top_k)
+            self._word_selector.bind(self._data_loader)
+            # 测试引擎本身不做输入输出，控制台交互由答案来源提供
+            levels = self.feedback_levels.get('feedback_levels', {})
+            self._tester = Tester(
+                self._data_loader,
+                self._word_selector,
+                ConsoleAnswerSource({score: level['description'] for score, level in levels.items()} or None)
+            )
+            self._analyzer = Analyzer(weak_size=top_k.get('weak_words', 20))
+            self._analyzer.bind(self._data_loader)
+            
+            # 后台写回: 作答后不等待保存，按auto_save_interval秒合并写出
+            self._persistence = None
+            if self.settings['auto_save']:
+                self._persistence = PersistenceWorker(
+                    self._data_loader,
+                    self.settings.get('auto_save_interval', 5)
+                )
+                self._tester.persistence = self._persistence
+            
+            # 加载数据(菜单已显示，这里只记日志，失败时在第一次使用时提示)
+            self._load_ok = self._data_loader.load_data()
+            if self._load_ok:
+                self._analyzer.set_data(self._data_loader.df)
+                self.logger.info("数据加载成功")
+            else:
+                self.logger.error("数据加载失败")
+            if self._persistence is not None:
+                self._persistence.start()
+        except Exception as e:
+            self._load_error = e
+        finally:
+            self.ready_at = time.perf_counter()
+            self._ready.set()
+    
+    def wait_ready(self):
+        """等待后台加载完成，加载出错时抛出原异常"""
+        if not self._ready.is_set():
+            self.display.print_color("YELLOW", "正在加载词库，请稍候...")
+            self._ready.wait()
+            if self._load_error is None and not self._load_ok:
+                self.display.print_color("RED", "数据加载失败!")
+        if self._load_error is not None:
+            raise self._load_error
+    
+    @property
+    def data_loader(self):
+        self.wait_ready()
+        return self._data_loader
+    
+    @property
+    def word_selector(self):
+        self.wait_ready()
+        return self._word_selector
+    
+    @property
+    def tester(self):
+        self.wait_ready()
+        return self._tester
+    
+    @property
+    def analyzer(self):
+        self.wait_ready()
+        return self._analyzer
+    
+    @property
+    def persistence(self):
+        self.wait_ready()
+        return self._persistence
     
     def load_config(self):
         """加载配置文件"""
@@ -61,15 +162,25 @@ class WordTestSystem:
                     "time_weight": 0.2,
                     "count_weight": 0.1
                 },
-                "test_modes": ["随机测试", "重点突破", "复习模式"],
+                "top_k": {
+                    "focus": 20,
+                    "review": 20,
+                    "weak_words": 20
+                },
+                "test_modes": ["随机测试", "重点突破", "复习模式", "间隔重复"],
                 "data_file": "words.xlsx",
                 "backup_dir": "backups",
-                "log_dir": "logs"
+                "log_dir": "logs",
+                "metrics": {
+                    "enabled": False,
+                    "interval": 60,
+                    "prometheus_file": ""
+                }
             }
             self.feedback_levels = {}
     
     def load_data(self):
-        """加载数据"""
+        """重新加载数据"""
         if self.data_loader.load_data():
             self.analyzer.set_data(self.data_loader.df)
             self.logger.info("数据加载成功")
@@ -78,6 +189,27 @@ class WordTestSystem:
             self.logger.error("数据加载失败")
             self.display.print_color("RED", "数据加载失败!")
     
+    def shutdown(self):
+        """退出前写出全部数据"""
+        if self.persistence is not None:
+            if not self.persistence.stop(self.SHUTDOWN_TIMEOUT):
+                self.logger.warning("后台保存未在限时内完成，作答已写入事件日志，下次启动时重放")
+        else:
+            self.data_loader.save_data()
+        self.logger.disable_metrics()
+    
+    def handle_sigterm(self, signum, frame):
+        """收到SIGTERM时退出主循环，由 run 保存后退出
+
+        处理函数在主线程中执行，主线程可能正持有数据锁(更新作答时)，
+        在这里等待后台保存会互相等待；抛出的 SystemExit 先让调用栈
+        释放数据锁，再在 run 中保存。
+        """
+        self.logger.log_system_event("收到SIGTERM", "保存数据后退出")
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        self._terminated = True
+        sys.exit(0)
+    
     def show_menu(self):
         """显示主菜单"""
         self.display.print_title("主菜单")
@@ -106,13 +238,13 @@ class WordTestSystem:
                     result
                 )
             if self.settings['auto_save']:
-                self.data_loader.save_data()
+                self.data_loader.flush()
     
     def batch_test(self):
         """批量测试"""
         try:
             num = int(input("输入要测试的单词数量(默认10): ").strip() or "10")
-            mode = input("选择测试模式(random/focus/review, 默认random): ").strip() or "random"
+            mode = input("选择测试模式(random/focus/review/srs, 默认random): ").strip() or "random"
             
             stats = self.tester.batch_test(
                 num,
@@ -131,18 +263,23 @@ class WordTestSystem:
     
     def show_stats(self):
         """显示统计信息"""
+        # 基本统计和分数分布由增量统计量直接给出，与词库大小无关
         stats = self.analyzer.get_basic_stats()
-        score_dist = self.analyzer.get_score_distribution()
-        stats['score_distribution'] = score_dist
+        stats['score_distribution'] = self.analyzer.get_score_distribution()
         self.display.print_stats(stats)
     
     def show_word_info(self):
         """显示单词详情"""
         word = input("输入要查询的单词: ").strip()
-        matches = self.data_loader.df[self.data_loader.df['Words'].str.contains(word, case=False)]
+        # 使用单词索引查找(子串匹配，输入不作为正则表达式)
+        matches = self.data_loader.search_words(word)
+        if not matches:
+            matches = self.data_loader.search_words(word, 'fuzzy')
+            if matches:
+                self.display.print_color("YELLOW", "未找到包含该文本的单词，以下是相近的单词:")
         
-        if len(matches) > 0:
-            for idx, _ in matches.iterrows():
+        if matches:
+            for idx in matches:
                 word_info = self.data_loader.get_word_info(idx)
                 if word_info:
                     self.display.print_word_info(word_info)
@@ -179,7 +316,8 @@ class WordTestSystem:
                 if backups:
                     self.display.print_title("备份列表")
                     for b in backups:
-                        print(f"{b['name']} - {b['created']} ({b['size']}字节)")
+                        legacy = " [旧格式]" if b['legacy'] else ""
+                        print(f"{b['name']} - {b['created']} ({b['size']}字节){legacy}")
                 else:
                     self.display.print_color("YELLOW", "没有找到备份文件")
                     
@@ -196,9 +334,12 @@ class WordTestSystem:
                 try:
                     idx = int(input("\n选择要恢复的备份编号: ").strip()) - 1
                     if 0 <= idx < len(backups):
+                        # 先把事件日志压缩进当前文件，避免恢复后重放旧日志
+                        self.data_loader.save_data()
+                        # 旧格式备份没有记录原路径，恢复到当前单词文件
                         success, msg = self.backup.restore_backup(
                             backups[idx]['path'],
-                            self.settings['data_file']
+                            backups[idx]['source'] or self.settings['data_file']
                         )
                         self.display.print_color(
                             "GREEN" if success else "RED",
@@ -224,7 +365,16 @@ class WordTestSystem:
                 break
     
     def run(self):
-        """主运行循环"""
+        """主运行循环(收到SIGTERM时保存后退出)"""
+        try:
+            self._menu_loop()
+        except SystemExit:
+            if self._terminated:
+                self.shutdown()
+            raise
+
+    def _menu_loop(self):
+        """显示菜单并处理选择，直到选择退出"""
         while True:
             self.show_menu()
             choice = input("请选择: ").strip()
@@ -244,12 +394,35 @@ class WordTestSystem:
             elif choice == '7':
                 self.manage_backups()
             elif choice == '0':
-                self.data_loader.save_data()
+                self.shutdown()
                 self.display.print_color("GREEN", "感谢使用，再见!")
                 break
             else:
                 self.display.print_color("RED", "无效选择，请重新输入")
 
+def measure_startup(data_file=None):
+    """--startup-time: 测量到显示菜单和词库加载完成的时间，不进入交互"""
+    system = WordTestSystem(data_file)
+    system.show_menu()
+    menu_at = time.perf_counter()
+    system.wait_ready()
+    print(f"\n显示菜单: {(menu_at - STARTED) * 1000:.1f} ms")
+    print(f"词库就绪: {(system.ready_at - STARTED) * 1000:.1f} ms "
+          f"({len(system.data_loader.df) if system.data_loader.df is not None else 0} 个单词)")
+    # 没有作答，不需要写回
+    if system.persistence is not None:
+        system.persistence.stop()
+    system.logger.disable_metrics()
+
 if __name__ == "__main__":
-    system = WordTestSystem()
-    system.run()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description='六级单词测试系统')
+    parser.add_argument('--data', help='单词文件，覆盖 settings.json 中的 data_file')
+    parser.add_argument('--startup-time', action='store_true',
+                        help='只测量启动时间(显示菜单/词库就绪)后退出')
+    args = parser.parse_args()
+    if args.startup_time:
+        measure_startup(args.data)
+    else:
+        system = WordTestSystem(args.data)
+        system.run()
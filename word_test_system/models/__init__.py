@@ -1,5 +1,5 @@
 # Models package initialization
-from .word import Word
+from .word import Word, WordDeck
 from .test_history import TestRecord, TestHistory
 
-__all__ = ['Word', 'TestRecord', 'TestHistory']
\ No newline at end of file
+__all__ = ['Word', 'WordDeck', 'TestRecord', 'TestHistory']
\ No newline at end of file
@@ -1,107 +1,221 @@
-from dataclasses import dataclass
+from array import array
+from bisect import bisect_right
+from collections import Counter
 from datetime import datetime
-from typing import List, Dict, Union, Optional
+from typing import List, Dict, Iterable, Iterator, Union, Optional
+
+from core.schema import TIME_FORMAT
+
+# 跳过操作在分数列中的编码
+SKIP_CODE = -128
 
-@dataclass
 class TestRecord:
-    """测试记录类"""
-    timestamp: datetime           # 测试时间
-    score: Union[int, str]       # 测试分数或操作（如'skip'）
-    new_score: float             # 测试后的总分
-    
+    """测试记录类(从列式存储中按需生成的轻量视图)"""
+    __slots__ = ('timestamp', 'score', 'new_score')
+
+    def __init__(self, timestamp: datetime, score: Union[int, str], new_score: float):
+        self.timestamp = timestamp      # 测试时间
+        self.score = score              # 测试分数或操作（如'skip'）
+        self.new_score = new_score      # 测试后的总分
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, TestRecord):
+            return NotImplemented
+        return (self.timestamp, self.score, self.new_score) == \
+            (other.timestamp, other.score, other.new_score)
+
+    def __repr__(self) -> str:
+        return (f"TestRecord(timestamp={self.timestamp!r}, "
+                f"score={self.score!r}, new_score={self.new_score!r})")
+
     def to_dict(self) -> dict:
         """转换为字典格式"""
         return {
-            'timestamp': self.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+            'timestamp': self.timestamp.strftime(TIME_FORMAT),
             'score': self.score,
             'new_score': self.new_score
         }
-    
+
     @classmethod
     def from_dict(cls, data: dict) -> 'TestRecord':
         """从字典创建实例"""
         return cls(
-            timestamp=datetime.strptime(data['timestamp'], '%Y-%m-%d %H:%M:%S'),
+            timestamp=datetime.strptime(data['timestamp'], TIME_FORMAT),
             score=data['score'],
             new_score=data['new_score']
         )
 
 class TestHistory:
-    """测试历史类"""
+    """测试历史类
+
+    列式存储: 单词ID、分数编码(int8)、新分数(float)、时间戳(int64秒)
+    各存一个紧凑数组，另外为每个单词维护其记录位置列表，并按时间戳
+    排序以便二分查找，"某单词最近N条"和"最近D天"查询均为 O(log n + k)。
+    """
     def __init__(self):
-        self.history: Dict[str, List[TestRecord]] = {}
-    
+        self.words: List[str] = []              # 单词表，下标即单词ID
+        self._word_ids: Dict[str, int] = {}
+        self.word_ids = array('i')
+        self.scores = array('b')
+        self.new_scores = array('d')
+        self.timestamps = array('q')
+        self._by_word: Dict[int, array] = {}    # 单词ID -> 记录位置
+        self._time_order: Optional[List[int]] = None  # 时间戳乱序时的排序位置
+        self._score_counts: Counter = Counter()        # 分数编码 -> 记录数，随写入维护
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._word_ids
+
+    def copy(self) -> 'TestHistory':
+        """复制一份(供后台保存使用，数组整体复制)"""
+        history = TestHistory()
+        history.words = list(self.words)
+        history._word_ids = dict(self._word_ids)
+        history.word_ids = self.word_ids[:]
+        history.scores = self.scores[:]
+        history.new_scores = self.new_scores[:]
+        history.timestamps = self.timestamps[:]
+        history._by_word = {word_id: positions[:] for word_id, positions in self._by_word.items()}
+        history._time_order = list(self._time_order) if self._time_order is not None else None
+        history._score_counts = self._score_counts.copy()
+        return history
+
+    def _word_id(self, word: str) -> int:
+        """获取(必要时登记)单词ID"""
+        word_id = self._word_ids.get(word)
+        if word_id is None:
+            word_id = len(self.words)
+            self._word_ids[word] = word_id
+            self.words.append(word)
+            self._by_word[word_id] = array('I')
+        return word_id
+
     def add_record(self, word: str, score: Union[int, str],
-                   new_score: float) -> None:
+                   new_score: float, timestamp: Optional[datetime] = None) -> None:
         """添加测试记录"""
-        if word not in self.history:
-            self.history[word] = []
-        
-        record = TestRecord(
-            timestamp=datetime.now(),
-            score=score,
-            new_score=new_score
+        if timestamp is None:
+            timestamp = datetime.now()
+        seconds = int(timestamp.timestamp())
+
+        # 新记录早于已有记录时，时间索引需要单独排序
+        if self._time_order is None and self.timestamps and seconds < self.timestamps[-1]:
+            self._time_order = sorted(range(len(self.timestamps)), key=self.timestamps.__getitem__)
+        pos = len(self.timestamps)
+
+        word_id = self._word_id(word)
+        code = SKIP_CODE if score == 'skip' else int(score)
+        self.word_ids.append(word_id)
+        self.scores.append(code)
+        self._score_counts[code] += 1
+        self.new_scores.append(float(new_score))
+        self.timestamps.append(seconds)
+        self._by_word[word_id].append(pos)
+
+        if self._time_order is not None:
+            self._time_order.insert(self._insert_point(seconds), pos)
+
+    def _insert_point(self, seconds: float) -> int:
+        """时间索引中第一个晚于 seconds 的位置"""
+        lo, hi = 0, len(self._time_order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamps[self._time_order[mid]] <= seconds:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def record(self, pos: int) -> TestRecord:
+        """生成某一位置的记录视图"""
+        code = self.scores[pos]
+        return TestRecord(
+            timestamp=datetime.fromtimestamp(self.timestamps[pos]),
+            score='skip' if code == SKIP_CODE else code,
+            new_score=self.new_scores[pos]
         )
-        self.history[word].append(record)
-    
+
     def get_word_history(self, word: str,
                          limit: Optional[int] = None) -> List[TestRecord]:
-        """获取单词的测试历史"""
-        records = self.history.get(word, [])
+        """获取单词的测试历史(只访问该单词自己的记录)"""
+        word_id = self._word_ids.get(word)
+        if word_id is None:
+            return []
+        positions = self._by_word[word_id]
         if limit is not None:
-            records = records[-limit:]
-        return records
-    
+            positions = positions[-limit:] if limit > 0 else []
+        return [self.record(pos) for pos in positions]
+
+    def iter_since(self, cutoff: float) -> Iterator[int]:
+        """按时间顺序遍历时间戳晚于 cutoff 的记录位置"""
+        if self._time_order is None:
+            start = bisect_right(self.timestamps, int(cutoff))
+            return iter(range(start, len(self.timestamps)))
+        return iter(self._time_order[self._insert_point(cutoff):])
+
     def get_recent_records(self, days: int = 30) -> Dict[str, List[TestRecord]]:
         """获取最近的测试记录"""
         cutoff = datetime.now().timestamp() - (days * 24 * 60 * 60)
-        recent = {}
-        
-        for word, records in self.history.items():
-            recent_records = [
-                record for record in records
-                if record.timestamp.timestamp() > cutoff
-            ]
-            if recent_records:
-                recent[word] = recent_records
-        
+        recent: Dict[str, List[TestRecord]] = {}
+
+        for pos in self.iter_since(cutoff):
+            word = self.words[self.word_ids[pos]]
+            recent.setdefault(word, []).append(self.record(pos))
+
         return recent
-    
+
     def to_dict(self) -> dict:
         """转换为字典格式"""
         return {
-            word: [record.to_dict() for record in records]
-            for word, records in self.history.items()
+            self.words[word_id]: [self.record(pos).to_dict() for pos in positions]
+            for word_id, positions in self._by_word.items()
         }
-    
+
     @classmethod
     def from_dict(cls, data: dict) -> 'TestHistory':
-        """从字典创建实例"""
-        history = cls()
+        """从字典创建实例(整体按时间排序后写入，保持时间索引有序)"""
+        rows = []
         for word, records in data.items():
-            history.history[word] = [
-                TestRecord.from_dict(record) for record in records
-            ]
+            for record in records:
+                timestamp = datetime.fromisoformat(record['timestamp'])
+                rows.append((timestamp, word, record['score'], record['new_score']))
+        rows.sort(key=lambda row: row[0])
+
+        history = cls()
+        for timestamp, word, score, new_score in rows:
+            history.add_record(word, score, new_score, timestamp)
+        return history
+
+    def iter_records(self, start: int = 0) -> Iterator[dict]:
+        """按写入顺序逐条产出扁平记录(to_dict 的流式版本)，从第 start 条开始"""
+        for pos in range(start, len(self.timestamps)):
+            record = self.record(pos).to_dict()
+            record['word'] = self.words[self.word_ids[pos]]
+            yield record
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> 'TestHistory':
+        """从扁平记录流创建实例(from_dict 的流式版本)，逐条写入不需要整体排序"""
+        history = cls()
+        for record in records:
+            history.add_record(
+                record['word'],
+                record['score'],
+                record['new_score'],
+                datetime.fromisoformat(record['timestamp'])
+            )
         return history
-    
+
     def get_statistics(self) -> dict:
-        """获取测试统计信息"""
-        total_tests = sum(len(records) for records in self.history.values())
-        total_words = len(self.history)
-        
-        score_counts = {str(i): 0 for i in range(-2, 3)}
-        skip_count = 0
-        
-        for records in self.history.values():
-            for record in records:
-                if isinstance(record.score, int):
-                    score_counts[str(record.score)] += 1
-                elif record.score == 'skip':
-                    skip_count += 1
-        
+        """获取测试统计信息(计数随写入维护，不遍历记录)"""
+        counts = self._score_counts
+        score_counts = {str(i): counts.get(i, 0) for i in range(-2, 3)}
+
         return {
-            'total_tests': total_tests,
-            'total_words': total_words,
+            'total_tests': len(self.timestamps),
+            'total_words': len(self.words),
             'score_distribution': score_counts,
-            'skip_count': skip_count
-        }
\ No newline at end of file
+            'skip_count': counts.get(SKIP_CODE, 0)
+        }
@@ -1,60 +1,356 @@
-from dataclasses import dataclass
-from datetime import datetime
-from typing import Optional
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.schema import NOT_TESTED, TIME_FORMAT
+
+SECONDS_PER_DAY = 86400
+# 时间按不带时区的"挂钟时间"换算为秒，与DataFrame中的datetime64一致
+_EPOCH = datetime(1970, 1, 1)
+
+def to_seconds(timestamp: Optional[datetime]) -> int:
+    """时间转换为自1970-01-01起的秒数，None 为 NOT_TESTED"""
+    if timestamp is None:
+        return NOT_TESTED
+    return int((timestamp - _EPOCH) // timedelta(seconds=1))
+
+def from_seconds(seconds: int) -> Optional[datetime]:
+    """to_seconds 的逆变换"""
+    if seconds == NOT_TESTED:
+        return None
+    return _EPOCH + timedelta(seconds=int(seconds))
+
+class StringTable:
+    """去重的字符串表
+
+    每个不同的字符串只存一次: 全部UTF-8编码拼接在一个字节串中，另存各自
+    的起始偏移，按编号取出时才解码。字符串到编号的查找表在第一次查找时建立。
+    """
+    def __init__(self):
+        self._data = bytearray()
+        self._offsets = array('q', [0])
+        self._ids: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def build(cls, strings: Iterable[str]) -> Tuple['StringTable', np.ndarray]:
+        """由字符串序列建表，返回表和各字符串的编号"""
+        table = cls()
+        ids: Dict[str, int] = {}
+        codes = array('i')
+        chunks = []
+        end = 0
+        for string in strings:
+            code = ids.get(string)
+            if code is None:
+                code = len(chunks)
+                ids[string] = code
+                encoded = string.encode('utf-8')
+                chunks.append(encoded)
+                end += len(encoded)
+                table._offsets.append(end)
+            codes.append(code)
+        table._data = bytearray(b''.join(chunks))
+        return table, np.frombuffer(codes, dtype=np.int32).copy()
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, code: int) -> str:
+        return self._data[self._offsets[code]:self._offsets[code + 1]].decode('utf-8')
+
+    def find(self, string: str) -> Optional[int]:
+        """字符串的编号，不在表中时返回None"""
+        if self._ids is None:
+            self._ids = {self[code]: code for code in range(len(self))}
+        return self._ids.get(string)
+
+    def intern(self, string: str) -> int:
+        """字符串的编号，不在表中时追加"""
+        code = self.find(string)
+        if code is None:
+            code = len(self)
+            self._data += string.encode('utf-8')
+            self._offsets.append(len(self._data))
+            self._ids[string] = code
+        return code
+
+    @property
+    def nbytes(self) -> int:
+        """字节串与偏移数组占用的字节数(不含查找表)"""
+        return len(self._data) + self._offsets.itemsize * len(self._offsets)
+
+def _column(values, size: int, dtype, default) -> np.ndarray:
+    if values is None:
+        return np.full(size, default, dtype=dtype)
+    column = np.array(values, dtype=dtype)
+    if len(column) != size:
+        raise ValueError(f"列长度 {len(column)} 与单词数 {size} 不一致")
+    return column
+
+class WordDeck:
+    """按列存储的词库
+
+    页码、测试次数、跳过次数为int32，分数为float64，最后测试时间为int64秒
+    (未测试为 NOT_TESTED)；单词只在字符串表中存一次，各行保存其编号。
+    按行修改直接写数组，按位置取出的 Word 是对某一行的视图。
+    DataLoader 和选词仍以 DataFrame 为数据源，需要紧凑存储时用
+    from_frame/to_frame 转换。
+    """
+    def __init__(self, words: Iterable[str] = (), page=None, times=None, score=None,
+                 skip_count=None, last_tested=None):
+        self.strings, self.word_id = StringTable.build(words)
+        size = len(self.word_id)
+        self.page = _column(page, size, np.int32, 0)
+        self.times = _column(times, size, np.int32, 0)
+        self.score = _column(score, size, np.float64, 0)
+        self.skip_count = _column(skip_count, size, np.int32, 0)
+        if last_tested is not None and not isinstance(last_tested, np.ndarray):
+            last_tested = [value if isinstance(value, (int, np.integer)) else to_seconds(value)
+                           for value in last_tested]
+        self.last_tested = _column(last_tested, size, np.int64, NOT_TESTED)
+        self._rows: Optional[np.ndarray] = None   # 单词编号 -> 首次出现的行
+
+    @classmethod
+    def from_frame(cls, df) -> 'WordDeck':
+        """由DataLoader格式的DataFrame创建(Words/Page/Times/Score/SkipCount/LastTested)"""
+        last_tested = pd.to_datetime(df['LastTested'], errors='coerce')
+        seconds = last_tested.to_numpy(dtype='datetime64[s]').astype(np.int64)
+        seconds[last_tested.isna().to_numpy()] = NOT_TESTED
+        return cls(
+            df['Words'].astype(str),
+            df['Page'].to_numpy(),
+            df['Times'].fillna(0).to_numpy(),
+            df['Score'].fillna(0).to_numpy(),
+            df['SkipCount'].fillna(0).to_numpy(),
+            seconds
+        )
+
+    def to_frame(self):
+        """转换为DataLoader格式的DataFrame"""
+        tested = self.last_tested != NOT_TESTED
+        last_tested = np.where(tested, self.last_tested, 0).astype('datetime64[s]')
+        return pd.DataFrame({
+            'Words': self.words(),
+            'Page': self.page,
+            'Times': self.times,
+            'Score': self.score,
+            'LastTested': pd.Series(last_tested).where(tested),
+            'SkipCount': self.skip_count
+        })
+
+    def __len__(self) -> int:
+        return len(self.word_id)
+
+    def __getitem__(self, pos: int) -> 'Word':
+        if not -len(self) <= pos < len(self):
+            raise IndexError(pos)
+        return Word.view(self, pos % len(self))
+
+    def __iter__(self) -> Iterator['Word']:
+        for pos in range(len(self)):
+            yield Word.view(self, pos)
+
+    def word(self, pos: int) -> str:
+        return self.strings[self.word_id[pos]]
+
+    def words(self) -> List[str]:
+        strings = self.strings
+        return [strings[code] for code in self.word_id.tolist()]
+
+    def position(self, word: str) -> Optional[int]:
+        """单词所在的行(重复时取第一行)，不存在时返回None"""
+        code = self.strings.find(word)
+        if code is None or code >= len(self._row_table()):
+            return None
+        pos = int(self._rows[code])
+        return pos if pos >= 0 else None
+
+    def _row_table(self) -> np.ndarray:
+        if self._rows is None:
+            self._rows = np.full(len(self.strings), -1, dtype=np.int64)
+            # 倒序写入，重复的单词最后留下的是第一行
+            self._rows[self.word_id[::-1]] = np.arange(len(self) - 1, -1, -1)
+        return self._rows
+
+    def set_word(self, pos: int, word: str) -> None:
+        self.word_id[pos] = self.strings.intern(word)
+        self._rows = None
+
+    def answer(self, pos: int, score: int, now: Optional[datetime] = None) -> None:
+        """记录一次作答: 次数加一、累加分数、更新测试时间"""
+        self.times[pos] += 1
+        self.score[pos] += score
+        self.last_tested[pos] = to_seconds(now or datetime.now())
+
+    def skip(self, pos: int, now: Optional[datetime] = None) -> None:
+        """记录一次跳过"""
+        self.skip_count[pos] += 1
+        self.last_tested[pos] = to_seconds(now or datetime.now())
+
+    def days_since_tested(self, now: Optional[datetime] = None,
+                          fill: float = np.nan) -> np.ndarray:
+        """各行距上次测试的整天数(不会为负)，未测试的取 fill"""
+        tested = self.last_tested != NOT_TESTED
+        seconds = to_seconds(now or datetime.now()) - np.where(tested, self.last_tested, 0)
+        days = np.maximum(seconds // SECONDS_PER_DAY, 0).astype(float)
+        days[~tested] = fill
+        return days
+
+    @property
+    def nbytes(self) -> int:
+        """各列数组与字符串表占用的字节数"""
+        columns = (self.word_id, self.page, self.times, self.score,
+                   self.skip_count, self.last_tested)
+        return sum(column.nbytes for column in columns) + self.strings.nbytes
 
-@dataclass
 class Word:
-    """单词模型类"""
-    word: str                      # 单词
-    page: int                      # 页码
-    times: int = 0                 # 测试次数
-    score: float = 0.0             # 当前分数
-    skip_count: int = 0            # 跳过次数
-    last_tested: Optional[datetime] = None  # 最后测试时间
-    
+    """单词模型类
+
+    由 WordDeck 取出时是对其中一行的视图(属性直接读写词库的数组)；
+    单独创建的单词把各字段保存在一个小列表中，不分配数组。
+    """
+    __slots__ = ('deck', 'pos', '_row')
+
+    # 单独创建的单词在 _row 中的字段顺序
+    _FIELDS = ('word', 'page', 'times', 'score', 'skip_count', 'last_tested')
+
+    def __init__(self, word: str, page: int, times: int = 0, score: float = 0.0,
+                 skip_count: int = 0, last_tested: Optional[datetime] = None):
+        self.deck: Optional[WordDeck] = None
+        self.pos = 0
+        self._row = [word, page, times, score, skip_count, last_tested]
+
+    @classmethod
+    def view(cls, deck: WordDeck, pos: int) -> 'Word':
+        """词库中第 pos 行的视图(不复制数据)"""
+        word = cls.__new__(cls)
+        word.deck = deck
+        word.pos = pos
+        word._row = None
+        return word
+
+    def _get(self, field: str, column: str, convert):
+        if self.deck is None:
+            return self._row[self._FIELDS.index(field)]
+        return convert(getattr(self.deck, column)[self.pos])
+
+    def _set(self, field: str, column: str, value) -> None:
+        if self.deck is None:
+            self._row[self._FIELDS.index(field)] = value
+        else:
+            getattr(self.deck, column)[self.pos] = value
+
+    @property
+    def word(self) -> str:
+        return self._row[0] if self.deck is None else self.deck.word(self.pos)
+
+    @word.setter
+    def word(self, value: str) -> None:
+        if self.deck is None:
+            self._row[0] = value
+        else:
+            self.deck.set_word(self.pos, value)
+
+    @property
+    def page(self) -> int:
+        return self._get('page', 'page', int)
+
+    @page.setter
+    def page(self, value: int) -> None:
+        self._set('page', 'page', value)
+
+    @property
+    def times(self) -> int:
+        return self._get('times', 'times', int)
+
+    @times.setter
+    def times(self, value: int) -> None:
+        self._set('times', 'times', value)
+
+    @property
+    def score(self) -> float:
+        return self._get('score', 'score', float)
+
+    @score.setter
+    def score(self, value: float) -> None:
+        self._set('score', 'score', value)
+
+    @property
+    def skip_count(self) -> int:
+        return self._get('skip_count', 'skip_count', int)
+
+    @skip_count.setter
+    def skip_count(self, value: int) -> None:
+        self._set('skip_count', 'skip_count', value)
+
+    @property
+    def last_tested(self) -> Optional[datetime]:
+        return self._get('last_tested', 'last_tested', from_seconds)
+
+    @last_tested.setter
+    def last_tested(self, value: Optional[datetime]) -> None:
+        self._set('last_tested', 'last_tested', value if self.deck is None else to_seconds(value))
+
     def update_score(self, score: int) -> None:
         """更新分数"""
+        if self.deck is not None:
+            self.deck.answer(self.pos, score)
+            return
         self.score += score
         self.times += 1
         self.last_tested = datetime.now()
-    
+
     def skip(self) -> None:
         """跳过单词"""
+        if self.deck is not None:
+            self.deck.skip(self.pos)
+            return
         self.skip_count += 1
         self.last_tested = datetime.now()
-    
+
     def days_since_last_test(self) -> Optional[int]:
         """获取距离上次测试的天数"""
-        if self.last_tested is None:
+        last_tested = self.last_tested
+        if last_tested is None:
             return None
-        delta = datetime.now() - self.last_tested
+        delta = datetime.now() - last_tested
         return delta.days
-    
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Word):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return (f"Word(word={self.word!r}, page={self.page!r}, times={self.times!r}, "
+                f"score={self.score!r}, skip_count={self.skip_count!r}, "
+                f"last_tested={self.last_tested!r})")
+
     def to_dict(self) -> dict:
         """转换为字典格式"""
+        last_tested = self.last_tested
         return {
             'word': self.word,
             'page': self.page,
             'times': self.times,
             'score': self.score,
             'skip_count': self.skip_count,
-            'last_tested': self.last_tested.strftime('%Y-%m-%d %H:%M:%S')
-                if self.last_tested else None
+            'last_tested': last_tested.strftime(TIME_FORMAT) if last_tested else None
         }
-    
+
     @classmethod
     def from_dict(cls, data: dict) -> 'Word':
         """从字典创建实例"""
         last_tested = None
         if data.get('last_tested'):
             try:
-                last_tested = datetime.strptime(
-                    data['last_tested'],
-                    '%Y-%m-%d %H:%M:%S'
-                )
+                last_tested = datetime.strptime(data['last_tested'], TIME_FORMAT)
             except ValueError:
                 pass
-        
+
         return cls(
             word=data['word'],
             page=data['page'],
@@ -62,4 +358,4 @@ class Word:
             score=data.get('score', 0.0),
             skip_count=data.get('skip_count', 0),
             last_tested=last_tested
-        )
\ No newline at end of file
+        )
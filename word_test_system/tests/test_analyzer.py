@@ -0,0 +1,166 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from core.analyzer import Analyzer
+from core.data_loader import DataLoader
+from core.rollups import ProgressRollup
+from core.schema import days_since_tested
+from core.topk import TopK, smallest_k, largest_k
+
+class TestAnalyzer(unittest.TestCase):
+    def setUp(self):
+        """测试前准备"""
+        rng = np.random.default_rng(1)
+        now = datetime.now()
+        n = 200
+        last_tested = pd.Series(
+            [now - timedelta(days=int(d)) for d in rng.integers(0, 60, n)]
+        ).where(rng.random(n) > 0.2)
+        self.df = pd.DataFrame({
+            'Words': [f'word{i}' for i in range(n)],
+            'Page': rng.integers(1, 50, n),
+            'Times': rng.integers(0, 5, n),
+            'Score': rng.integers(-4, 5, n).astype(float),
+            'LastTested': last_tested,
+            'SkipCount': 0
+        })
+        self.analyzer = Analyzer(self.df)
+
+    def test_topk(self):
+        """测试top-k与nsmallest/nlargest的顺序一致"""
+        values = np.array([3, 1, np.nan, 1, 2, 1, 5], dtype=float)
+        series = pd.Series(values)
+        for k in range(0, 7):
+            self.assertEqual(smallest_k(values, k).tolist(),
+                             series.nsmallest(k).index.tolist())
+            self.assertEqual(largest_k(values, k).tolist(),
+                             series.nlargest(k).index.tolist())
+
+        # 逐个修改键后，增量维护的前k个与重新计算一致
+        rng = np.random.default_rng(1)
+        values = rng.integers(-3, 3, 100).astype(float)
+        topk = TopK(values, 10)
+        for _ in range(500):
+            pos = int(rng.integers(0, 100))
+            values[pos] = np.nan if rng.random() < 0.1 else rng.integers(-3, 3)
+            topk.update(pos, values[pos])
+            self.assertEqual(topk.smallest(), smallest_k(values, 10).tolist())
+        self.assertEqual(topk.smallest(3), smallest_k(values, 3).tolist())
+
+    def test_score_distribution(self):
+        """测试分数分布与pd.cut一致"""
+        bins = [-float('inf'), -2, -1, 0, 1, 2, float('inf')]
+        labels = ['<-2', '-2~-1', '-1~0', '0~1', '1~2', '>2']
+        expected = pd.cut(self.df['Score'], bins=bins, labels=labels).value_counts().sort_index()
+        self.assertEqual(self.analyzer.get_score_distribution(), expected.to_dict())
+
+    def test_weak_words(self):
+        """测试薄弱单词"""
+        weak = self.analyzer.get_weak_words(10)
+        expected = self.df.nsmallest(10, 'Score')
+        self.assertEqual([w['word'] for w in weak], expected['Words'].tolist())
+        self.assertEqual(weak[0]['score'], expected['Score'].iloc[0])
+
+    def test_report(self):
+        """测试一次统计生成的报表与单独查询一致"""
+        report = self.analyzer.get_report(5)
+        self.assertEqual(report['total_words'], 200)
+        self.assertEqual(report['tested_words'], int((self.df['Times'] > 0).sum()))
+        self.assertAlmostEqual(report['avg_score'], self.df['Score'].mean())
+        self.assertEqual(report['score_distribution'], self.analyzer.get_score_distribution())
+
+        priority = self.df['Score'] * days_since_tested(self.df['LastTested'], datetime.now())
+        expected = self.df.loc[priority.nlargest(5).index, 'Words'].tolist()
+        self.assertEqual([w['word'] for w in report['review_suggestions']], expected)
+        self.assertIn('days_since_tested', report['review_suggestions'][0])
+
+    def test_incremental_aggregates(self):
+        """测试作答后增量维护的统计量与全量重算一致"""
+        loader = DataLoader('test_words.xlsx')
+        loader.df = self.df
+        self.analyzer.bind(loader)
+        rng = np.random.default_rng(2)
+        for _ in range(300):
+            idx = int(rng.integers(0, len(self.df)))
+            if rng.random() < 0.2:
+                loader.skip_word(idx)
+            else:
+                loader.update_word_data(idx, int(rng.integers(-2, 3)))
+
+        aggregates = self.analyzer.aggregates
+        incremental = self.analyzer.get_basic_stats()
+        self.assertEqual(self.analyzer.get_score_distribution(), aggregates.score_distribution())
+        self.assertTrue(aggregates.verify())
+        self.assertEqual(incremental, self.analyzer._basic_stats(self.analyzer._stats_pass()))
+        weak = [w['word'] for w in self.analyzer.get_weak_words(10)]
+        expected = self.df.nsmallest(10, 'Score')['Words'].tolist()
+        self.assertEqual(weak, expected)
+        loader.storage.close()
+
+    def test_progress_rollup(self):
+        """测试由历史预聚合的学习进度: 每次作答都计入，区分新单词和复习"""
+        now = datetime.now().replace(hour=12, minute=30, second=0, microsecond=0)
+        rollup = ProgressRollup()
+        rollup.add('apple', 1, now - timedelta(days=2))
+        rollup.add('apple', -1, now - timedelta(days=2, hours=1))
+        rollup.add('pear', 'skip', now - timedelta(days=1))
+        rollup.add('pear', 2, now)
+        rollup.add('apple', 0, now)
+        rollup.add('old', 2, now - timedelta(days=60))
+
+        progress = rollup.query(30, now=now)
+        self.assertEqual(progress['counts'], [2, 0, 2])
+        self.assertEqual(progress['avg_scores'][0], 0)
+        self.assertEqual(progress['min_scores'][0], -1)
+        self.assertEqual(progress['skips'], [0, 1, 0])
+        self.assertEqual(progress['new_words'], [1, 0, 1])
+        self.assertEqual(progress['review_words'], [1, 0, 1])
+        self.assertEqual(len(rollup.query(90, now=now)['dates']), 4)
+        self.assertEqual(rollup.query(1, 'hour', now=now)['counts'][-1], 2)
+
+        data = rollup.to_dict()
+        restored = ProgressRollup.from_dict(data)
+        self.assertEqual(restored.query(365, 'hour', now=now), rollup.query(365, 'hour', now=now))
+
+        # 导出的是副本，之后的作答不影响正在写出的数据
+        rollup.add('pear', 1, now)
+        rollup.add('plum', 1, now + timedelta(days=1))
+        self.assertEqual(sum(b[0] for b in data['buckets']['day'].values()), data['count'] - 1)
+
+    def test_progress_persisted_with_deck(self):
+        """测试学习进度随作答增量更新，保存后与全量重建一致"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'words.xlsx')
+            self.df[['Words', 'Page']].to_excel(path, index=False)
+            loader = DataLoader(path)
+            loader.storage.history_file = os.path.join(tmp, 'history.json')
+            loader.storage.backup_dir = os.path.join(tmp, 'backups')
+            loader.load_data()
+            self.analyzer.bind(loader)
+            self.analyzer.set_data(loader.df)
+            for idx, score in [(0, 2), (1, -1), (0, 1)]:
+                loader.update_word_data(idx, score)
+                loader.record_test_history(idx, score)
+            progress = self.analyzer.get_learning_progress(30)
+            self.assertEqual(progress['counts'], [3])
+            self.assertEqual(progress['new_words'], [2])
+            loader.save_data()
+            self.assertTrue(os.path.exists(loader.rollup_path))
+
+            loader.record_test_history(2, 'skip')
+            loader.storage.close()
+            reloaded = DataLoader(path, storage=loader.storage)
+            reloaded.rollup_path = loader.rollup_path
+            reloaded.load_data()
+            self.assertEqual(reloaded.progress.count, 4)
+            self.assertEqual(
+                reloaded.progress.to_dict(),
+                ProgressRollup.from_history(reloaded.test_history).to_dict()
+            )
+            reloaded.storage.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import unittest
+import os
+import shutil
+import threading
+from utils.backup import Backup
+
+class TestBackup(unittest.TestCase):
+    def setUp(self):
+        """测试前准备"""
+        self.backup_dir = 'test_backups'
+        self.source_dir = 'test_backup_source'
+        os.makedirs(self.source_dir)
+        self.data_file = os.path.join(self.source_dir, 'data.bin')
+        self.write(self.data_file, os.urandom(Backup.CHUNK_SIZE * 2 + 100))
+        self.backup = Backup(self.backup_dir)
+
+    def tearDown(self):
+        """测试后清理"""
+        for path in [self.backup_dir, self.source_dir]:
+            if os.path.exists(path):
+                shutil.rmtree(path)
+
+    def write(self, path, data):
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def chunk_count(self):
+        return sum(len(files) for _, _, files in os.walk(self.backup.chunk_dir))
+
+    def test_deduplication(self):
+        """测试未变化的数据块不会重复保存"""
+        success, _ = self.backup.create_backup(self.data_file, 'manual')
+        self.assertTrue(success)
+        self.assertEqual(self.chunk_count(), 3)
+
+        success, _ = self.backup.create_backup(self.data_file, 'manual')
+        self.assertTrue(success)
+        self.assertEqual(self.chunk_count(), 3)
+        self.assertEqual(self.backup.list_backups()[0]['stored_size'], 0)
+
+        # 只修改最后一块，只新增一个块
+        data = self.read(self.data_file)
+        self.write(self.data_file, data[:-1] + b'x')
+        self.backup.create_backup(self.data_file, 'manual')
+        self.assertEqual(self.chunk_count(), 4)
+
+    def test_restore(self):
+        """测试从清单恢复文件和目录"""
+        original = self.read(self.data_file)
+        _, manifest = self.backup.create_backup(self.data_file, 'manual')
+        self.write(self.data_file, b'changed')
+
+        success, _ = self.backup.restore_backup(manifest)
+        self.assertTrue(success)
+        self.assertEqual(self.read(self.data_file), original)
+
+        # 目录备份
+        self.write(os.path.join(self.source_dir, 'meta.json'), b'{}')
+        _, manifest = self.backup.create_backup(self.source_dir, 'auto')
+        shutil.rmtree(self.source_dir)
+        success, _ = self.backup.restore_backup(manifest)
+        self.assertTrue(success)
+        self.assertEqual(self.read(self.data_file), original)
+        self.assertEqual(self.read(os.path.join(self.source_dir, 'meta.json')), b'{}')
+
+    def test_clean_old_backups(self):
+        """测试清理旧备份并回收不再引用的块"""
+        self.backup.create_backup(self.data_file, 'manual')
+        self.write(self.data_file, os.urandom(100))
+        self.backup.create_backup(self.data_file, 'manual')
+        self.assertEqual(self.chunk_count(), 4)
+
+        success, _ = self.backup.clean_old_backups(1)
+        self.assertTrue(success)
+        backups = self.backup.list_backups()
+        self.assertEqual(len(backups), 1)
+        self.assertEqual(backups[0]['size'], 100)
+        self.assertEqual(self.chunk_count(), 1)
+
+        success, _ = self.backup.restore_backup(backups[0]['path'])
+        self.assertTrue(success)
+        self.assertEqual(len(self.read(self.data_file)), 100)
+
+    def test_legacy_backups(self):
+        """测试旧版本的整文件备份仍可列出、恢复和清理"""
+        legacy_path = os.path.join(self.backup_dir, 'data_auto_20240101_120000.bin')
+        self.write(legacy_path, b'legacy')
+        os.utime(legacy_path, (0, 0))
+        self.backup.create_backup(self.data_file, 'manual')
+
+        backups = self.backup.list_backups()
+        self.assertEqual([b['legacy'] for b in backups], [False, True])
+        self.assertIsNone(backups[1]['source'])
+        self.assertFalse(self.backup.restore_backup(legacy_path)[0])
+        success, _ = self.backup.restore_backup(legacy_path, self.data_file)
+        self.assertTrue(success)
+        self.assertEqual(self.read(self.data_file), b'legacy')
+        self.assertGreater(os.path.getmtime(self.data_file), 0)
+
+        success, _ = self.backup.clean_old_backups(1)
+        self.assertTrue(success)
+        self.assertFalse(os.path.exists(legacy_path))
+        self.assertEqual(len(self.backup.list_backups()), 1)
+
+    def test_clean_keeps_unfinished_chunks(self):
+        """测试清理不删除写了一半的块，也不与正在创建的备份同时进行"""
+        self.backup.create_backup(self.data_file, 'manual')
+        tmp_chunk = os.path.join(self.backup.chunk_dir, 'ab', 'ab' + '0' * 62 + '.zlib.tmp')
+        os.makedirs(os.path.dirname(tmp_chunk), exist_ok=True)
+        self.write(tmp_chunk, b'partial')
+
+        other = Backup(self.backup_dir)
+        with self.backup._locked():
+            result = []
+            cleaner = threading.Thread(target=lambda: result.append(other.clean_old_backups(0)))
+            cleaner.start()
+            cleaner.join(0.2)
+            # 持锁期间清理在等待
+            self.assertTrue(cleaner.is_alive())
+        cleaner.join(10)
+        self.assertTrue(result[0][0])
+        self.assertTrue(os.path.exists(tmp_chunk))
+        self.assertEqual(other.list_backups(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import json
+import os
+import tempfile
+from benchmarks.deck import make_deck
+from core.batch import find_decks, run_batch
+from core.storage import history_path
+from core.storage import SQLiteStorage
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        """测试前准备: 几个用户目录下的Excel词库和一个SQLite词库"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.decks = []
+        for i in range(3):
+            directory = os.path.join(self.tmp.name, 'decks', f'user{i}')
+            os.makedirs(directory)
+            df, _ = make_deck(50, seed=i)
+            path = os.path.join(directory, 'words.xlsx')
+            df.to_excel(path, index=False)
+            self.decks.append(path)
+        path = os.path.join(self.tmp.name, 'decks', 'user3.db')
+        df, history = make_deck(50, seed=3)
+        storage = SQLiteStorage(path)
+        storage.save(df, history)
+        storage.close()
+        self.decks.append(path)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.tmp.cleanup()
+
+    def read_results(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return {result['deck']: result for result in map(json.loads, f)}
+
+    def test_find_decks(self):
+        """测试目录展开"""
+        self.assertEqual(
+            sorted(find_decks([os.path.join(self.tmp.name, 'decks')])),
+            sorted(self.decks)
+        )
+
+    def test_process_pool_matches_serial(self):
+        """测试进程池结果与串行一致"""
+        decks_dir = os.path.join(self.tmp.name, 'decks')
+        missing = os.path.join(self.tmp.name, 'missing.xlsx')
+        serial = os.path.join(self.tmp.name, 'serial.jsonl')
+        pooled = os.path.join(self.tmp.name, 'pooled.jsonl')
+
+        summary = run_batch([decks_dir, missing], serial, workers=0, limit=5)
+        self.assertEqual(summary['decks'], 5)
+        self.assertEqual(summary['failed'], 1)
+        run_batch([decks_dir, missing], pooled, workers=2, chunk_size=2, limit=5, max_pending=1)
+
+        serial_results = self.read_results(serial)
+        pooled_results = self.read_results(pooled)
+        self.assertEqual(serial_results.keys(), pooled_results.keys())
+        self.assertFalse(pooled_results[missing]['ok'])
+        for deck in self.decks:
+            result = pooled_results[deck]
+            self.assertTrue(result['ok'])
+            self.assertEqual(result['total_words'], 50)
+            self.assertEqual(len(result['weak_words']), 5)
+            self.assertEqual(len(result['focus_words']), 5)
+            self.assertEqual(result['review_words'], serial_results[deck]['review_words'])
+            self.assertEqual(result['score_distribution'], serial_results[deck]['score_distribution'])
+
+    def test_read_only(self):
+        """测试批量分析不改动词库目录中的任何文件"""
+        decks_dir = os.path.join(self.tmp.name, 'decks')
+        legacy = history_path(self.decks[0])
+        with open(legacy, 'w', encoding='utf-8') as f:
+            json.dump({'w0': [{'timestamp': '2024-01-01 10:00:00', 'score': 1, 'new_score': 1}]},
+                      f, indent=2)
+
+        def listing():
+            # WAL模式的数据库即使只读打开，SQLite也会建立 -wal/-shm 辅助文件
+            return {
+                os.path.join(root, name): os.path.getmtime(os.path.join(root, name))
+                for root, _, files in os.walk(decks_dir) for name in files
+                if not name.endswith(('-wal', '-shm'))
+            }
+        before = listing()
+        summary = run_batch([decks_dir], os.path.join(self.tmp.name, 'out.jsonl'), workers=0)
+        self.assertEqual(summary['failed'], 0)
+        self.assertEqual(listing(), before)
+
+if __name__ == '__main__':
+    unittest.main()
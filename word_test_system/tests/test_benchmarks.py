@@ -0,0 +1,27 @@
+import unittest
+import contextlib
+import io
+from benchmarks.deck import make_deck
+from benchmarks.run import main
+
+class TestBenchmarks(unittest.TestCase):
+    def test_make_deck(self):
+        """测试合成词库可重复生成"""
+        df, history = make_deck(500, history_depth=2, seed=3)
+        other, _ = make_deck(500, history_depth=2, seed=3)
+        self.assertEqual(len(df), 500)
+        self.assertTrue(df['Score'].equals(other['Score']))
+        self.assertEqual(history.get_statistics()['total_words'], int((df['Times'] > 0).sum()))
+
+    def test_run(self):
+        """冒烟测试: 小规模运行全部基准"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = main(['--sizes', '200', '--repeat', '1', '--budget', '0'])
+        names = {result['name'] for result in report['results']}
+        for name in ['load_data', 'save_data', 'select_word[srs]',
+                     'batch_test[random]', 'analyzer.get_report']:
+            self.assertIn(name, names)
+        self.assertTrue(all(result['median'] >= 0 for result in report['results']))
+
+if __name__ == '__main__':
+    unittest.main()
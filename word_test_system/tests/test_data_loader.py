@@ -1,15 +1,18 @@
 import unittest
 import pandas as pd
+import numpy as np
 import os
 import json
+import shutil
 from datetime import datetime
 from core.data_loader import DataLoader
+from core.storage import create_storage, history_path
 
 class TestDataLoader(unittest.TestCase):
     def setUp(self):
         """测试前准备"""
         self.test_file = 'test_words.xlsx'
-        self.test_history_file = 'test_history.json'
+        self.test_history_file = 'test_words.history.json'
         
         # 创建测试用Excel文件
         df = pd.DataFrame({
@@ -29,12 +32,18 @@ class TestDataLoader(unittest.TestCase):
         # 删除测试文件
         if os.path.exists(self.test_file):
             os.remove(self.test_file)
-        if os.path.exists(self.test_history_file):
-            os.remove(self.test_history_file)
+        for path in (self.test_history_file, 'test_words.history.mark.json', 'test_history.json'):
+            if os.path.exists(path):
+                os.remove(path)
+        for path in ('test_words.journal', 'test_words.journal.1'):
+            if os.path.exists(path):
+                os.remove(path)
+        if os.path.exists('test_words.rollup.json'):
+            os.remove('test_words.rollup.json')
+        if os.path.exists('test_words.deck'):
+            shutil.rmtree('test_words.deck')
         if os.path.exists('backups'):
-            for file in os.listdir('backups'):
-                os.remove(os.path.join('backups', file))
-            os.rmdir('backups')
+            shutil.rmtree('backups')
     
     def test_load_data(self):
         """测试数据加载"""
@@ -46,6 +55,9 @@ class TestDataLoader(unittest.TestCase):
         required_columns = ['Times', 'Score', 'LastTested', 'SkipCount']
         for col in required_columns:
             self.assertIn(col, self.loader.df.columns)
+        
+        # LastTested在加载时解析为datetime类型
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(self.loader.df['LastTested']))
     
     def test_save_data(self):
         """测试数据保存"""
@@ -54,6 +66,7 @@ class TestDataLoader(unittest.TestCase):
         # 修改数据
         self.loader.df.at[0, 'Score'] = 1
         self.loader.df.at[0, 'Times'] = 1
+        self.loader.update_word_data(1, 1)
         
         # 保存数据
         self.assertTrue(self.loader.save_data())
@@ -63,6 +76,46 @@ class TestDataLoader(unittest.TestCase):
         new_loader.load_data()
         self.assertEqual(new_loader.df.at[0, 'Score'], 1)
         self.assertEqual(new_loader.df.at[0, 'Times'], 1)
+        
+        # 导出的Excel中LastTested仍为字符串
+        exported = pd.read_excel(self.test_file)
+        last_tested = self.loader.df.at[1, 'LastTested'].strftime('%Y-%m-%d %H:%M:%S')
+        self.assertEqual(exported.at[1, 'LastTested'], last_tested)
+        self.assertTrue(pd.isna(exported.at[0, 'LastTested']))
+    
+    def test_binary_snapshot(self):
+        """测试二进制快照的保存与优先加载"""
+        self.loader.load_data()
+        self.loader.update_word_data(0, -1)
+        self.assertTrue(self.loader.save_data())
+        self.assertTrue(self.loader.storage.snapshot.is_newer_than(self.test_file))
+        
+        # 删除Excel后仍可从快照加载，列约定保持不变
+        os.remove(self.test_file)
+        new_loader = DataLoader(self.test_file)
+        self.assertTrue(new_loader.load_data())
+        self.assertEqual(list(new_loader.df.columns), list(self.loader.df.columns))
+        self.assertEqual(new_loader.df['Words'].tolist(), ['test1', 'test2', 'test3'])
+        self.assertEqual(new_loader.df['Page'].tolist(), [1, 2, 3])
+        self.assertEqual(new_loader.df.at[0, 'Score'], -1)
+        self.assertEqual(new_loader.df.at[0, 'LastTested'], self.loader.df.at[0, 'LastTested'])
+        self.assertTrue(pd.isna(new_loader.df.at[1, 'LastTested']))
+
+        # 数值列直接使用内存映射，修改不写回快照文件，之后仍可再次保存
+        snapshot = new_loader.storage.snapshot
+        if not snapshot.COPY_ON_LOAD:
+            base = new_loader.df['Times'].to_numpy()
+            while base is not None and not isinstance(base, np.memmap):
+                base = base.base
+            self.assertIsInstance(base, np.memmap)
+        new_loader.update_word_data(0, 2)
+        self.assertEqual(snapshot.load().at[0, 'Score'], -1)
+        self.assertTrue(new_loader.save_data())
+        self.assertEqual(snapshot.load().at[0, 'Score'], 1)
+        
+        # 快照加载的数据可以继续修改
+        new_loader.update_word_data(1, 2)
+        self.assertEqual(new_loader.df.at[1, 'Score'], 2)
     
     def test_update_word_data(self):
         """测试单词数据更新"""
@@ -85,8 +138,133 @@ class TestDataLoader(unittest.TestCase):
         # 验证历史记录
         word = self.loader.df.at[0, 'Words']
         self.assertIn(word, self.loader.test_history)
-        self.assertEqual(len(self.loader.test_history[word]), 1)
-        self.assertEqual(self.loader.test_history[word][0]['score'], 1)
+        records = self.loader.test_history.get_word_history(word)
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0].score, 1)
+    
+    def test_history_next_to_deck(self):
+        """测试历史保存在词库旁，旧版本共用的历史被接管，只读打开读到同一份"""
+        with open('test_history.json', 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'timestamp': '2024-01-01 10:00:00', 'score': 1,
+                                'new_score': 1, 'word': 'test1'}) + '\n')
+        readonly = DataLoader(self.test_file, storage=create_storage(self.test_file, read_only=True))
+        readonly.load_data()
+        self.assertEqual(len(readonly.test_history), 1)
+        self.assertTrue(os.path.exists('test_history.json'))
+
+        self.loader.load_data()
+        self.assertEqual(self.loader.storage.history_file, history_path(self.test_file))
+        self.assertFalse(os.path.exists('test_history.json'))
+        self.loader.record_test_history(1, 2)
+        self.assertTrue(self.loader.save_data())
+        self.loader.storage.close()
+
+        readonly = DataLoader(self.test_file, storage=create_storage(self.test_file, read_only=True))
+        readonly.load_data()
+        self.assertEqual(len(readonly.test_history), 2)
+        self.assertEqual(readonly.rollup_path, self.loader.rollup_path)
+        self.assertEqual(readonly.progress.count, 2)
+
+    def test_journal_replay(self):
+        """测试未压缩的作答在重新加载时从事件日志恢复"""
+        self.loader.load_data()
+        
+        self.loader.update_word_data(1, 2)
+        self.loader.record_test_history(1, 2)
+        self.loader.skip_word(2)
+        self.loader.record_test_history(2, 'skip')
+        
+        # 不调用save_data，直接重新加载
+        new_loader = DataLoader(self.test_file)
+        new_loader.load_data()
+        self.assertEqual(new_loader.df.at[1, 'Times'], 1)
+        self.assertEqual(new_loader.df.at[1, 'Score'], 2)
+        self.assertEqual(new_loader.df.at[2, 'SkipCount'], 1)
+        self.assertEqual(len(new_loader.test_history.get_word_history('test2')), 1)
+        
+        # 压缩后日志被清空，数据写入快照
+        self.assertTrue(new_loader.save_data())
+        self.assertFalse(os.path.exists('test_words.journal'))
+        final_loader = DataLoader(self.test_file)
+        final_loader.load_data()
+        self.assertEqual(final_loader.df.at[1, 'Score'], 2)
+        self.assertEqual(final_loader.test_history.get_word_history('test3')[0].score, 'skip')
+
+    def test_journal_replay_after_failed_save(self):
+        """测试快照写出后保存失败，旧日志不会被重复重放，历史和进度也不丢失"""
+        self.loader.load_data()
+        self.loader.update_word_data(1, 2)
+        self.loader.record_test_history(1, 2)
+
+        def fail(*args, **kwargs):
+            raise OSError('磁盘已满')
+        storage = self.loader.storage
+        storage.backup = type('FailingBackup', (), {'create_backup': fail})()
+        self.assertFalse(self.loader.save_data())
+        self.assertTrue(os.path.exists('test_words.journal.1'))
+
+        new_loader = DataLoader(self.test_file)
+        new_loader.load_data()
+        self.assertEqual(new_loader.df.at[1, 'Score'], 2)
+        self.assertEqual(new_loader.df.at[1, 'Times'], 1)
+        self.assertEqual(len(new_loader.test_history), 1)
+        self.assertEqual(len(new_loader.test_history.get_word_history('test2')), 1)
+        self.assertEqual(new_loader.progress.count, 1)
+
+        # 之后的作答接着编号，仍会被重放
+        new_loader.update_word_data(1, 1)
+        new_loader.record_test_history(1, 1)
+        new_loader.storage.close()
+        final_loader = DataLoader(self.test_file)
+        final_loader.load_data()
+        self.assertEqual(final_loader.df.at[1, 'Score'], 3)
+        self.assertEqual(len(final_loader.test_history), 2)
+        self.assertEqual(final_loader.progress.count, 2)
+
+        # 保存成功后再加载，历史和进度与作答一致
+        self.assertTrue(final_loader.save_data())
+        final_loader.storage.close()
+        saved_loader = DataLoader(self.test_file)
+        saved_loader.load_data()
+        self.assertEqual(saved_loader.df.at[1, 'Times'], 2)
+        self.assertEqual(
+            [record.score for record in saved_loader.test_history.get_word_history('test2')], [2, 1]
+        )
+        self.assertEqual(saved_loader.progress.count, 2)
+        saved_loader.storage.close()
+
+    def test_partial_history_save(self):
+        """测试历史写出后其余步骤失败，或追加后未更新标记时，重新加载不重复也不丢失"""
+        self.loader.load_data()
+        self.loader.update_word_data(0, 2)
+        self.loader.record_test_history(0, 2)
+        self.assertTrue(self.loader.save_data())
+        self.loader.update_word_data(0, 1)
+        self.loader.record_test_history(0, 1)
+
+        def fail(*args, **kwargs):
+            raise OSError('磁盘已满')
+        self.loader.storage.snapshot.save = fail
+        self.assertFalse(self.loader.save_data())
+        # 模拟追加历史后、更新标记前中断
+        with open('test_words.history.mark.json', 'w', encoding='utf-8') as f:
+            json.dump({'journal_seq': 1, 'records': 1}, f)
+        self.loader.storage.close()
+
+        new_loader = DataLoader(self.test_file)
+        new_loader.load_data()
+        self.assertEqual(new_loader.df.at[0, 'Score'], 3)
+        self.assertEqual(
+            [record.score for record in new_loader.test_history.get_word_history('test1')], [2, 1]
+        )
+        self.assertEqual(
+            [record.new_score for record in new_loader.test_history.get_word_history('test1')], [2, 3]
+        )
+        self.assertEqual(new_loader.progress.count, 2)
+        self.assertTrue(new_loader.save_data())
+        new_loader.storage.close()
+        with open(self.test_history_file, 'r', encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 2)
     
     def test_get_word_info(self):
         """测试获取单词信息"""
@@ -0,0 +1,123 @@
+import unittest
+import json
+import os
+import tempfile
+import pandas as pd
+from datetime import datetime, timedelta
+from core.history_file import append_ndjson, query_history, read_ndjson, write_ndjson
+from core.storage import ExcelStorage
+from models.test_history import TestHistory, TestRecord
+
+class TestTestHistory(unittest.TestCase):
+    def setUp(self):
+        """测试前准备"""
+        self.now = datetime.now().replace(microsecond=0)
+        self.history = TestHistory()
+        self.history.add_record('apple', 1, 1, self.now - timedelta(days=40))
+        self.history.add_record('banana', -1, -1, self.now - timedelta(days=10))
+        self.history.add_record('apple', 2, 3, self.now - timedelta(days=5))
+        self.history.add_record('apple', 'skip', 3, self.now - timedelta(days=1))
+
+    def test_get_word_history(self):
+        """测试按单词查询最近记录"""
+        records = self.history.get_word_history('apple', 2)
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0].score, 2)
+        self.assertEqual(records[1].score, 'skip')
+        self.assertEqual(records[1].timestamp, self.now - timedelta(days=1))
+        self.assertEqual(self.history.get_word_history('cherry'), [])
+
+    def test_get_recent_records(self):
+        """测试按时间范围查询"""
+        recent = self.history.get_recent_records(30)
+        self.assertEqual(sorted(recent), ['apple', 'banana'])
+        self.assertEqual(len(recent['apple']), 2)
+
+        # 乱序写入的记录同样能被时间索引找到
+        self.history.add_record('cherry', 0, 0, self.now - timedelta(days=3))
+        recent = self.history.get_recent_records(4)
+        self.assertEqual(sorted(recent), ['apple', 'cherry'])
+
+    def test_dict_round_trip(self):
+        """测试与原字典格式互相转换"""
+        data = self.history.to_dict()
+        self.assertEqual(data['apple'][2]['score'], 'skip')
+
+        restored = TestHistory.from_dict(data)
+        self.assertEqual(restored.to_dict(), data)
+        self.assertEqual(
+            restored.get_word_history('banana')[0],
+            TestRecord(self.now - timedelta(days=10), -1, -1.0)
+        )
+
+    def test_get_statistics(self):
+        """测试统计信息"""
+        stats = self.history.get_statistics()
+        self.assertEqual(stats['total_tests'], 4)
+        self.assertEqual(stats['total_words'], 2)
+        self.assertEqual(stats['skip_count'], 1)
+        self.assertEqual(stats['score_distribution']['2'], 1)
+
+    def test_records_round_trip(self):
+        """测试扁平记录流与原字典格式一致"""
+        records = list(self.history.iter_records())
+        self.assertEqual(records[0]['word'], 'apple')
+        self.assertEqual(len(list(self.history.iter_records(3))), 1)
+        restored = TestHistory.from_records(iter(records))
+        self.assertEqual(restored.to_dict(), self.history.to_dict())
+
+class TestHistoryFile(unittest.TestCase):
+    def setUp(self):
+        """测试前准备"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'history.json')
+        self.now = datetime.now().replace(microsecond=0)
+        self.history = TestHistory()
+        for i in range(5):
+            self.history.add_record(f'word{i % 2}', i - 2, i, self.now - timedelta(days=5 - i))
+
+    def tearDown(self):
+        """测试后清理"""
+        self.tmp.cleanup()
+
+    def test_write_append_and_partial_line(self):
+        """测试分块写出、追加和崩溃留下的不完整末行"""
+        self.assertEqual(write_ndjson(self.path, self.history.iter_records(), chunk_size=2), 5)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('{"word": "half')
+        self.assertEqual(len(list(read_ndjson(self.path))), 5)
+
+        self.history.add_record('word9', 1, 1, self.now)
+        append_ndjson(self.path, self.history.iter_records(5))
+        records = list(read_ndjson(self.path))
+        self.assertEqual(len(records), 6)
+        self.assertEqual(records[-1]['word'], 'word9')
+
+        self.assertEqual([r['score'] for r in query_history(self.path, word='word0')], [-2, 0, 2])
+        since = list(query_history(self.path, since=self.now - timedelta(days=2)))
+        self.assertEqual([r['score'] for r in since], [1, 2, 1])
+
+    def test_storage_converts_legacy_and_appends(self):
+        """测试Excel存储转换旧格式历史，之后只追加新记录"""
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.history.to_dict(), f, ensure_ascii=False, indent=4)
+        words_path = os.path.join(self.tmp.name, 'words.xlsx')
+        pd.DataFrame({'Words': ['word0', 'word1'], 'Page': [1, 2]}).to_excel(words_path, index=False)
+        storage = ExcelStorage(words_path, self.path, os.path.join(self.tmp.name, 'backups'))
+
+        df, history = storage.load()
+        self.assertEqual(history.to_dict(), self.history.to_dict())
+        with open(self.path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])['score'], -2)
+
+        history.add_record('word1', 2, 4, self.now)
+        storage.save(df, history)
+        storage.close()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.assertEqual(f.readlines()[:5], lines)
+        self.assertEqual(len(ExcelStorage(words_path, self.path).load()[1]), 6)
+
+if __name__ == '__main__':
+    unittest.main()
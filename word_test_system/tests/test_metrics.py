@@ -0,0 +1,71 @@
+import unittest
+import json
+import os
+import shutil
+from utils.logger import Metrics
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        """测试前准备"""
+        self.metrics = Metrics()
+        self.log_dir = 'test_metrics_logs'
+        os.makedirs(self.log_dir, exist_ok=True)
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.log_dir)
+
+    def test_disabled(self):
+        """测试未启用时不记录"""
+        @self.metrics.timed('work')
+        def work():
+            return 42
+
+        with self.metrics.span('select_word', mode='random'):
+            pass
+        self.metrics.count('answers')
+        self.assertEqual(work(), 42)
+        summary = self.metrics.summary()
+        self.assertEqual(summary['spans'], {})
+        self.assertEqual(summary['counters'], {})
+
+    def test_spans_and_counters(self):
+        """测试计时区间、装饰器和计数器"""
+        self.metrics.enabled = True
+
+        @self.metrics.timed('work')
+        def work():
+            return 42
+
+        for _ in range(3):
+            with self.metrics.span('select_word', mode='random'):
+                pass
+        self.assertEqual(work(), 42)
+        self.metrics.count('answers', result='skip')
+        self.metrics.count('answers', result='skip')
+
+        summary = self.metrics.summary()
+        self.assertEqual(summary['spans']['select_word{mode=random}']['count'], 3)
+        self.assertEqual(summary['spans']['work']['count'], 1)
+        self.assertEqual(summary['counters']['answers{result=skip}'], 2)
+
+        text = self.metrics.prometheus_text()
+        self.assertIn('word_test_select_word_seconds_bucket{mode="random",le="+Inf"} 3', text)
+        self.assertIn('word_test_answers_total{result="skip"} 2', text)
+
+    def test_reporter(self):
+        """测试停止时写出JSON行汇总和Prometheus文件"""
+        self.metrics.enabled = True
+        summary_path = os.path.join(self.log_dir, 'metrics.jsonl')
+        prometheus_path = os.path.join(self.log_dir, 'metrics.prom')
+        self.metrics.start_reporter(summary_path, 60, prometheus_path)
+        self.metrics.observe('save_data', 0.02)
+        self.metrics.stop_reporter()
+
+        with open(summary_path, 'r', encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(lines[-1]['spans']['save_data']['count'], 1)
+        self.assertTrue(os.path.exists(prometheus_path))
+
+if __name__ == '__main__':
+    unittest.main()
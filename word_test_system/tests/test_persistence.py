@@ -0,0 +1,133 @@
+import unittest
+import os
+import shutil
+import threading
+import time
+import pandas as pd
+from core.data_loader import DataLoader
+from core.persistence import PersistenceWorker
+
+class TestPersistenceWorker(unittest.TestCase):
+    def setUp(self):
+        """测试前准备"""
+        self.test_file = 'test_words.xlsx'
+        pd.DataFrame({
+            'Words': ['test1', 'test2', 'test3'],
+            'Page': [1, 2, 3]
+        }).to_excel(self.test_file, index=False)
+        
+        self.loader = DataLoader(self.test_file)
+        self.loader.load_data()
+        self.saved = 0
+        original_save = self.loader.save_data
+        
+        def counting_save():
+            self.saved += 1
+            return original_save()
+        self.loader.save_data = counting_save
+    
+    def tearDown(self):
+        """测试后清理"""
+        for path in [self.test_file, 'test_words.history.json', 'test_words.history.mark.json', 'test_words.journal',
+                     'test_words.journal.1', 'test_words.rollup.json']:
+            if os.path.exists(path):
+                os.remove(path)
+        for path in ['test_words.deck', 'backups']:
+            if os.path.exists(path):
+                shutil.rmtree(path)
+    
+    def test_coalesce_and_flush(self):
+        """测试多次变化合并为一次保存"""
+        worker = PersistenceWorker(self.loader, interval=60)
+        worker.start()
+        for word_idx in [0, 1, 0, 2]:
+            self.loader.update_word_data(word_idx, 1)
+            self.loader.record_test_history(word_idx, 1)
+            worker.notify(word_idx)
+        
+        # 间隔未到时不保存，显式flush后只保存一次
+        self.assertEqual(self.saved, 0)
+        self.assertTrue(worker.flush(timeout=10))
+        self.assertEqual(self.saved, 1)
+        
+        # 没有新变化时停止不再重复保存
+        worker.stop(timeout=10)
+        self.assertEqual(self.saved, 1)
+        
+        new_loader = DataLoader(self.test_file)
+        new_loader.load_data()
+        self.assertEqual(new_loader.df.at[0, 'Times'], 2)
+        self.assertFalse(os.path.exists('test_words.journal'))
+    
+    def test_flush_during_background_save(self):
+        """测试作答后落盘与后台保存(切出日志)同时进行不会出错"""
+        errors = []
+        done = threading.Event()
+
+        def save_loop():
+            while not done.is_set():
+                self.loader.save_data()
+        saver = threading.Thread(target=save_loop)
+        saver.start()
+        try:
+            for i in range(200):
+                score = 1 if i % 2 else -1
+                self.loader.update_word_data(i % 3, score)
+                self.loader.record_test_history(i % 3, score)
+                try:
+                    self.loader.flush()
+                except (ValueError, OSError) as e:
+                    errors.append(e)
+        finally:
+            done.set()
+            saver.join()
+        self.assertEqual(errors, [])
+
+    def test_stop_flushes_pending(self):
+        """测试停止时写出未保存的变化"""
+        worker = PersistenceWorker(self.loader, interval=60)
+        worker.start()
+        self.loader.update_word_data(1, -2)
+        self.loader.record_test_history(1, -2)
+        worker.notify(1)
+        worker.stop(timeout=10)
+        self.assertEqual(self.saved, 1)
+        self.assertFalse(worker.thread.is_alive())
+    
+    def test_stop_while_holding_lock(self):
+        """测试调用方持有数据锁时停止不会一直等待，作答已写入事件日志"""
+        worker = PersistenceWorker(self.loader, interval=60)
+        worker.start()
+        with self.loader.lock:
+            self.loader.update_word_data(1, -2)
+            self.loader.record_test_history(1, -2)
+            worker.notify(1)
+            started = time.monotonic()
+            self.assertFalse(worker.stop(timeout=0.2))
+            self.assertLess(time.monotonic() - started, 5)
+        # 释放锁后后台线程完成最后一次保存
+        worker.thread.join(10)
+        self.assertFalse(worker.thread.is_alive())
+        self.assertEqual(self.saved, 1)
+        self.loader.storage.close()
+
+        reloaded = DataLoader(self.test_file)
+        reloaded.load_data()
+        self.assertEqual(reloaded.df.at[1, 'Score'], -2)
+        reloaded.storage.close()
+    
+    def test_interval_save(self):
+        """测试到达间隔后自动保存"""
+        worker = PersistenceWorker(self.loader, interval=0.05)
+        worker.start()
+        self.loader.update_word_data(2, 1)
+        self.loader.record_test_history(2, 1)
+        worker.notify(2)
+        deadline = time.monotonic() + 10
+        while self.saved == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.saved, 1)
+        worker.stop(timeout=10)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import unittest
+import asyncio
+import json
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from core.server import (
+    SessionClient, SessionServer, UserProgress, WordCatalog, _Session, simulate
+)
+from core.storage import history_path
+
+class TestSessionServer(unittest.TestCase):
+    def setUp(self):
+        """测试前准备"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.catalog = WordCatalog([f'word{i}' for i in range(200)], list(range(200)))
+        self.server = SessionServer(self.catalog, self.tmp.name)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.tmp.cleanup()
+
+    def test_catalog_is_shared_and_read_only(self):
+        """测试单词目录只读，用户只持有进度数组"""
+        with self.assertRaises(ValueError):
+            self.catalog.pages[0] = 1
+        session = _Session()
+        self.server.handle(session, {'op': 'login', 'user': 'alice'})
+        progress = self.server.users['alice']
+        self.assertEqual(progress.nbytes, 200 * (4 + 4 + 4 + 8))
+
+    def test_catalog_from_file_read_only(self):
+        """测试从单词文件加载目录不写任何文件"""
+        path = os.path.join(self.tmp.name, 'words.xlsx')
+        pd.DataFrame({'Words': ['a', 'b'], 'Page': [1, 2]}).to_excel(path, index=False)
+        # 旧格式的历史只读取，不转换
+        legacy = json.dumps({'a': [{'timestamp': '2024-01-01 10:00:00', 'score': 1, 'new_score': 1}]},
+                            indent=4)
+        with open(history_path(path), 'w', encoding='utf-8') as f:
+            f.write(legacy)
+        before = sorted(os.listdir(self.tmp.name))
+        mtime = os.path.getmtime(path)
+        catalog = WordCatalog.from_file(path)
+        self.assertEqual(catalog.words.tolist(), ['a', 'b'])
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), before)
+        self.assertEqual(os.path.getmtime(path), mtime)
+        with open(history_path(path), 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), legacy)
+
+    def test_answer_and_persist(self):
+        """测试作答更新进度，最后一个连接退出时写回并可重新加载"""
+        session = _Session()
+        self.assertFalse(self.server.handle(session, {'op': 'next'})['ok'])
+        self.assertFalse(self.server.handle(session, {'op': 'login', 'user': '../x'})['ok'])
+        self.server.handle(session, {'op': 'login', 'user': 'alice'})
+
+        word = self.server.handle(session, {'op': 'next', 'mode': 'random'})
+        self.assertEqual(word['word'], f"word{word['index']}")
+        reply = self.server.handle(session, {'op': 'answer', 'index': word['index'], 'choice': '-2'})
+        self.assertEqual(reply['result'], 'continue')
+        self.server.handle(session, {'op': 'answer', 'index': 3, 'choice': 's'})
+        self.assertFalse(self.server.handle(session, {'op': 'answer', 'index': 3, 'choice': '9'})['ok'])
+
+        # 其余单词都已掌握时，重点突破模式只会选到刚答错的单词
+        progress = self.server.users['alice']
+        progress.score[progress.score == 0] = 1
+        focus = self.server.handle(session, {'op': 'next', 'mode': 'focus'})
+        self.assertEqual(focus['index'], word['index'])
+        self.assertEqual(focus['score'], -2)
+        progress.score[progress.score == 1] = 0
+
+        self.server.handle(session, {'op': 'logout'})
+        self.assertNotIn('alice', self.server.users)
+        progress = UserProgress.load('alice', os.path.join(self.tmp.name, 'alice.npz'), self.catalog)
+        self.assertEqual(progress.score[word['index']], -2)
+        self.assertEqual(progress.skip_count[3], 1)
+
+        # 目录变化后按单词对齐
+        catalog = WordCatalog(['new'] + [f'word{i}' for i in range(200)], [0] * 201)
+        self.assertNotEqual(catalog.fingerprint, self.catalog.fingerprint)
+        progress = UserProgress.load('alice', os.path.join(self.tmp.name, 'alice.npz'), catalog)
+        self.assertEqual(progress.score[word['index'] + 1], -2)
+        self.assertEqual(progress.times[0], 0)
+
+    def test_invalid_requests(self):
+        """测试布尔值索引被拒绝，处理出错时返回错误响应"""
+        session = _Session()
+        self.server.handle(session, {'op': 'login', 'user': 'alice'})
+        reply = self.server.handle(session, {'op': 'answer', 'index': True, 'choice': '2'})
+        self.assertFalse(reply['ok'])
+        progress = self.server.users['alice']
+        self.assertEqual(int(progress.times.sum()), 0)
+
+        # 进度文件引用的目录单词表缺失
+        other = WordCatalog(['x', 'y'], [1, 2])
+        other_progress = UserProgress('carol', 2)
+        other_progress.times[0] = 1
+        other_progress.dirty = True
+        other_progress.save(os.path.join(self.tmp.name, 'carol.npz'), other)
+        reply = self.server._respond(_Session(), b'{"op": "login", "user": "carol"}')
+        self.assertFalse(reply['ok'])
+        self.assertNotIn('carol', self.server.users)
+
+    def test_index_updates_and_autosave(self):
+        """测试作答只更新索引中的一个单词，并定期写回进度"""
+        session = _Session()
+        self.server.handle(session, {'op': 'login', 'user': 'alice'})
+        self.server.handle(session, {'op': 'next', 'mode': 'focus'})
+        index = self.server.users['alice'].indexes['focus']
+        self.server.handle(session, {'op': 'answer', 'index': 7, 'choice': '-2'})
+        self.assertIs(self.server.users['alice'].indexes['focus'], index)
+        self.server.handle(session, {'op': 'answer', 'index': 150, 'choice': '-1'})
+        progress = self.server.users['alice']
+        expected = self.server.selector.weights_from_arrays(
+            progress.score, progress.times, progress.days_since_tested(time.time_ns()), 'focus'
+        )
+        np.testing.assert_array_equal(index.tree.values, expected)
+        self.assertIn(150, index.topk.smallest())
+
+        async def scenario():
+            self.server.save_interval = 0.05
+            await self.server.start()
+            try:
+                await asyncio.sleep(0.2)
+                return os.path.exists(os.path.join(self.tmp.name, 'alice.npz'))
+            finally:
+                await self.server.close()
+        self.assertTrue(asyncio.run(scenario()))
+
+    def test_concurrent_clients(self):
+        """测试本机上大量模拟客户端并发作答"""
+        async def scenario():
+            host, port = await self.server.start()
+            try:
+                # 同一用户的两个连接共享进度
+                first = await SessionClient.connect(host, port)
+                second = await SessionClient.connect(host, port)
+                await first.request('login', user='bob')
+                await second.request('login', user='bob')
+                await first.request('answer', index=0, choice='2')
+                stats = await second.request('stats')
+                # 超长的请求行返回错误，连接仍可继续使用
+                first.writer.write(b'{"op": "' + b'x' * (1 << 17) + b'"}\n')
+                too_long = json.loads(await first.reader.readline())
+                self.assertFalse(too_long['ok'])
+                self.assertTrue((await first.request('stats'))['ok'])
+                await first.request('logout')
+                await second.request('logout')
+                await first.close()
+                await second.close()
+
+                result = await simulate(host, port, users=300, answers=5)
+                return stats, result
+            finally:
+                await self.server.close()
+
+        stats, result = asyncio.run(scenario())
+        self.assertEqual(stats['answers'], 1)
+        self.assertEqual(result['answers'], 300 * 5)
+        self.assertEqual(self.server.users, {})
+        saved = [name for name in os.listdir(self.tmp.name) if name.endswith('.npz')]
+        self.assertEqual(len(saved), 301)
+        with np.load(os.path.join(self.tmp.name, 'user00000.npz')) as data:
+            self.assertEqual(int(data['times'].sum() + data['skip_count'].sum()), 5)
+
+if __name__ == '__main__':
+    unittest.main()
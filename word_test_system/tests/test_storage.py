@@ -0,0 +1,86 @@
+import unittest
+import os
+import pandas as pd
+from core.data_loader import DataLoader
+from core.storage import SQLiteStorage
+
+class TestSQLiteStorage(unittest.TestCase):
+    def setUp(self):
+        """测试前准备"""
+        self.test_file = 'test_words.xlsx'
+        self.db_file = 'test_words.db'
+        self.history_file = 'test_history.json'
+        
+        df = pd.DataFrame({
+            'Words': ['test1', 'test2', 'test3'],
+            'Page': [1, 2, 3],
+            'Times': [0, 0, 0],
+            'Score': [0, 0, 0],
+            'LastTested': ['', '', ''],
+            'SkipCount': [0, 0, 0]
+        })
+        df.to_excel(self.test_file, index=False)
+        
+        storage = SQLiteStorage(self.db_file)
+        storage.import_excel(self.test_file, self.history_file)
+        storage.close()
+    
+    def tearDown(self):
+        """测试后清理"""
+        for path in [self.test_file, self.db_file, self.history_file,
+                     self.db_file + '-wal', self.db_file + '-shm', 'test_words.rollup.json']:
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def test_import_and_load(self):
+        """测试从Excel导入后加载"""
+        loader = DataLoader(self.db_file)
+        self.assertIsInstance(loader.storage, SQLiteStorage)
+        self.assertTrue(loader.load_data())
+        self.assertEqual(loader.df['Words'].tolist(), ['test1', 'test2', 'test3'])
+        self.assertEqual(loader.df['Page'].tolist(), [1, 2, 3])
+        self.assertTrue(loader.df['LastTested'].isna().all())
+        loader.storage.close()
+    
+    def test_record_event(self):
+        """测试每次作答以单行更新持久化"""
+        loader = DataLoader(self.db_file)
+        loader.load_data()
+        loader.update_word_data(1, 2)
+        loader.record_test_history(1, 2)
+        loader.skip_word(2)
+        loader.record_test_history(2, 'skip')
+        loader.flush()
+        
+        new_loader = DataLoader(self.db_file)
+        new_loader.load_data()
+        self.assertEqual(new_loader.df.at[1, 'Times'], 1)
+        self.assertEqual(new_loader.df.at[1, 'Score'], 2)
+        self.assertEqual(new_loader.df.at[1, 'LastTested'], loader.df.at[1, 'LastTested'])
+        self.assertEqual(new_loader.df.at[2, 'SkipCount'], 1)
+        records = new_loader.test_history.get_word_history('test3')
+        self.assertEqual(records[0].score, 'skip')
+        
+        # 完整保存不会重复写入已持久化的历史
+        new_loader.save_data()
+        final_loader = DataLoader(self.db_file)
+        final_loader.load_data()
+        self.assertEqual(len(final_loader.test_history), 2)
+        for item in (loader, new_loader, final_loader):
+            item.storage.close()
+    
+    def test_export_excel(self):
+        """测试导出为Excel"""
+        loader = DataLoader(self.db_file)
+        loader.load_data()
+        loader.update_word_data(0, -1)
+        loader.record_test_history(0, -1)
+        loader.export_excel(self.test_file)
+        loader.storage.close()
+        
+        exported = pd.read_excel(self.test_file)
+        self.assertEqual(exported.at[0, 'Score'], -1)
+        self.assertIsInstance(exported.at[0, 'LastTested'], str)
+
+if __name__ == '__main__':
+    unittest.main()
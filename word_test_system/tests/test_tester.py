@@ -0,0 +1,82 @@
+import unittest
+import os
+import tempfile
+import pandas as pd
+from core.answer_sources import CallbackAnswerSource, ScriptedAnswerSource, SimulatedLearner
+from core.data_loader import DataLoader
+from core.storage import ExcelStorage
+from core.tester import Tester
+from core.word_selector import WordSelector
+
+class TestTester(unittest.TestCase):
+    def setUp(self):
+        """测试前准备"""
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, 'words.xlsx')
+        pd.DataFrame({
+            'Words': [f'test{i}' for i in range(10)],
+            'Page': list(range(10))
+        }).to_excel(path, index=False)
+        storage = ExcelStorage(
+            path,
+            history_file=os.path.join(self.tmp.name, 'history.json'),
+            backup_dir=os.path.join(self.tmp.name, 'backups'),
+            sync=False
+        )
+        self.loader = DataLoader(path, storage=storage)
+        self.loader.load_data()
+        self.selector = WordSelector()
+        self.selector.bind(self.loader)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.loader.storage.close()
+        self.tmp.cleanup()
+
+    def test_scripted_batch(self):
+        """测试脚本作答的批量测试返回结构化结果"""
+        tester = Tester(self.loader, self.selector, ScriptedAnswerSource(['2', 's', '-1', 'q']))
+        stats = tester.batch_test(5, 'random')
+
+        self.assertEqual(stats['total'], 3)
+        self.assertEqual(stats['completed'], 2)
+        self.assertEqual(stats['skipped'], 1)
+        self.assertEqual([result for _, result, _ in stats['results']], ['continue', 'skip', 'continue'])
+        word_idx, _, score = stats['results'][0]
+        self.assertEqual(score, 2)
+        self.assertEqual(self.loader.df.at[word_idx, 'Score'], 2)
+        self.assertEqual(len(self.loader.test_history), 3)
+
+    def test_script_file(self):
+        """测试从文件读取脚本，脚本用完后退出"""
+        script = os.path.join(self.tmp.name, 'answers.txt')
+        with open(script, 'w', encoding='utf-8') as f:
+            f.write('# 注释\n1\n\n0\n')
+        tester = Tester(self.loader, self.selector, ScriptedAnswerSource.from_file(script))
+        stats = tester.batch_test(5, 'random')
+        self.assertEqual(stats['scores'], [1, 0])
+
+    def test_callback_and_submit(self):
+        """测试回调作答和无效选项"""
+        seen = []
+        def answer(word):
+            seen.append(word['word'])
+            return '1'
+        tester = Tester(self.loader, self.selector, CallbackAnswerSource(answer))
+        self.assertEqual(tester.test_word(3), ('continue', 1))
+        self.assertEqual(seen, ['test3'])
+        with self.assertRaises(ValueError):
+            tester.submit(3, 'x')
+
+    def test_simulated_learner(self):
+        """测试模拟学习者可重复且按上限退出"""
+        runs = []
+        for _ in range(2):
+            learner = SimulatedLearner(seed=1, max_answers=4)
+            words = [{'score': 0, 'times': 0}] * 6
+            runs.append([learner.ask(word) for word in words])
+        self.assertEqual(runs[0], runs[1])
+        self.assertEqual(runs[0][4:], ['q', 'q'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from models.word import NOT_TESTED, Word, WordDeck
+
+class TestWordDeck(unittest.TestCase):
+    def setUp(self):
+        """测试前准备"""
+        self.now = datetime(2024, 5, 1, 12, 0, 0)
+        self.deck = WordDeck(
+            ['apple', 'banana', 'apple', '单词'],
+            page=[1, 2, 3, 4],
+            times=[1, 0, 2, 0],
+            score=[-1, 0, 2, 0],
+            last_tested=[self.now - timedelta(days=3), None, self.now, None]
+        )
+
+    def test_columns_and_string_table(self):
+        """测试各列为紧凑类型，重复的单词在字符串表中只存一次"""
+        self.assertEqual(self.deck.page.dtype, np.int32)
+        self.assertEqual(self.deck.score.dtype, np.float64)
+        self.assertEqual(self.deck.last_tested.dtype, np.int64)
+        self.assertEqual(len(self.deck.strings), 3)
+        self.assertEqual(self.deck.words(), ['apple', 'banana', 'apple', '单词'])
+        self.assertEqual(self.deck.position('apple'), 0)
+        self.assertEqual(self.deck.position('单词'), 3)
+        self.assertIsNone(self.deck.position('cherry'))
+        self.assertEqual(self.deck.last_tested[1], NOT_TESTED)
+
+    def test_word_view(self):
+        """测试 Word 是对行的视图，修改直接写入词库"""
+        word = self.deck[1]
+        self.assertFalse(hasattr(word, '__dict__'))
+        word.update_score(-2)
+        self.assertEqual((self.deck.times[1], self.deck.score[1]), (1, -2))
+        self.assertEqual(word.days_since_last_test(), 0)
+        word.word = 'cherry'
+        self.assertEqual(self.deck.position('cherry'), 1)
+        self.assertEqual(self.deck[-1].word, '单词')
+
+        # 单独创建的单词与原来的字典格式兼容
+        data = self.deck[0].to_dict()
+        self.assertEqual(data['last_tested'], '2024-04-28 12:00:00')
+        self.assertEqual(Word.from_dict(data), self.deck[0])
+        self.assertIsNone(Word('pear', 5).last_tested)
+
+    def test_standalone_word(self):
+        """测试单独创建的单词不分配词库数组，分数保持原值"""
+        word = Word('pear', 5, score=0.1)
+        self.assertIsNone(word.deck)
+        self.assertEqual(word.score, 0.1)
+        self.assertEqual(word.to_dict()['score'], 0.1)
+        word.update_score(2)
+        word.skip()
+        self.assertEqual((word.times, word.skip_count, word.score), (1, 1, 2.1))
+        self.assertEqual(word.days_since_last_test(), 0)
+        self.assertEqual(WordDeck(['pear'], score=[0.1])[0].score, 0.1)
+
+    def test_answer_and_days(self):
+        """测试按行作答/跳过与距上次测试天数"""
+        self.deck.answer(1, 2, self.now)
+        self.deck.skip(3, self.now - timedelta(days=1))
+        days = self.deck.days_since_tested(self.now + timedelta(hours=1), fill=100)
+        self.assertEqual(days.tolist(), [3, 0, 0, 1])
+        self.assertEqual(self.deck[3].skip_count, 1)
+
+    def test_frame_round_trip(self):
+        """测试与DataLoader格式的DataFrame互相转换"""
+        df = self.deck.to_frame()
+        self.assertTrue(pd.isna(df.at[1, 'LastTested']))
+        self.assertEqual(df.at[0, 'LastTested'], pd.Timestamp(self.now - timedelta(days=3)))
+        deck = WordDeck.from_frame(df)
+        for column in ('page', 'times', 'score', 'skip_count', 'last_tested'):
+            np.testing.assert_array_equal(getattr(deck, column), getattr(self.deck, column))
+        self.assertEqual(deck.words(), self.deck.words())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+import pandas as pd
+from core.word_index import WordIndex
+
+class TestWordIndex(unittest.TestCase):
+    def setUp(self):
+        """测试前准备"""
+        self.words = ['Apple', 'application', 'banana', 'pineapple', 'apply', 'a.b', 'Apple']
+        self.index = WordIndex(self.words)
+
+    def test_exact_and_prefix(self):
+        """测试精确匹配和前缀匹配"""
+        self.assertEqual(self.index.exact('apple'), [0, 6])
+        self.assertEqual(self.index.exact('app'), [])
+        self.assertEqual(self.index.prefix('APP'), [0, 1, 4, 6])
+        self.assertEqual(self.index.prefix('z'), [])
+
+    def test_contains(self):
+        """测试子串匹配与 str.contains 一致，且不按正则处理"""
+        series = pd.Series(self.words)
+        for query in ['apple', 'PL', 'ana', 'a.b', '.', 'xyz', 'ppl', '']:
+            expected = series.index[series.str.contains(query, case=False, regex=False)].tolist()
+            self.assertEqual(self.index.contains(query), expected, query)
+
+    def test_fuzzy(self):
+        """测试模糊匹配"""
+        self.assertEqual(self.index.fuzzy('aplle')[:1], [])
+        self.assertEqual(self.index.fuzzy('bananna')[0], 2)
+        self.assertEqual(self.index.search('applx'), [0, 4, 6])
+
+if __name__ == '__main__':
+    unittest.main()
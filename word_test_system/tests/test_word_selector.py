@@ -2,7 +2,11 @@ import unittest
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from core.data_loader import DataLoader
 from core.word_selector import WordSelector
+from core.weight_index import AliasSampler, FenwickTree
+from core.schema import COLUMN_DEFAULTS
+from core.srs import review, RELEARN_DELAY
 
 class TestWordSelector(unittest.TestCase):
     def setUp(self):
@@ -83,6 +87,28 @@ class TestWordSelector(unittest.TestCase):
         self.assertIsNotNone(word_idx)
         self.assertTrue(0 <= word_idx < len(self.df))
     
+    def test_select_words(self):
+        """测试批量不放回抽样"""
+        words = self.selector.select_words(self.df, 4, 'random')
+        self.assertEqual(len(words), 4)
+        self.assertEqual(len(set(words)), 4)
+        
+        # 可抽单词不足时只返回有权重的单词
+        words = self.selector.select_words(self.df, 10, 'focus')
+        self.assertEqual(sorted(words), [0, 1, 2])
+        
+        # 放回抽样允许重复
+        words = self.selector.select_words(self.df, 10, 'random', replace=True)
+        self.assertEqual(len(words), 10)
+        
+        # 第一个元素的分布应与单次抽样一致
+        np.random.seed(0)
+        weights = self.selector.calculate_weights(self.df, 'random')
+        counts = np.zeros(len(self.df))
+        for _ in range(2000):
+            counts[self.selector.select_words(self.df, 2, 'random')[0]] += 1
+        np.testing.assert_allclose(counts / counts.sum(), weights, atol=0.04)
+    
     def test_get_focus_words(self):
         """测试获取重点关注单词"""
         focus_words = self.selector.get_focus_words(self.df, 2)
@@ -103,5 +129,185 @@ class TestWordSelector(unittest.TestCase):
             for idx in review_words
         ))
 
+    def test_fenwick_tree(self):
+        """测试树状数组的更新与定位"""
+        tree = FenwickTree([1.0, 0.0, 2.0, 3.0])
+        self.assertAlmostEqual(tree.total, 6.0)
+        self.assertAlmostEqual(tree.prefix_sum(2), 3.0)
+        self.assertEqual(tree.find(0.5), 0)
+        self.assertEqual(tree.find(1.5), 2)
+        self.assertEqual(tree.find(5.9), 3)
+        
+        tree.update(1, 4.0)
+        self.assertAlmostEqual(tree.total, 10.0)
+        self.assertEqual(tree.find(1.5), 1)
+    
+    def test_alias_sampler(self):
+        """测试别名表在增量更新和重建前后的抽样分布"""
+        rng = np.random.RandomState(0)
+        weights = rng.random_sample(50)
+        weights[[3, 7]] = 0
+        sampler = AliasSampler(weights, max_updates=8, max_drift=0.5)
+        for pos, value in [(3, 5.0), (10, 0.0), (10, 2.0), (20, 0.1)]:
+            sampler.update(pos, value)
+            weights[pos] = value
+        self.assertEqual(sampler.rebuilds, 1)
+        self.assertAlmostEqual(sampler.total, weights.sum())
+
+        def frequencies():
+            counts = np.bincount([sampler.sample(rng) for _ in range(100000)], minlength=50)
+            return counts / counts.sum()
+
+        expected = weights / weights.sum()
+        np.testing.assert_allclose(frequencies(), expected, atol=0.005)
+        self.assertEqual(frequencies()[7], 0)
+
+        # 超过更新次数后重建，分布不变
+        for pos in range(11, 20):
+            sampler.update(pos, 1.0)
+            weights[pos] = 1.0
+        self.assertEqual(sampler.rebuilds, 2)
+        np.testing.assert_allclose(frequencies(), weights / weights.sum(), atol=0.005)
+
+    def test_random_mode_matches_calculate_weights(self):
+        """测试随机模式抽样与 calculate_weights 的分布一致"""
+        loader = DataLoader()
+        loader.df = self.df.assign(LastTested=pd.to_datetime(self.df['LastTested']))
+        self.selector.bind(loader)
+        self.selector.select_word(loader.df, 'random')
+        loader.update_word_data(1, 2)
+        loader.update_word_data(3, -2)
+
+        np.random.seed(0)
+        picks = [self.selector.select_word(loader.df, 'random') for _ in range(50000)]
+        counts = pd.Series(picks).value_counts(normalize=True).reindex(loader.df.index, fill_value=0)
+        expected = self.selector.calculate_weights(loader.df, 'random')
+        np.testing.assert_allclose(counts.to_numpy(), expected, atol=0.01)
+
+    def test_index_cache(self):
+        """测试索引缓存: 命中/只更新变化行/重建计数，以及LRU淘汰"""
+        loader = DataLoader()
+        loader.df = self.df.assign(LastTested=pd.to_datetime(self.df['LastTested']))
+        self.selector.bind(loader)
+        self.selector.INDEX_CACHE_SIZE = 2
+        self.selector.DIRTY_REBUILD_RATIO = 0.5
+
+        for _ in range(3):
+            self.selector.select_word(loader.df, 'focus')
+        self.assertEqual(self.selector.cache_info()['misses'], 1)
+        self.assertEqual(self.selector.cache_info()['hits'], 2)
+
+        # 变化的行在下次使用时才更新，结果与全量计算一致
+        loader.update_word_data(4, -5)
+        loader.skip_word(0)
+        index = self.selector._get_index(loader.df, 'focus')
+        self.assertEqual(self.selector.cache_info()['patched'], 1)
+        self.assertEqual(index.dirty, set())
+        np.testing.assert_allclose(
+            index.tree.values / index.tree.total,
+            self.selector.calculate_weights(loader.df, 'focus')
+        )
+
+        # 权重配置不同的随机模式分别缓存，超过上限时淘汰最久未用的
+        self.selector.select_word(loader.df, 'random')
+        self.selector.weights = dict(self.selector.weights, score_weight=0.5)
+        self.selector.select_word(loader.df, 'random')
+        info = self.selector.cache_info()
+        self.assertEqual((info['misses'], info['evictions'], info['size']), (3, 1, 2))
+        self.assertNotIn(('focus', None), self.selector._indexes)
+
+    def test_bound_index_matches_weights(self):
+        """测试绑定数据源后增量索引与全量权重一致"""
+        loader = DataLoader()
+        # 与load_data一致，LastTested在内存中为datetime类型
+        loader.df = self.df.assign(LastTested=pd.to_datetime(self.df['LastTested']))
+        self.selector.bind(loader)
+        
+        for mode in ['random', 'focus', 'review']:
+            self.selector.select_word(loader.df, mode)
+        
+        # 更新若干单词后，索引中的权重应与重新计算的结果一致
+        loader.update_word_data(0, 2)
+        loader.update_word_data(4, -2)
+        loader.skip_word(2)
+        for mode in ['random', 'focus', 'review']:
+            index = self.selector._get_index(loader.df, mode)
+            expected = self.selector.calculate_weights(loader.df, mode)
+            actual = index.tree.values / index.tree.total
+            np.testing.assert_allclose(actual, expected)
+            
+            word_idx = self.selector.select_word(loader.df, mode)
+            self.assertIn(word_idx, loader.df.index)
+
+    def test_top_words_maintained(self):
+        """测试绑定数据源后增量维护的重点/复习单词与全量排序一致"""
+        rng = np.random.default_rng(3)
+        now = datetime.now()
+        df = pd.DataFrame({
+            'Words': [f'w{i}' for i in range(100)],
+            'Page': 1,
+            'Times': 1,
+            'Score': rng.integers(-3, 4, 100),
+            'LastTested': [now - timedelta(days=int(d)) for d in rng.integers(1, 30, 100)],
+            'SkipCount': 0
+        })
+        df.loc[::7, 'LastTested'] = pd.NaT
+        loader = DataLoader()
+        loader.df = df
+        selector = WordSelector(top_k={'focus': 10, 'review': 10})
+        selector.bind(loader)
+        unbound = WordSelector()
+
+        for _ in range(200):
+            loader.update_word_data(int(rng.integers(0, 100)), int(rng.integers(-2, 3)))
+            expected = unbound.get_focus_words(loader.df.copy(), 10)
+            self.assertEqual(selector.get_focus_words(loader.df, 10), expected)
+            # 复习优先级在索引构建时计算，刚答过的单词间隔为0天
+            expected = unbound.get_review_words(loader.df.copy(), 5)
+            self.assertEqual(selector.get_review_words(loader.df, 5), expected)
+
+        # 超过维护数量时退回全量排序
+        self.assertEqual(selector.get_focus_words(loader.df, 30),
+                         loader.df.nsmallest(30, 'Score').index.tolist())
+
+    def test_srs_review(self):
+        """测试SM-2间隔计算"""
+        interval, ease, delay = review(0.0, 2.5, 2)
+        self.assertEqual((interval, delay), (1.0, timedelta(days=1)))
+        self.assertAlmostEqual(ease, 2.6)
+        interval, ease, _ = review(interval, ease, 1)
+        self.assertEqual(interval, 6.0)
+        interval, _, _ = review(interval, ease, 0)
+        self.assertGreater(interval, 6.0)
+        interval, ease, delay = review(interval, 1.3, -2)
+        self.assertEqual((interval, ease, delay), (0.0, 1.3, RELEARN_DELAY))
+
+    def test_srs_mode(self):
+        """测试间隔重复模式按到期顺序选词"""
+        loader = DataLoader()
+        df = self.df.assign(LastTested=pd.to_datetime(self.df['LastTested']))
+        for col, default in COLUMN_DEFAULTS.items():
+            if col not in df.columns:
+                df[col] = default
+        now = datetime.now()
+        df['Due'] = pd.to_datetime([now - timedelta(days=1), None, now + timedelta(days=3),
+                                    now - timedelta(days=2), None])
+        loader.df = df
+        self.selector.bind(loader)
+
+        # 已到期的按到期时间，其次新单词，最后是未到期的
+        self.assertEqual(self.selector.select_words(loader.df, 5, 'srs'), [3, 0, 1, 4, 2])
+        self.assertEqual(self.selector.select_word(loader.df, 'srs'), 3)
+
+        # 作答后重新排入队列
+        loader.update_word_data(3, 2)
+        self.assertGreater(loader.df.at[3, 'Due'], pd.Timestamp(now))
+        self.assertEqual(self.selector.select_words(loader.df, 3, 'srs'), [0, 1, 4])
+        loader.update_word_data(0, -2)
+        self.assertEqual(self.selector.select_words(loader.df, 5, 'srs'), [1, 4, 0, 3, 2])
+
+        # 未绑定的数据源得到相同顺序
+        self.assertEqual(WordSelector().select_words(loader.df.copy(), 5, 'srs'), [1, 4, 0, 3, 2])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,143 +1,374 @@
 import os
 import shutil
+import hashlib
+import threading
+import zlib
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 import json
 
+try:
+    import zstandard
+except ImportError:  # 可选依赖，未安装时使用zlib
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # Windows 上只在进程内加锁
+    fcntl = None
+
+# 每个备份目录一把进程内的锁(同一目录可能有多个 Backup 实例，如自动保存和菜单)
+_DIR_LOCKS: Dict[str, threading.RLock] = {}
+_DIR_LOCKS_GUARD = threading.Lock()
+
 class Backup:
-    def __init__(self, backup_dir: str = 'backups'):
+    """内容寻址的增量备份
+
+    文件按固定大小切块，以块内容的SHA-256为键压缩保存在 chunks/ 下，
+    每个备份只写一个记录块列表的小清单(manifests/)；未变化的块在各
+    备份间共享，列出/恢复/清理都只读取清单。
+    创建、恢复和清理持有备份目录的锁(进程内的锁加上 .lock 文件锁)，
+    清理时不会删除正在创建的备份已写出、但清单尚未写出的块。
+    旧版本直接复制到备份目录下的文件(如 words_auto_时间.xlsx)作为旧格式
+    备份继续列出、恢复和清理。
+    """
+    CHUNK_SIZE = 256 * 1024
+    CHUNK_DIR = 'chunks'
+    MANIFEST_DIR = 'manifests'
+    LOCK_FILE = '.lock'
+
+    def __init__(self, backup_dir: str = 'backups', compress: bool = True):
         self.backup_dir = backup_dir
+        self.chunk_dir = os.path.join(backup_dir, self.CHUNK_DIR)
+        self.manifest_dir = os.path.join(backup_dir, self.MANIFEST_DIR)
+        if not compress:
+            self.codec = 'raw'
+        else:
+            self.codec = 'zstd' if zstandard is not None else 'zlib'
         self.ensure_backup_dir()
-    
+
     def ensure_backup_dir(self) -> None:
         """确保备份目录存在"""
-        if not os.path.exists(self.backup_dir):
-            os.makedirs(self.backup_dir)
-    
+        for path in (self.backup_dir, self.chunk_dir, self.manifest_dir):
+            if not os.path.exists(path):
+                os.makedirs(path)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """持有备份目录的锁"""
+        key = os.path.realpath(self.backup_dir)
+        with _DIR_LOCKS_GUARD:
+            lock = _DIR_LOCKS.setdefault(key, threading.RLock())
+        with lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.backup_dir, self.LOCK_FILE), 'a') as f:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _chunk_path(self, digest: str, codec: str) -> str:
+        """块文件路径"""
+        return os.path.join(self.chunk_dir, digest[:2], f"{digest}.{codec}")
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == 'zstd':
+            return zstandard.ZstdCompressor().compress(data)
+        if self.codec == 'zlib':
+            return zlib.compress(data, 6)
+        return data
+
+    @staticmethod
+    def _decompress(data: bytes, codec: str) -> bytes:
+        if codec == 'zstd':
+            if zstandard is None:
+                raise RuntimeError("恢复该备份需要安装 zstandard")
+            return zstandard.ZstdDecompressor().decompress(data)
+        if codec == 'zlib':
+            return zlib.decompress(data)
+        return data
+
+    def _store_file(self, file_path: str) -> Tuple[List[str], int, int]:
+        """切块保存单个文件，返回 (块列表, 文件大小, 新写入字节数)"""
+        chunks = []
+        size = 0
+        written = 0
+        with open(file_path, 'rb') as f:
+            while True:
+                data = f.read(self.CHUNK_SIZE)
+                if not data:
+                    break
+                size += len(data)
+                digest = hashlib.sha256(data).hexdigest()
+                chunks.append(digest)
+
+                chunk_path = self._chunk_path(digest, self.codec)
+                if os.path.exists(chunk_path):
+                    continue  # 已有相同内容的块
+                os.makedirs(os.path.dirname(chunk_path), exist_ok=True)
+                compressed = self._compress(data)
+                tmp_path = f"{chunk_path}.tmp"
+                with open(tmp_path, 'wb') as out:
+                    out.write(compressed)
+                os.replace(tmp_path, chunk_path)
+                written += len(compressed)
+        return chunks, size, written
+
+    def _restore_file(self, entry: Dict, codec: str, target_path: str) -> None:
+        """按块列表还原单个文件"""
+        with open(target_path, 'wb') as out:
+            for digest in entry['chunks']:
+                with open(self._chunk_path(digest, codec), 'rb') as f:
+                    data = self._decompress(f.read(), codec)
+                if hashlib.sha256(data).hexdigest() != digest:
+                    raise ValueError(f"备份块已损坏: {digest}")
+                out.write(data)
+
     def create_backup(self, file_path: str, backup_type: str = 'auto') -> Tuple[bool, str]:
-        """创建文件备份
-        
+        """创建文件(或目录)备份
+
         Args:
-            file_path: 需要备份的文件路径
+            file_path: 需要备份的文件或目录路径
             backup_type: 备份类型 ('auto' 或 'manual')
-            
+
         Returns:
-            Tuple[bool, str]: (是否成功, 备份文件路径或错误信息)
+            Tuple[bool, str]: (是否成功, 备份清单路径或错误信息)
         """
         try:
             if not os.path.exists(file_path):
                 return False, f"源文件不存在: {file_path}"
-            
-            # 生成备份文件名
-            file_name = os.path.basename(file_path)
-            name, ext = os.path.splitext(file_name)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_name = f"{name}_{backup_type}_{timestamp}{ext}"
-            backup_path = os.path.join(self.backup_dir, backup_name)
-            
-            # 复制文件
-            shutil.copy2(file_path, backup_path)
-            
-            return True, backup_path
+
+            # 收集需要备份的文件
+            if os.path.isdir(file_path):
+                files = []
+                for root, _, names in os.walk(file_path):
+                    for name in sorted(names):
+                        full_path = os.path.join(root, name)
+                        files.append((os.path.relpath(full_path, file_path), full_path))
+            else:
+                files = [('', file_path)]
+
+            # 块写出到清单写出之间持锁，避免并发的清理把新块当作无引用删除
+            with self._locked():
+                entries = []
+                total_size = 0
+                stored_size = 0
+                for rel_path, full_path in files:
+                    chunks, size, written = self._store_file(full_path)
+                    entries.append({'path': rel_path, 'size': size, 'chunks': chunks})
+                    total_size += size
+                    stored_size += written
+
+                # 生成备份名
+                file_name = os.path.basename(os.path.normpath(file_path))
+                name, ext = os.path.splitext(file_name)
+                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+                backup_name = f"{name}_{backup_type}_{timestamp}{ext}"
+                manifest_path = os.path.join(self.manifest_dir, f"{backup_name}.json")
+
+                manifest = {
+                    'name': backup_name,
+                    'type': backup_type,
+                    'source': os.path.abspath(file_path),
+                    'is_dir': os.path.isdir(file_path),
+                    'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    'codec': self.codec,
+                    'size': total_size,
+                    'stored_size': stored_size,
+                    'files': entries
+                }
+                tmp_path = f"{manifest_path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(manifest, f, ensure_ascii=False)
+                os.replace(tmp_path, manifest_path)
+
+            return True, manifest_path
         except Exception as e:
             return False, str(e)
-    
-    def restore_backup(self, backup_path: str, target_path: str) -> Tuple[bool, str]:
+
+    def _read_manifest(self, manifest_path: str) -> Dict:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _is_manifest(self, backup_path: str) -> bool:
+        """备份路径是否为清单(否则为旧格式的整文件备份)"""
+        return (os.path.dirname(os.path.abspath(backup_path))
+                == os.path.abspath(self.manifest_dir))
+
+    def restore_backup(self, backup_path: str,
+                       target_path: Optional[str] = None) -> Tuple[bool, str]:
         """从备份恢复文件
-        
+
         Args:
-            backup_path: 备份文件路径
-            target_path: 目标恢复路径
-            
+            backup_path: 备份清单路径(或旧格式备份文件路径)
+            target_path: 目标恢复路径，默认恢复到备份时的原路径
+                (旧格式备份没有记录原路径，必须指定)
+
         Returns:
             Tuple[bool, str]: (是否成功, 成功或错误信息)
         """
         try:
             if not os.path.exists(backup_path):
                 return False, f"备份文件不存在: {backup_path}"
-            
-            # 如果目标文件存在，先创建一个临时备份
-            if os.path.exists(target_path):
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                temp_backup = f"{target_path}.{timestamp}.temp"
-                shutil.copy2(target_path, temp_backup)
-                
-                try:
-                    # 复制备份文件到目标位置
-                    shutil.copy2(backup_path, target_path)
-                    # 恢复成功，删除临时备份
-                    os.remove(temp_backup)
-                except Exception as e:
-                    # 恢复失败，还原原文件
-                    if os.path.exists(temp_backup):
-                        shutil.copy2(temp_backup, target_path)
-                        os.remove(temp_backup)
-                    raise e
-            else:
-                # 目标文件不存在，直接复制
-                shutil.copy2(backup_path, target_path)
-            
-            return True, "恢复成功"
+            with self._locked():
+                return self._restore(backup_path, target_path)
         except Exception as e:
             return False, str(e)
-    
+
+    def _restore(self, backup_path: str, target_path: Optional[str]) -> Tuple[bool, str]:
+        """恢复备份(持有目录锁)"""
+        if not self._is_manifest(backup_path):
+            if not target_path:
+                return False, f"旧格式备份需要指定恢复路径: {backup_path}"
+            temp_path = f"{target_path}.{datetime.now().strftime('%Y%m%d_%H%M%S')}.restore"
+            # 不保留备份的修改时间，否则恢复的Excel会比二进制快照旧而不被加载
+            shutil.copyfile(backup_path, temp_path)
+            os.replace(temp_path, target_path)
+            return True, "恢复成功"
+
+        manifest = self._read_manifest(backup_path)
+        target_path = target_path or manifest['source']
+
+        # 先还原到临时位置，全部成功后再替换目标
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        temp_path = f"{target_path}.{timestamp}.restore"
+        try:
+            if manifest['is_dir']:
+                os.makedirs(temp_path)
+                for entry in manifest['files']:
+                    file_path = os.path.join(temp_path, entry['path'])
+                    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                    self._restore_file(entry, manifest['codec'], file_path)
+            else:
+                self._restore_file(manifest['files'][0], manifest['codec'], temp_path)
+        except Exception:
+            if os.path.isdir(temp_path):
+                shutil.rmtree(temp_path)
+            elif os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        if manifest['is_dir']:
+            if os.path.exists(target_path):
+                shutil.rmtree(target_path)
+            os.rename(temp_path, target_path)
+        else:
+            os.replace(temp_path, target_path)
+
+        return True, "恢复成功"
+
     def list_backups(self, file_name: Optional[str] = None) -> List[dict]:
-        """列出备份文件
-        
+        """列出备份(只读取清单，以及备份目录下旧格式的整文件备份)
+
         Args:
             file_name: 可选，指定文件名筛选备份
-            
+
         Returns:
-            List[dict]: 备份文件信息列表
+            List[dict]: 备份信息列表(旧格式备份的 source 为 None，legacy 为 True)
         """
         backups = []
-        
+
         try:
-            for item in os.listdir(self.backup_dir):
+            for item in os.listdir(self.manifest_dir):
+                if not item.endswith('.json'):
+                    continue
                 if file_name and not item.startswith(file_name):
                     continue
-                    
-                item_path = os.path.join(self.backup_dir, item)
-                if os.path.isfile(item_path):
-                    stat = os.stat(item_path)
-                    backups.append({
-                        'name': item,
-                        'path': item_path,
-                        'size': stat.st_size,
-                        'created': datetime.fromtimestamp(stat.st_ctime)
-                            .strftime('%Y-%m-%d %H:%M:%S')
-                    })
+
+                item_path = os.path.join(self.manifest_dir, item)
+                manifest = self._read_manifest(item_path)
+                backups.append({
+                    'name': manifest['name'],
+                    'path': item_path,
+                    'source': manifest['source'],
+                    'type': manifest['type'],
+                    'size': manifest['size'],
+                    'stored_size': manifest['stored_size'],
+                    'created': manifest['created'],
+                    'legacy': False
+                })
+            backups.extend(self._list_legacy(file_name))
         except Exception as e:
             print(f"列出备份文件时出错: {e}")
-        
-        # 按创建时间排序
-        backups.sort(key=lambda x: x['created'], reverse=True)
+
+        # 按创建时间排序(备份名中含微秒时间戳，用于同一秒内排序)
+        backups.sort(key=lambda x: (x['created'], x['name']), reverse=True)
+        return backups
+
+    def _list_legacy(self, file_name: Optional[str] = None) -> List[dict]:
+        """旧版本直接复制到备份目录下的文件"""
+        backups = []
+        for item in os.listdir(self.backup_dir):
+            item_path = os.path.join(self.backup_dir, item)
+            if (item.startswith('.') or item.endswith('.tmp')
+                    or not os.path.isfile(item_path)):
+                continue
+            if file_name and not item.startswith(file_name):
+                continue
+            stat = os.stat(item_path)
+            backups.append({
+                'name': item,
+                'path': item_path,
+                'source': None,
+                'type': 'manual' if '_manual_' in item else 'auto',
+                'size': stat.st_size,
+                'stored_size': stat.st_size,
+                'created': datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
+                'legacy': True
+            })
         return backups
-    
+
     def clean_old_backups(self, max_backups: int = 10,
                          file_name: Optional[str] = None) -> Tuple[bool, str]:
-        """清理旧的备份文件
-        
+        """清理旧的备份，并删除不再被任何清单引用的块
+
         Args:
             max_backups: 保留的最大备份数量
             file_name: 可选，指定文件名筛选备份
-            
+
         Returns:
             Tuple[bool, str]: (是否成功, 成功或错误信息)
         """
         try:
-            backups = self.list_backups(file_name)
-            
-            if len(backups) <= max_backups:
-                return True, "无需清理"
-            
-            # 删除超出数量的旧备份
-            for backup in backups[max_backups:]:
-                try:
-                    os.remove(backup['path'])
-                except Exception as e:
-                    print(f"删除备份文件失败: {backup['name']} - {e}")
-            
-            return True, f"已清理 {len(backups) - max_backups} 个旧备份"
+            with self._locked():
+                backups = self.list_backups(file_name)
+
+                if len(backups) <= max_backups:
+                    return True, "无需清理"
+
+                # 删除超出数量的旧清单(旧格式备份直接删除文件)
+                for backup in backups[max_backups:]:
+                    try:
+                        os.remove(backup['path'])
+                    except Exception as e:
+                        print(f"删除备份文件失败: {backup['name']} - {e}")
+
+                removed_chunks = self._collect_garbage()
+            return True, (f"已清理 {len(backups) - max_backups} 个旧备份，"
+                          f"释放 {removed_chunks} 个数据块")
         except Exception as e:
-            return False, str(e)
\ No newline at end of file
+            return False, str(e)
+
+    def _collect_garbage(self) -> int:
+        """删除未被引用的块，返回删除数量(持有目录锁时调用，跳过写了一半的临时文件)"""
+        referenced = set()
+        for item in os.listdir(self.manifest_dir):
+            if item.endswith('.json'):
+                manifest = self._read_manifest(os.path.join(self.manifest_dir, item))
+                for entry in manifest['files']:
+                    referenced.update(f"{digest}.{manifest['codec']}" for digest in entry['chunks'])
+
+        removed = 0
+        for prefix in os.listdir(self.chunk_dir):
+            prefix_dir = os.path.join(self.chunk_dir, prefix)
+            for chunk in os.listdir(prefix_dir):
+                if chunk.endswith('.tmp'):
+                    continue
+                if chunk not in referenced:
+                    os.remove(os.path.join(prefix_dir, chunk))
+                    removed += 1
+        return removed
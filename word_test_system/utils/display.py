@@ -1,24 +1,31 @@
-from colorama import Fore, Style, init
 from typing import Dict, List, Any, Optional
-from datetime import datetime
 
-# 初始化彩色输出
-init(autoreset=True)
+# colorama 在第一次彩色输出时才导入并初始化，不拖慢启动
+_fore = None
+
+def _color_code(color: str) -> str:
+    """颜色名(如 'GREEN')转换为终端颜色码"""
+    global _fore
+    if _fore is None:
+        from colorama import Fore, init
+        init(autoreset=True)
+        _fore = Fore
+    return getattr(_fore, color.upper(), '')
 
 class Display:
     def __init__(self, color_mode: bool = True):
         self.color_mode = color_mode
     
     def print_color(self, color: str, text: str) -> None:
-        """彩色打印"""
+        """彩色打印，color 为 colorama 的颜色名，如 'GREEN'"""
         if self.color_mode:
-            print(color + text)
+            print(_color_code(color) + text)
         else:
             print(text)
     
     def print_title(self, title: str) -> None:
         """打印标题"""
-        self.print_color(Fore.CYAN, f"\n=== {title} ===")
+        self.print_color("CYAN", f"\n=== {title} ===")
     
     def print_menu(self, options: Dict[str, str]) -> None:
         """打印菜单选项"""
@@ -27,7 +34,7 @@ class Display:
     
     def print_word_test(self, word: str, page: int, feedback_levels: Dict[str, str]) -> None:
         """打印单词测试界面"""
-        self.print_color(Fore.YELLOW, f"\n单词: {word} (页码: {page})")
+        self.print_color("YELLOW", f"\n单词: {word} (页码: {page})")
         print("请选择熟悉程度:")
         for score, desc in feedback_levels.items():
             print(f"{score}. {desc}")
@@ -37,7 +44,7 @@ class Display:
     
     def print_test_result(self, score: int, total_score: float) -> None:
         """打印测试结果"""
-        color = Fore.GREEN if score > 0 else Fore.RED
+        color = "GREEN" if score > 0 else "RED"
         self.print_color(
             color,
             f"当前分数: {total_score:.1f} (本次: {'+' if score > 0 else ''}{score})"
@@ -54,7 +61,7 @@ class Display:
         
         # 分数分布
         if 'score_distribution' in stats:
-            self.print_color(Fore.CYAN, "\n分数分布:")
+            self.print_color("CYAN", "\n分数分布:")
             for range_label, count in stats['score_distribution'].items():
                 print(f"{range_label}: {count}")
     
@@ -70,7 +77,7 @@ class Display:
         # 测试历史
         history = word_info.get('history', [])
         if history:
-            self.print_color(Fore.CYAN, "\n测试历史:")
+            self.print_color("CYAN", "\n测试历史:")
             for record in history:
                 print(
                     f"{record['timestamp']}: "
@@ -93,7 +100,7 @@ class Display:
         self.print_title("需要加强的单词")
         for word in words:
             self.print_color(
-                Fore.RED,
+                "RED",
                 f"{word['word']} (页码: {word['page']}, "
                 f"分数: {word['score']}, 测试次数: {word['times']})"
             )
@@ -104,7 +111,7 @@ class Display:
         for word in words:
             days = word['days_since_tested']
             self.print_color(
-                Fore.YELLOW,
+                "YELLOW",
                 f"{word['word']} (页码: {word['page']}, "
                 f"分数: {word['score']}, 上次测试: {days}天前)"
             )
\ No newline at end of file
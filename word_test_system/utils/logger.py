@@ -1,13 +1,239 @@
+import functools
+import json
 import logging
 import os
+import threading
+import time
+from bisect import bisect_left
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Dict, Optional, Tuple
+
+class _NullSpan:
+    """未启用统计时使用的空计时器"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    """计时区间: 退出时把耗时记入直方图"""
+    __slots__ = ('metrics', 'key', 'start')
+
+    def __init__(self, metrics: 'Metrics', key: Tuple):
+        self.metrics = metrics
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.metrics._observe(self.key, time.perf_counter() - self.start)
+        return False
+
+class Histogram:
+    """耗时直方图(秒)，桶边界与 Prometheus 的默认值相近"""
+    BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.buckets = [0] * (len(self.BUCKETS) + 1)   # 最后一个为 +Inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.buckets[bisect_left(self.BUCKETS, value)] += 1
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'min': self.min if self.count else 0.0,
+            'max': self.max,
+            'mean': self.total / self.count if self.count else 0.0
+        }
+
+class Metrics:
+    """轻量的运行统计: 计时区间、计数器和耗时直方图
+
+    未启用时 span() 返回共享的空计时器、timed 装饰的函数直接调用原函数，
+    开销只有一次属性判断。启用后可周期性地把汇总以JSON行追加到日志目录，
+    并可选写出 Prometheus 文本格式文件。
+    """
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple, Histogram] = {}
+        self._counters: Dict[Tuple, float] = {}
+        self._started = time.monotonic()
+        self._reporter: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> Tuple:
+        return (name,) + tuple(sorted(labels.items()))
+
+    def span(self, name: str, **labels):
+        """计时上下文: with metrics.span('select_word', mode='random'): ..."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, self._key(name, labels))
+
+    def timed(self, name: str) -> Callable:
+        """计时装饰器"""
+        def decorator(func: Callable) -> Callable:
+            key = (name,)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self._observe(key, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def count(self, name: str, value: float = 1, **labels) -> None:
+        """计数器累加"""
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """记录一个耗时(秒)"""
+        if self.enabled:
+            self._observe(self._key(name, labels), value)
+
+    def _observe(self, key: Tuple, value: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.add(value)
+
+    def reset(self) -> None:
+        """清空已收集的数据"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._started = time.monotonic()
+
+    @staticmethod
+    def _format_key(key: Tuple) -> str:
+        name, labels = key[0], key[1:]
+        if not labels:
+            return name
+        return name + '{' + ','.join(f'{k}={v}' for k, v in labels) + '}'
+
+    def summary(self) -> dict:
+        """当前汇总(自启用或上次清空以来的累计值)"""
+        with self._lock:
+            return {
+                'time': datetime.now().isoformat(timespec='seconds'),
+                'uptime': time.monotonic() - self._started,
+                'spans': {self._format_key(k): h.to_dict() for k, h in self._histograms.items()},
+                'counters': {self._format_key(k): v for k, v in self._counters.items()}
+            }
+
+    def write_summary(self, path: str) -> None:
+        """以JSON行追加汇总"""
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(self.summary(), ensure_ascii=False) + '\n')
+
+    @staticmethod
+    def _prometheus_name(name: str) -> str:
+        return 'word_test_' + ''.join(c if c.isalnum() else '_' for c in name)
+
+    @staticmethod
+    def _prometheus_labels(labels: Tuple, extra: str = '') -> str:
+        parts = [f'{k}="{v}"' for k, v in labels]
+        if extra:
+            parts.append(extra)
+        return '{' + ','.join(parts) + '}' if parts else ''
+
+    def prometheus_text(self) -> str:
+        """Prometheus 文本格式"""
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        for key, histogram in histograms:
+            name = self._prometheus_name(key[0]) + '_seconds'
+            lines.append(f'# TYPE {name} histogram')
+            cumulative = 0
+            for bound, count in zip(Histogram.BUCKETS + ('+Inf',), histogram.buckets):
+                cumulative += count
+                labels = self._prometheus_labels(key[1:], f'le="{bound}"')
+                lines.append(f'{name}_bucket{labels} {cumulative}')
+            labels = self._prometheus_labels(key[1:])
+            lines.append(f'{name}_sum{labels} {histogram.total}')
+            lines.append(f'{name}_count{labels} {histogram.count}')
+
+        for key, value in counters:
+            name = self._prometheus_name(key[0]) + '_total'
+            lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name}{self._prometheus_labels(key[1:])} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str) -> None:
+        """写出 Prometheus 文本格式文件(先写临时文件再替换)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def start_reporter(self, summary_path: str, interval: float = 60.0,
+                       prometheus_path: Optional[str] = None) -> None:
+        """启动后台线程，每隔 interval 秒写出一次汇总"""
+        self.stop_reporter()
+        self._stop.clear()
+
+        def report():
+            self.write_summary(summary_path)
+            if prometheus_path:
+                self.write_prometheus(prometheus_path)
+
+        def run():
+            while not self._stop.wait(interval):
+                report()
+            report()   # 停止时写出最后一次
+
+        self._reporter = threading.Thread(target=run, name='MetricsReporter', daemon=True)
+        self._reporter.start()
+
+    def stop_reporter(self, timeout: Optional[float] = None) -> None:
+        """停止后台线程(会写出最后一次汇总)"""
+        if self._reporter is not None and self._reporter.is_alive():
+            self._stop.set()
+            self._reporter.join(timeout)
+        self._reporter = None
+
+# 全局统计实例，各模块通过它记录耗时
+metrics = Metrics()
 
 class Logger:
     def __init__(self, log_dir: str = 'logs', log_level: int = logging.INFO):
         self.log_dir = log_dir
         self.log_level = log_level
         self.logger = None
+        self.metrics = metrics
         self.setup_logger()
     
     def setup_logger(self) -> None:
@@ -98,4 +324,21 @@ class Logger:
             message = event
             if details:
                 message += f": {details}"
-            self.info(message)
\ No newline at end of file
+            self.info(message)
+
+    def enable_metrics(self, interval: float = 60.0,
+                       prometheus_file: Optional[str] = None) -> None:
+        """启用运行统计，周期性地把汇总写到日志目录的 metrics_日期.jsonl"""
+        self.metrics.enabled = True
+        summary_path = os.path.join(
+            self.log_dir,
+            f"metrics_{datetime.now().strftime('%Y%m%d')}.jsonl"
+        )
+        self.metrics.start_reporter(summary_path, interval, prometheus_file or None)
+        self.info(f"已启用运行统计: {summary_path}")
+
+    def disable_metrics(self) -> None:
+        """停止运行统计(写出最后一次汇总)"""
+        self.metrics.stop_reporter()
+        self.metrics.enabled = False
+